@@ -9,7 +9,6 @@ import subprocess
 
 from copy import deepcopy
 from pathlib import Path
-from datetime import timedelta
 from contextlib import contextmanager
 import http.server
 import socketserver
@@ -21,7 +20,7 @@ import requests
 
 from tevmc.config import local, testnet, mainnet
 from tevmc.testing import bootstrap_test_stack
-from tevmc.testing.database import get_suffix
+from tevmc.testing.loader import load_test_range
 
 from elasticsearch import Elasticsearch
 
@@ -197,7 +196,9 @@ def prepare_db_for_test(
     txs=[],
     action_index_spec='action-v1.5',
     delta_index_spec='delta-v1.5',
-    docs_per_index=10_000_000
+    docs_per_index=10_000_000,
+    chunk_size=5_000,
+    thread_count=4
 ):
     rpc_conf = tevmc.config['telos-evm-rpc']
     es_config = tevmc.config['elasticsearch']
@@ -214,49 +215,15 @@ def prepare_db_for_test(
         index=f'{rpc_conf["elastic_prefix"]}-{delta_index_spec}-*',
     )
 
-    ops = []
-    for rstart, rend in ranges:
-        for i in range(rstart, rend + 1, 1):
-            delta_index = f'{rpc_conf["elastic_prefix"]}-{delta_index_spec}-{get_suffix(i, docs_per_index)}'
-            ops.append({
-                "index": {
-                    "_index": delta_index
-                }
-            })
-            ops.append({
-                "@timestamp": start_time + (i * timedelta(seconds=0.5)),
-                "@global": {
-                    "block_num": i
-                },
-                "block_num": i - 10
-            })
-
-    indices = []
-    for tx in txs:
-        action_index = f'{rpc_conf["elastic_prefix"]}-{action_index_spec}-{get_suffix(tx["@raw.block"], docs_per_index)}'
-        indices.append(action_index)
-        ops.append({
-            "index": {
-                "_index": action_index
-            }
-        })
-        ops.append(tx)
-
-    for idx in indices:
-        es.indices.create(
-            index=idx,
-            ignore=400,
-            body={
-                'mappings': {
-                    'properties': {
-                        '@raw.hash': {
-                            'type': 'keyword'
-                        }
-                    }
-                }
-            }
-        )
-
-
-    es.bulk(operations=ops, refresh=True)
-
+    load_test_range(
+        es,
+        rpc_conf['elastic_prefix'],
+        start_time,
+        ranges,
+        txs=txs,
+        action_index_spec=action_index_spec,
+        delta_index_spec=delta_index_spec,
+        docs_per_index=docs_per_index,
+        chunk_size=chunk_size,
+        thread_count=thread_count
+    )
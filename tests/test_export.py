@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import json
+
+import pyarrow as pa
+
+from tevmc.cmdline.export import (
+    ACTION_COLUMNS,
+    _to_column_value,
+    export_columns,
+    export_schema
+)
+
+
+def test_export_delta_schema():
+    columns = dict(export_columns('delta'))
+    assert columns['global_block_num'] == '@global.block_num'
+    assert columns['block_num'] == 'block_num'
+    assert columns['evm_block_hash'] == '@evmBlockHash'
+
+    schema = export_schema('delta')
+    assert schema.names == [name for name, _ in export_columns('delta')]
+    assert schema.field('global_block_num').type == pa.int64()
+    assert schema.field('block_num').type == pa.int64()
+    assert schema.field('timestamp').type == pa.string()
+    assert schema.field('block_hash').type == pa.string()
+
+
+def test_export_action_schema():
+    columns = export_columns('action')
+    assert columns[:len(ACTION_COLUMNS)] == ACTION_COLUMNS
+
+    # evm tx fields come from '@raw', private lazy attrs get plain names
+    paths = dict(columns)
+    assert paths['block'] == '@raw.block'
+    assert paths['hash'] == '@raw.hash'
+    assert paths['itxs'] == '@raw.itxs'
+    assert '_itxs_source' not in paths
+
+    schema = export_schema('action')
+    assert schema.field('block').type == pa.int64()
+    assert schema.field('action_ordinal').type == pa.int64()
+    assert schema.field('trx_index').type == pa.int64()
+    assert schema.field('itxs').type == pa.string()
+    assert schema.field('value').type == pa.string()
+
+
+def test_export_column_values():
+    assert _to_column_value('block', None) is None
+    assert _to_column_value('block', '110') == 110
+    assert _to_column_value('hash', 'ab') == 'ab'
+    assert _to_column_value('value', 12) == '12'
+
+    itxs = [{'callType': 'call', 'depth': 0}]
+    assert json.loads(_to_column_value('itxs', itxs)) == itxs
+    assert _to_column_value('signatures', 'sig') == '"sig"'
+
+    # nested values outside the json columns still serialize
+    assert json.loads(_to_column_value('extra', {'a': 1})) == {'a': 1}
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+from tevmc.testing.database import IndexCatalog
+
+
+class FakeDriver:
+    '''Counts the `_cat/indices` listings and range aggregations the
+    catalog asks for.
+    '''
+
+    def __init__(self, counts: dict[str, int]):
+        self.counts = counts
+        self.listings = 0
+        self.aggregated = []
+
+    def get_index_doc_counts(self, kind: str) -> dict[str, int]:
+        self.listings += 1
+        return dict(self.counts)
+
+    def get_index_stats(self, kind: str, indices=None) -> dict:
+        self.aggregated.append(list(indices))
+        return {
+            name: {'docs': self.counts[name], 'min_block': 0, 'max_block': self.counts[name]}
+            for name in indices
+        }
+
+
+def test_index_catalog_ttl_only_for_listings():
+    driver = FakeDriver({
+        'telos-delta-v1.5-00000001': 10,
+        'telos-delta-v1.5-00000000': 20
+    })
+    catalog = IndexCatalog(driver, ttl=60.0)
+
+    infos = catalog.get('delta', ranges=False)
+    assert [info.suffix for info in infos] == [0, 1]
+    assert infos[0].min_block is None
+    assert driver.aggregated == []
+
+    # listing reused under ttl
+    catalog.get('delta', ranges=False)
+    assert driver.listings == 1
+
+    # ranges always list again, only unknown ranges get aggregated
+    infos = catalog.get('delta')
+    assert driver.listings == 2
+    assert infos[1].max_block == 10
+    assert driver.aggregated == [[
+        'telos-delta-v1.5-00000000', 'telos-delta-v1.5-00000001']]
+
+    driver.counts['telos-delta-v1.5-00000001'] = 15
+    catalog.get('delta')
+    assert driver.aggregated[-1] == ['telos-delta-v1.5-00000001']
+
+    # expire keeps ranges keyed by doc count, invalidate drops them
+    catalog.expire()
+    catalog.get('delta', ranges=False)
+    assert driver.listings == 4
+    catalog.get('delta')
+    assert len(driver.aggregated) == 2
+
+    catalog.invalidate()
+    catalog.get('delta')
+    assert len(driver.aggregated) == 3
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import struct
+import threading
+
+from tevmc.logs import LogFollower, LogHub, tail_offset
+from tevmc.utils import (
+    DOCKER_STREAM_STDERR,
+    DOCKER_STREAM_STDOUT,
+    DockerLogDecoder
+)
+
+
+def docker_frame(stream: int, payload: bytes) -> bytes:
+    return struct.pack('>BxxxL', stream, len(payload)) + payload
+
+
+def test_docker_log_decoder_split_frames():
+    frames = [
+        (DOCKER_STREAM_STDOUT, 'multi byte ñandú\n'.encode('utf-8')),
+        (DOCKER_STREAM_STDERR, b'error line\n'),
+        (DOCKER_STREAM_STDOUT, b'x' * 10_000)
+    ]
+    data = b''.join(docker_frame(*frame) for frame in frames)
+
+    # feed in chunks that split headers, payloads & multi byte chars
+    decoder = DockerLogDecoder()
+    decoded = []
+    for i in range(0, len(data), 7):
+        decoded += list(decoder.feed(data[i:i + 7]))
+
+    assert decoded == frames
+    assert decoder.pending == 0
+
+
+def test_docker_log_decoder_keeps_partial_frame():
+    decoder = DockerLogDecoder()
+    frame = docker_frame(DOCKER_STREAM_STDOUT, b'hello\n')
+
+    assert list(decoder.feed(frame + frame[:3])) == [
+        (DOCKER_STREAM_STDOUT, b'hello\n')]
+    assert decoder.pending == 3
+
+    assert list(decoder.feed(frame[3:])) == [
+        (DOCKER_STREAM_STDOUT, b'hello\n')]
+    assert decoder.pending == 0
+
+
+def test_docker_log_decoder_feed_while_iterating():
+    decoder = DockerLogDecoder()
+    frame = docker_frame(DOCKER_STREAM_STDOUT, b'hello\n')
+
+    # a half consumed feed must not pin the buffer for the next one
+    first = iter(decoder.feed(frame * 2))
+    assert next(first) == (DOCKER_STREAM_STDOUT, b'hello\n')
+
+    assert list(decoder.feed(frame + frame[:3])) == [
+        (DOCKER_STREAM_STDOUT, b'hello\n')]
+    assert next(first) == (DOCKER_STREAM_STDOUT, b'hello\n')
+    assert decoder.pending == 3
+
+
+def test_tail_offset(tmp_path):
+    log_path = tmp_path / 'test.log'
+    log_path.write_bytes(b'a\nbb\nccc\n')
+
+    fd = os.open(log_path, os.O_RDONLY)
+    try:
+        assert tail_offset(fd, 1) == 5
+        assert tail_offset(fd, 2) == 2
+        assert tail_offset(fd, 10) == 0
+        assert tail_offset(fd, 0) == 9
+
+    finally:
+        os.close(fd)
+
+
+def test_log_follower_rotation_and_truncation(tmp_path):
+    log_path = tmp_path / 'test.log'
+    log_path.write_bytes(
+        b''.join(f'line {i}\n'.encode() for i in range(10)) +
+        b'clear_expired_input_ spam\n' +
+        b'partial')
+
+    def write_more():
+        time.sleep(0.2)
+        with open(log_path, 'ab') as log_file:
+            log_file.write(b' line\nnew line\n')
+
+        time.sleep(0.2)
+        log_path.rename(tmp_path / 'test.log.1')
+        log_path.write_bytes(b'rotated file line\n')
+
+        time.sleep(0.2)
+        log_path.write_bytes(b'trunc\n')
+
+    writer = threading.Thread(target=write_more)
+    writer.start()
+
+    follower = LogFollower(log_path, lines=3, timeout=1.5, poll_interval=0.01)
+    lines = list(follower)
+    writer.join()
+
+    assert follower.timed_out
+    assert lines == [
+        b'line 9\n',
+        b'partial line\n',
+        b'new line\n',
+        b'rotated file line\n',
+        b'trunc\n'
+    ]
+
+
+def test_log_hub_fan_out():
+    source_lines = [f'line {i}\n'.encode() for i in range(20)]
+    opened = []
+
+    def open_source(first: bool):
+        opened.append(first)
+        return iter(source_lines) if first else iter([])
+
+    hub = LogHub('test', open_source, size=10, retry_interval=0.01)
+    hub.start()
+    while hub.ring.end < len(source_lines):
+        time.sleep(0.01)
+
+    # every subscriber gets its own view of the single read
+    tail = hub.subscribe(backlog=None, idle_timeout=0.2)
+    assert list(tail) == source_lines[10:]
+    assert tail.timed_out
+
+    last = hub.subscribe(backlog=3, idle_timeout=0.2)
+    assert list(last) == source_lines[17:]
+
+    hub.stop()
+    assert list(hub.subscribe(backlog=1)) == source_lines[19:]
+    assert opened[0] and not any(opened[1:])
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+
+import pytest
+
+from tevmc import monitor
+from tevmc.monitor import IndexingProgress, IndexLagMonitor, ema
+from tevmc.testing.database import StorageEosioDelta
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeElastic:
+    '''Only what `IndexLagMonitor` reads, the newest indexed delta.
+    '''
+
+    def __init__(self):
+        self.block_num = None
+
+    def get_newest_indexed_block(self):
+        if self.block_num is None:
+            return None
+
+        return StorageEosioDelta({
+            'block_num': self.block_num,
+            '@global': {'block_num': self.block_num - 100}
+        })
+
+
+def test_ema():
+    assert ema(None, 10.0, 0.3) == 10.0
+    assert ema(10.0, 20.0, 0.5) == 15.0
+    assert ema(10.0, 20.0, 0.25) == pytest.approx(12.5)
+
+
+def test_indexing_progress_lag_and_eta():
+    assert IndexingProgress().lag is None
+    assert IndexingProgress().eta is None
+
+    # indexer ahead of a stale head reads as synced
+    assert IndexingProgress(indexed_block=110, head_block=100).lag == 0
+
+    progress = IndexingProgress(
+        indexed_block=100, head_block=1100, rate=12.0, head_rate=2.0)
+    assert progress.lag == 1000
+    assert progress.eta == 100.0
+    assert progress.to_dict()['eta'] == 100.0
+
+    # rate unknown or not gaining on head, no eta
+    assert IndexingProgress(indexed_block=100, head_block=1100).eta is None
+    assert IndexingProgress(
+        indexed_block=100, head_block=1100, rate=2.0, head_rate=2.0).eta is None
+
+    assert IndexingProgress(
+        indexed_block=100, head_block=100, rate=0.0).eta == 0.0
+
+
+def test_lag_monitor_rates(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(monitor.time, 'monotonic', clock)
+
+    es = FakeElastic()
+    heads = iter([1000, 1100])
+    lag_monitor = IndexLagMonitor(
+        es, lambda: next(heads), head_interval=10.0, alpha=0.5)
+
+    # nothing indexed yet
+    progress = lag_monitor.sample()
+    assert progress.samples == 1
+    assert progress.head_block == 1000
+    assert progress.indexed_block is None
+    assert progress.lag is None
+
+    # first indexed doc, no rate until a second one is seen
+    clock.now = 5.0
+    es.block_num = 100
+    progress = lag_monitor.sample()
+    assert progress.indexed_block == 100
+    assert progress.indexed_evm_block == 0
+    assert progress.lag == 900
+    assert progress.rate is None
+    assert progress.eta is None
+
+    # head is cached until head_interval passes
+    clock.now = 10.0
+    es.block_num = 200
+    progress = lag_monitor.sample()
+    assert progress.head_block == 1100
+    assert progress.head_rate == 10.0
+    assert progress.rate == 20.0
+    assert progress.eta == pytest.approx(900 / 10.0)
+
+    clock.now = 15.0
+    es.block_num = 400
+    progress = lag_monitor.sample()
+    assert progress.head_block == 1100
+    assert progress.rate == pytest.approx(ema(20.0, 40.0, 0.5))
+    assert progress.lag == 700
+    assert progress.eta == pytest.approx(700 / (30.0 - 10.0))
+    assert progress.samples == 4
+
+
+def test_polling_monitor_is_abstract():
+    with pytest.raises(TypeError):
+        monitor.PollingMonitor(1.0)
+
+
+def test_polling_monitor_stop_timeout():
+    release = threading.Event()
+
+    class SlowMonitor(monitor.PollingMonitor):
+
+        def sample(self):
+            release.wait(5.0)
+
+    slow = SlowMonitor(0.01, stop_timeout=0.1)
+    slow.start()
+    thread = slow._thread
+
+    start = time.monotonic()
+    slow.stop()
+    assert time.monotonic() - start < 1.0
+    assert thread.is_alive()
+
+    release.set()
+    thread.join(timeout=5.0)
+    assert not thread.is_alive()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+import time
+
+from tevmc.probes import ReadinessProbe, run_probes
+
+
+def test_readiness_probes_concurrent():
+    start = time.monotonic()
+
+    def ready_after(seconds: float):
+        def check():
+            if time.monotonic() - start < seconds:
+                raise ConnectionRefusedError('not up yet')
+
+            return True
+
+        return check
+
+    results = run_probes([
+        ReadinessProbe('slow', ready_after(0.5), max_delay=0.1),
+        ReadinessProbe('fast', ready_after(0.1), max_delay=0.1),
+        ReadinessProbe('never', lambda: False, timeout=0.3, max_delay=0.1)
+    ])
+
+    # probes overlap, total is the slowest one not the sum
+    assert time.monotonic() - start < 1.0
+
+    assert results['fast'].ready and results['slow'].ready
+    assert results['fast'].elapsed < results['slow'].elapsed
+    assert results['slow'].attempts > 1
+
+    assert not results['never'].ready
+    assert results['never'].elapsed <= 0.3
@@ -5,8 +5,21 @@ from hashlib import sha256
 from datetime import datetime
 
 import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-from tevmc.testing.database import ElasticDriver, ElasticDataIntegrityError
+from tevmc.cmdline.export import export_kind, export_schema
+from tevmc.testing.database import (
+    GAP_STRATEGY_SCAN,
+    INTEGRITY_CHECKPOINT_FILE,
+    ElasticDriver,
+    IndexDigests,
+    IntegrityCheckpoint,
+    ESGapFound,
+    ESDuplicatesFound,
+    ElasticDataIntegrityError
+)
+from tevmc.testing.async_database import BlockingAsyncElasticDriver
 
 from conftest import prepare_db_for_test
 
@@ -63,3 +76,343 @@ def test_python_elastic_integrity_tool(tevmc_local):
         elastic.full_integrity_check()
 
     assert 'Duplicates found!' in str(error)
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_integrity_sharded(tevmc_local):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+
+    docs_per_index = 100
+    elastic.docs_per_index = docs_per_index
+
+    # no gaps across several indices
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(50, 450)],
+        docs_per_index=docs_per_index)
+
+    report = elastic.full_integrity_check(max_workers=4)
+    assert report.healthy
+    assert len(report.shards) == 5
+
+    # gaps in two different shards, lowest one is reported
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(50, 149), (151, 319), (321, 450)],
+        docs_per_index=docs_per_index)
+
+    with pytest.raises(ElasticDataIntegrityError) as error:
+        elastic.full_integrity_check(max_workers=4)
+
+    assert 'Gap found! 150' in str(error)
+
+    # gap right on a shard boundary
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(50, 199), (201, 450)],
+        docs_per_index=docs_per_index)
+
+    with pytest.raises(ElasticDataIntegrityError) as error:
+        elastic.full_integrity_check(max_workers=4)
+
+    assert 'Gap found! 200' in str(error)
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_duplicates_paged(tevmc_local):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+
+    # more duplicates than the old terms size=100 cap, over several pages
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 600), (200, 450)])
+
+    dups = list(elastic.iter_duplicate_deltas(100, 600, page_size=64))
+    assert dups == list(range(200, 451))
+
+    with pytest.raises(ESDuplicatesFound) as error:
+        elastic.full_integrity_check()
+
+    assert len(error.value.delta_dups) == 251
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_integrity_incremental(tevmc_local, tmp_path):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+    checkpoint_path = tmp_path / INTEGRITY_CHECKPOINT_FILE
+
+    # first run is a full check and stores the checkpoint
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 200)])
+
+    elastic.incremental_integrity_check(checkpoint_path)
+    assert IntegrityCheckpoint.load(checkpoint_path).last_block == 200
+
+    # new blocks only get checked from the checkpoint on
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 300)])
+
+    report = elastic.incremental_integrity_check(checkpoint_path)
+    assert report.lower == 200
+    assert IntegrityCheckpoint.load(checkpoint_path).last_block == 300
+
+    # gap in old history changes doc counts and gets re-checked
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 150), (152, 400)])
+
+    with pytest.raises(ElasticDataIntegrityError) as error:
+        elastic.incremental_integrity_check(checkpoint_path)
+
+    assert 'Gap found! 151' in str(error)
+    assert IntegrityCheckpoint.load(checkpoint_path).last_block == 300
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_gap_scan(tevmc_local):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 120), (122, 150), (160, 200)])
+
+    assert list(elastic.iter_gaps(100, 200, page_size=16)) == [
+        (121, 121), (151, 159)]
+
+    with pytest.raises(ESGapFound) as error:
+        elastic.full_integrity_check(gap_strategy=GAP_STRATEGY_SCAN)
+
+    assert error.value.start == 121
+
+    report = elastic.check_range(100, 200, gap_strategy=GAP_STRATEGY_SCAN)
+    assert report.gap_ranges == [(121, 121), (151, 159)]
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_targeted_repair(tevmc_local):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+
+    test_hash = sha256(b'test_tx').hexdigest()
+    txs = [
+        {'@raw.block': 180, '@raw.hash': test_hash},
+        {'@raw.block': 180, '@raw.hash': test_hash}
+    ]
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 120), (123, 150), (140, 141), (152, 200)],
+        txs=txs)
+
+    assert elastic.find_damaged_ranges() == [
+        (121, 122), (140, 141), (151, 151), (180, 180)]
+
+    work_list = elastic.targeted_repair()
+    assert [(w['start_block'], w['end_block']) for w in work_list] == [
+        (111, 112), (130, 131), (141, 141), (170, 170)]
+
+    # only damaged blocks are gone, everything else stays
+    assert elastic.find_damaged_ranges() == [
+        (121, 122), (140, 141), (151, 151), (180, 180)]
+    assert elastic.block_from_evm_num(139)
+    assert elastic.block_from_evm_num(200)
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_missing_index_ranges(tevmc_local):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+    elastic.docs_per_index = 100
+
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 420), (425, 499)], docs_per_index=100)
+
+    # drop a whole index in the middle of the chain
+    elastic.elastic.indices.delete(
+        index=f'{elastic.chain_name}-delta-v1.5-00000002')
+
+    assert elastic.find_missing_index_range(100, 499) == (200, 299)
+
+    # the missing index spans its whole range and later gaps still show
+    report = elastic.check_range(100, 499, gap_strategy=GAP_STRATEGY_SCAN)
+    assert sorted(report.gap_ranges) == [(200, 299), (421, 424)]
+
+    assert elastic.find_damaged_ranges() == [(200, 299), (421, 424)]
+
+    with pytest.raises(ESGapFound) as error:
+        elastic.full_integrity_check()
+
+    assert error.value.start == 200
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_lookup_cache(tevmc_local):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 200)])
+
+    for _ in range(3):
+        assert elastic.block_from_evm_num(150).global_block_num == 150
+
+    stats = elastic.cache_stats()['delta_by_evm']
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+
+    assert elastic.block_from_native_num(140).global_block_num == 150
+
+    elastic.purge_newer_than(140, 150)
+
+    assert elastic.block_from_evm_num(150) is None
+    assert elastic.block_from_native_num(140) is None
+    assert elastic.block_from_evm_num(149).global_block_num == 149
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_async_driver(tevmc_local):
+    tevmc = tevmc_local
+    elastic = BlockingAsyncElasticDriver(tevmc.config, max_concurrency=8)
+
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 200)])
+
+    report = elastic.full_integrity_check()
+    assert report.healthy
+
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 150), (152, 200)])
+
+    with pytest.raises(ESGapFound) as error:
+        elastic.full_integrity_check()
+
+    assert error.value.start == 151
+
+    assert elastic.repair_data() == (139, 149)
+    assert elastic.full_integrity_check().healthy
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_optimize_completed(tevmc_local):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+    elastic.docs_per_index = 100
+
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(50, 350)], docs_per_index=100)
+
+    prefix = f'{elastic.chain_name}-delta-v1.5'
+    completed = [f'{prefix}-{i:08d}' for i in range(3)]
+
+    assert elastic.get_completed_indices() == completed
+    assert elastic.optimize_completed_indices() == completed
+    assert elastic.get_write_blocked_indices(completed) == completed
+
+    # nothing left to do on a second pass
+    assert elastic.optimize_completed_indices() == []
+
+    # purging into a frozen index lifts its write block
+    elastic.purge_newer_than(140, 150)
+
+    assert elastic.get_write_blocked_indices(completed[:2]) == [completed[0]]
+    assert elastic.get_last_indexed_block().global_block_num == 149
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_snapshot_restore(tevmc_local):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 200)])
+
+    snapshot = elastic.create_snapshot('test-snapshot')
+    assert snapshot['metadata']['evm_block_num'] == 200
+
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 150)])
+
+    metadata = elastic.restore_snapshot('test-snapshot')
+    assert metadata['block_num'] == 190
+
+    assert elastic.get_last_indexed_block().global_block_num == 200
+    elastic.full_integrity_check()
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_index_digests(tevmc_local, tmp_path):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+
+    test_hash = sha256(b'test_tx').hexdigest()
+    txs = [{'@raw.block': 110, '@raw.hash': test_hash}]
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 200)], txs=txs)
+
+    digests = elastic.compute_digests()
+    digest_path = tmp_path / 'digests.json'
+    digests.save(digest_path)
+
+    stored = IndexDigests.load(digest_path)
+    delta_index = f'{elastic.chain_name}-delta-v1.5-00000000'
+    assert stored.indices[delta_index].docs == 101
+    assert stored.indices[delta_index].min_block == 100
+    assert stored.indices[delta_index].max_block == 200
+
+    # same data loaded again digests the same
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 200)], txs=txs)
+
+    assert elastic.compute_digests().diff(stored) == {
+        'mismatched': [], 'missing': [], 'extra': []}
+
+    # a duplicated block only flags its own index
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 200), (150, 150)], txs=txs)
+
+    assert elastic.compute_digests().diff(stored) == {
+        'mismatched': [delta_index], 'missing': [], 'extra': []}
+
+
+@pytest.mark.randomize(False)
+@pytest.mark.services('elastic', 'kibana')
+def test_python_elastic_export_parquet(tevmc_local, tmp_path):
+    tevmc = tevmc_local
+    elastic = ElasticDriver(tevmc.config)
+
+    test_hash = sha256(b'test_tx').hexdigest()
+    txs = [
+        {'@raw.block': block, '@raw.hash': test_hash, '@raw.itxs': []}
+        for block in range(110, 120)
+    ]
+    prepare_db_for_test(
+        tevmc, datetime.now(), [(100, 200)], txs=txs)
+
+    # small pages & chunks so paging and file splits both happen
+    files = export_kind(
+        elastic, 'delta', 120, 179, tmp_path, chunk_size=25, page_size=7)
+    assert [f.name for f in files] == [
+        f'{elastic.chain_name}-delta-120-179-{n:06d}.parquet'
+        for n in range(3)
+    ]
+
+    table = pa.concat_tables([pq.read_table(f) for f in files])
+    assert table.schema == export_schema('delta')
+    assert table.column('global_block_num').to_pylist() == list(range(120, 180))
+    assert table.column('block_num').to_pylist() == list(range(110, 170))
+
+    files = export_kind(
+        elastic, 'action', 100, 115, tmp_path, page_size=4)
+    assert len(files) == 1
+
+    table = pq.read_table(files[0])
+    assert table.column('block').to_pylist() == list(range(110, 116))
+    assert set(table.column('hash').to_pylist()) == {test_hash}
+    assert set(table.column('itxs').to_pylist()) == {'[]'}
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import time
+
+import pytest
+
+from tevmc.scheduler import StartupScheduler
+
+
+def test_startup_scheduler_runs_critical_path():
+    order = []
+
+    def task(name: str, seconds: float):
+        def fn():
+            time.sleep(seconds)
+            order.append(name)
+
+        return fn
+
+    scheduler = StartupScheduler()
+    scheduler.add('redis', task('redis', 0.1))
+    scheduler.add('elastic', task('elastic', 0.3))
+    scheduler.add('nodeos', task('nodeos', 0.3))
+    scheduler.add('indexer', task('indexer', 0.1), deps=['nodeos', 'elastic'])
+    scheduler.add('rpc', task('rpc', 0.1), deps=['indexer', 'redis'])
+    # deps on services not launched are dropped
+    scheduler.add('beats', task('beats', 0.1), deps=['elastic', 'kibana'])
+
+    start = time.monotonic()
+    timings = scheduler.run()
+    elapsed = time.monotonic() - start
+
+    # elastic/nodeos -> indexer -> rpc, not the 1.0s sum
+    assert elapsed < 0.8
+
+    assert order.index('indexer') > max(order.index('nodeos'), order.index('elastic'))
+    assert order.index('rpc') > order.index('indexer')
+    assert timings['indexer']['started_at'] >= timings['nodeos']['finished_at']
+    assert timings['beats']['deps'] == ['elastic']
+
+
+def test_startup_scheduler_failure_and_cycles():
+    ran = []
+
+    def fail():
+        raise ValueError('boom')
+
+    scheduler = StartupScheduler()
+    scheduler.add('nodeos', fail)
+    scheduler.add('indexer', lambda: ran.append('indexer'), deps=['nodeos'])
+
+    with pytest.raises(ValueError, match='boom'):
+        scheduler.run()
+
+    assert ran == []
+
+    scheduler = StartupScheduler()
+    scheduler.add('a', lambda: None, deps=['b'])
+    scheduler.add('b', lambda: None, deps=['a'])
+
+    with pytest.raises(ValueError, match='cycle'):
+        scheduler.run()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from tevmc.testing.database import (
+    InternalEvmTransaction,
+    StorageEosioAction,
+    StorageEosioDelta,
+    StorageEvmTransaction
+)
+
+
+ACTION_SOURCE = {
+    '@timestamp': '2024-01-01T00:00:00.000',
+    'trx_id': 'ab' * 32,
+    'action_ordinal': 1,
+    'signatures': ['SIG_K1_xyz'],
+    '@raw': {
+        'hash': '0x' + 'cd' * 32,
+        'from': '0x' + '11' * 20,
+        'block': 1234,
+        'gasused': 21000,
+        'logs': [{'topics': ['0x0']}],
+        'itxs': [
+            {'callType': 'call', 'from': '0x' + '22' * 20, 'gasUsed': 5},
+            {'callType': 'create', 'from': '0x' + '33' * 20, 'depth': 1}
+        ]
+    }
+}
+
+
+def test_storage_delta_from_source():
+    delta = StorageEosioDelta({
+        '@timestamp': '2024-01-01T00:00:00.000',
+        'block_num': 40,
+        '@global': {'block_num': 10},
+        '@evmBlockHash': 'aa' * 32,
+        'gasUsed': '0'
+    })
+
+    assert delta.block_num == 40
+    assert delta.global_block_num == 10
+    assert delta.evm_block_hash == 'aa' * 32
+    assert delta.gas_used == '0'
+    assert delta.code is None
+
+    # literal dotted keys resolve like nested ones
+    assert StorageEosioDelta({'@global.block_num': 11}).global_block_num == 11
+
+    # slotted, no per instance dict
+    assert not hasattr(delta, '__dict__')
+    with pytest.raises(AttributeError):
+        delta.unknown = 1
+
+
+def test_storage_delta_field_selection():
+    delta = StorageEosioDelta(
+        {'block_num': 40, '@global': {'block_num': 10}, 'gasUsed': '0'},
+        fields=['block_num'])
+
+    assert delta.block_num == 40
+    assert delta.global_block_num is None
+    assert delta.gas_used is None
+
+    assert StorageEosioDelta.source_fields(['block_num', 'global_block_num']) == [
+        'block_num', '@global.block_num']
+
+
+def test_storage_action_lazy_parsing():
+    action = StorageEosioAction(ACTION_SOURCE)
+
+    assert action.trx_id == 'ab' * 32
+    assert action.signatures == ['SIG_K1_xyz']
+
+    # nested docs are only built on first access, then reused
+    assert action._raw is None
+    raw = action.raw
+    assert isinstance(raw, StorageEvmTransaction)
+    assert action.raw is raw
+
+    assert raw.hash == '0x' + 'cd' * 32
+    assert raw.block == 1234
+    assert raw.from_address == '0x' + '11' * 20
+
+    assert raw._itxs is None
+    itxs = raw.itxs
+    assert [type(itx) for itx in itxs] == [InternalEvmTransaction] * 2
+    assert raw.itxs is itxs
+    assert itxs[0].call_type == 'call'
+    assert itxs[0].gas_used == 5
+    assert itxs[1].depth == 1
+
+    assert '_itxs_source' not in raw.to_dict()
+    assert '_raw_source' not in action.to_dict()
+
+
+def test_storage_action_field_selection():
+    action = StorageEosioAction(ACTION_SOURCE, fields=['trx_id', 'raw'])
+
+    assert action.trx_id == 'ab' * 32
+    assert action.signatures is None
+    assert action.raw.block == 1234
+
+    assert StorageEosioAction.source_fields(['trx_id', 'raw']) == ['trx_id', '@raw']
+    assert StorageEvmTransaction.source_fields(['hash', 'itxs']) == ['hash', 'itxs']
+
+    # missing nested docs parse as empty
+    empty = StorageEosioAction({'trx_id': 'ff'})
+    assert empty.raw.hash is None
+    assert empty.raw.itxs == []
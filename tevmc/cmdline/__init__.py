@@ -10,3 +10,7 @@ from .clean import clean
 from .stream import stream
 from .wait import wait_init, wait_tx
 from .repair import repair
+from .export import export
+from .optimize import optimize
+from .snapshot import es_snapshot, es_restore
+from .digest import digest
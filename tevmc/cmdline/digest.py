@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import sys
+
+from pathlib import Path
+
+import click
+import requests
+
+from tevmc.config import load_config
+from tevmc.testing.database import (
+    INDEX_DIGEST_FILE,
+    ElasticDriver,
+    IndexDigests
+)
+
+from .cli import cli
+
+
+def load_remote_digests(source: str, timeout: float = 30.0) -> IndexDigests | None:
+    '''Digests from a json file or from another node's daemon `/digest`
+    endpoint, None if the daemon has none yet or is still computing them.
+    '''
+    if source.startswith('http://') or source.startswith('https://'):
+        resp = requests.get(source, timeout=timeout)
+        if resp.status_code in [202, 404]:
+            return None
+
+        resp.raise_for_status()
+        return IndexDigests.from_dict(resp.json())
+
+    return IndexDigests.load(Path(source))
+
+
+@cli.command()
+@click.option(
+    '--config', default='tevmc.json',
+    help='Unified config file name.')
+@click.option(
+    '--target-dir', default='.',
+    help='target')
+@click.option(
+    '--compare', default=None,
+    help='Digest file or daemon /digest url of another node to diff against.')
+@click.option(
+    '--reuse/--no-reuse', default=True,
+    help='Reuse stored digests of write blocked indices with unchanged doc count.')
+def digest(config, target_dir, compare, reuse):
+    """Compute per index digests of delta & action docs and store them next
+    to the node config, optionally diff them against another node.
+    """
+    try:
+        config = load_config(target_dir, config)
+
+    except FileNotFoundError:
+        print('Config not found.')
+        sys.exit(1)
+
+    digest_path = Path(target_dir).resolve() / INDEX_DIGEST_FILE
+
+    es = ElasticDriver(config)
+    digests = es.compute_digests(
+        previous=IndexDigests.load(digest_path) if reuse else None)
+    digests.save(digest_path)
+
+    print(f'{len(digests.indices)} index digests written to {digest_path}')
+
+    if not compare:
+        return
+
+    other = load_remote_digests(compare)
+    if not other:
+        print(
+            f'couldn\'t load digests from {compare}, if it\'s a daemon url '
+            'request it with ?refresh=1 first')
+        sys.exit(1)
+
+    diff = digests.diff(other)
+    for key, names in diff.items():
+        for name in names:
+            print(f'{key}: {name}')
+
+    if any(len(names) > 0 for names in diff.values()):
+        sys.exit(1)
+
+    print('digests match')
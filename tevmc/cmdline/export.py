@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import logging
+
+from pathlib import Path
+
+import click
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tevmc.config import load_config
+from tevmc.testing.database import (
+    ElasticDriver,
+    StorageDocument,
+    StorageEosioDelta,
+    StorageEvmTransaction,
+    get_source_value
+)
+
+from .cli import cli
+
+
+INT_COLUMNS = {
+    'block_num', 'global_block_num', 'block',
+    'trx_index', 'epoch', 'action_ordinal'
+}
+JSON_COLUMNS = {'itxs', 'logs', 'errors', 'signatures'}
+
+# action docs get these on top of the evm transaction fields in '@raw'
+ACTION_COLUMNS = [
+    ('timestamp', '@timestamp'),
+    ('trx_id', 'trx_id'),
+    ('action_ordinal', 'action_ordinal'),
+    ('signatures', 'signatures')
+]
+
+
+def document_columns(
+    doc_cls: type[StorageDocument],
+    prefix: str = ''
+) -> list[tuple[str, str]]:
+    '''(column name, _source path) pairs for a storage document class,
+    private lazily parsed attrs like `_itxs_source` map to `itxs`.
+    '''
+    return [
+        (attr.strip('_').removesuffix('_source'), prefix + path)
+        for attr, path in doc_cls._fields.items()
+    ]
+
+
+def export_columns(kind: str) -> list[tuple[str, str]]:
+    if kind == 'delta':
+        return document_columns(StorageEosioDelta)
+
+    return ACTION_COLUMNS + document_columns(StorageEvmTransaction, prefix='@raw.')
+
+
+def export_schema(kind: str) -> pa.Schema:
+    fields = []
+    for name, _ in export_columns(kind):
+        fields.append(pa.field(
+            name, pa.int64() if name in INT_COLUMNS else pa.string()))
+
+    return pa.schema(fields)
+
+
+def _to_column_value(name: str, value):
+    if value is None:
+        return None
+
+    if name in INT_COLUMNS:
+        return int(value)
+
+    if name in JSON_COLUMNS or isinstance(value, (dict, list)):
+        return json.dumps(value)
+
+    return str(value)
+
+
+def export_kind(
+    es: ElasticDriver,
+    kind: str,
+    lower: int,
+    upper: int,
+    out_dir: Path,
+    chunk_size: int = 100_000,
+    page_size: int = 5_000,
+    compression: str = 'zstd'
+) -> list[Path]:
+    '''Stream `kind` docs in [lower, upper] into parquet files of at most
+    `chunk_size` rows, only one chunk is ever held in memory.
+    '''
+    columns = export_columns(kind)
+    schema = export_schema(kind)
+    source = [path for _, path in columns]
+
+    written = []
+    buffer = {name: [] for name, _ in columns}
+    rows = 0
+
+    def flush():
+        nonlocal buffer, rows
+        if rows == 0:
+            return
+
+        path = out_dir / f'{es.chain_name}-{kind}-{lower}-{upper}-{len(written):06d}.parquet'
+        table = pa.Table.from_pydict(buffer, schema=schema)
+        pq.write_table(table, path, compression=compression)
+        written.append(path)
+        logging.info(f'wrote {rows} {kind} rows to {path}')
+
+        buffer = {name: [] for name, _ in columns}
+        rows = 0
+
+    for doc in es.iter_documents(
+        kind, lower, upper, source=source, page_size=page_size
+    ):
+        for name, path in columns:
+            buffer[name].append(_to_column_value(name, get_source_value(doc, path)))
+
+        rows += 1
+        if rows >= chunk_size:
+            flush()
+
+    flush()
+
+    return written
+
+
+@cli.command()
+@click.option(
+    '--config', default='tevmc.json',
+    help='Unified config file name.')
+@click.option(
+    '--target-dir', default='.',
+    help='target')
+@click.option(
+    '--out', default='export',
+    help='Directory to write the parquet files into.')
+@click.option(
+    '--kind', default='all',
+    type=click.Choice(['all', 'delta', 'action']),
+    help='Which documents to export.')
+@click.option(
+    '--chunk-size', default=100_000,
+    help='Max rows per parquet file.')
+@click.option(
+    '--page-size', default=5_000,
+    help='Documents per elastic search_after page.')
+@click.argument('start-block', type=int)
+@click.argument('end-block', type=int)
+def export(config, target_dir, out, kind, chunk_size, page_size, start_block, end_block):
+    """Export delta & action documents on an evm block range to parquet.
+    """
+    try:
+        config = load_config(target_dir, config)
+
+    except FileNotFoundError:
+        print('Config not found.')
+        sys.exit(1)
+
+    out_dir = Path(out).resolve()
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    es = ElasticDriver(config)
+
+    kinds = ['delta', 'action'] if kind == 'all' else [kind]
+    for _kind in kinds:
+        files = export_kind(
+            es, _kind, start_block, end_block, out_dir,
+            chunk_size=chunk_size, page_size=page_size)
+        print(f'{_kind}: {len(files)} files written to {out_dir}')
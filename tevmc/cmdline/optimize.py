@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import sys
+
+import click
+
+from tevmc.config import load_config
+from tevmc.testing.database import ElasticDriver
+
+from .cli import cli
+
+
+@cli.command()
+@click.option(
+    '--config', default='tevmc.json',
+    help='Unified config file name.')
+@click.option(
+    '--target-dir', default='.',
+    help='target')
+@click.option(
+    '--dry-run/--no-dry-run', default=False,
+    help='Only list the indices that would be optimized.')
+def optimize(config, target_dir, dry_run):
+    """Force-merge & write block delta and action indices whose block range
+    is complete.
+    """
+    try:
+        config = load_config(target_dir, config)
+
+    except FileNotFoundError:
+        print('Config not found.')
+        sys.exit(1)
+
+    es = ElasticDriver(config)
+    optimized = es.optimize_completed_indices(dry_run=dry_run)
+
+    if len(optimized) == 0:
+        print('no indices to optimize')
+
+    for index in optimized:
+        print(f'{"would optimize" if dry_run else "optimized"} {index}')
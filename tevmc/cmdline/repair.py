@@ -13,12 +13,25 @@ from docker.types import Mount
 from leap.sugar import download_snapshot
 from tevmc.cmdline.build import build_service
 from tevmc.config import load_config
-from tevmc.testing.database import ElasticDataEmptyError, ElasticDriver
+from tevmc.testing.database import (
+    INTEGRITY_CHECKPOINT_FILE,
+    ElasticDataEmptyError,
+    ElasticDriver
+)
+from tevmc.testing.async_database import BlockingAsyncElasticDriver
 
 from .cli import cli
 
 
-def perform_data_repair(config_path, progress=True):
+REPAIR_WORK_LIST_FILE = 'repair-worklist.json'
+
+
+def perform_data_repair(
+    config_path,
+    progress=True,
+    use_async=False,
+    incremental=False
+):
     from tevmc.tevmc import TEVMController
 
     root_pwd = config_path.parent.resolve()
@@ -33,17 +46,39 @@ def perform_data_repair(config_path, progress=True):
             'mainnet or testnet nodes'
         )
 
-    chain_type = 'Telos Mainnet - v6' if 'mainnet' in chain_name else 'Telos Testnet - v6'
-
     logging.info('repairing elastic data...')
 
     with TEVMController(
         config, root_pwd=root_pwd, services=['elastic']):
         time.sleep(5)
-        es = ElasticDriver(config)
-        last_valid_nums = es.repair_data()
+        if use_async:
+            if incremental:
+                raise ValueError(
+                    'incremental repair is only supported by the sync driver')
+
+            es = BlockingAsyncElasticDriver(config)
+            last_valid_nums = es.repair_data()
+
+        else:
+            es = ElasticDriver(config)
+            last_valid_nums = es.repair_data(
+                checkpoint_path=(
+                    root_pwd / INTEGRITY_CHECKPOINT_FILE if incremental else None))
 
     logging.info(f'done, last valid blocks {last_valid_nums}')
+
+    reset_nodeos_to_block(
+        config_path, config, last_valid_nums[0], progress=progress)
+
+
+def reset_nodeos_to_block(config_path, config, block_num, progress=True):
+    '''Download the closest nodeos snapshot to `block_num`, point nodeos &
+    translator at it, wipe nodeos data and rebuild the nodeos image.
+    '''
+    root_pwd = config_path.parent.resolve()
+    chain_name = config['telos-evm-rpc']['elastic_prefix']
+    chain_type = 'Telos Mainnet - v6' if 'mainnet' in chain_name else 'Telos Testnet - v6'
+
     logging.info('downloading closest snapshot...')
 
     docker_dir = root_pwd / 'docker'
@@ -52,14 +87,14 @@ def perform_data_repair(config_path, progress=True):
     nodeos_conf_dir /= config['nodeos']['conf_dir']
 
     snap_path = download_snapshot(
-        nodeos_conf_dir, last_valid_nums[0],
+        nodeos_conf_dir, block_num,
         network=chain_type, progress=progress)
 
     logging.info('updating tevmc.json...')
 
     config['nodeos']['snapshot'] = f'/root/{snap_path.name}'
 
-    config['telosevm-translator']['start_block'] = last_valid_nums[0]
+    config['telosevm-translator']['start_block'] = block_num
 
     with open(config_path, 'w+') as uni_conf:
         uni_conf.write(json.dumps(config, indent=4))
@@ -86,13 +121,76 @@ def perform_data_repair(config_path, progress=True):
         root_pwd, 'nodeos', config)
 
 
+def perform_targeted_repair(config_path):
+    '''Delete only the damaged block ranges and write the list of ranges
+    the translator has to backfill, keeps nodeos data & snapshot intact.
+
+    Nothing consumes the work list automatically, see "Repairing elastic
+    data" in the README for how to backfill each entry.
+    '''
+    from tevmc.tevmc import TEVMController
+
+    root_pwd = config_path.parent.resolve()
+    config = load_config(str(root_pwd), config_path.name)
+
+    logging.info('looking for damaged block ranges...')
+
+    with TEVMController(
+        config, root_pwd=root_pwd, services=['elastic']):
+        time.sleep(5)
+        es = ElasticDriver(config)
+        work_list = es.targeted_repair()
+
+    work_list_path = root_pwd / REPAIR_WORK_LIST_FILE
+    with open(work_list_path, 'w+') as work_list_file:
+        work_list_file.write(json.dumps(work_list, indent=4))
+
+    logging.info(
+        f'done, {len(work_list)} ranges to backfill written to {work_list_path}')
+
+    for entry in work_list:
+        logging.info(
+            f'backfill: run the translator with start_block {entry["start_block"]}, '
+            f'stop_block {entry["end_block"]} and prev_hash {entry["prev_hash"]}')
+
+    return work_list
+
+
 @cli.command()
 @click.option(
     '--config', default='tevmc.json',
     help='Path to config file.')
-def repair(config):
+@click.option(
+    '--targeted/--full', default=False,
+    help='Only delete damaged ranges and emit a backfill work list, '
+         'instead of purging everything past the first damaged block, '
+         'not compatible with --async-driver or --incremental.')
+@click.option(
+    '--async-driver/--sync-driver', default=False,
+    help='Run the full integrity check & purge with the asyncio driver, '
+         'not compatible with --incremental.')
+@click.option(
+    '--incremental', is_flag=True, default=False,
+    help='Only check blocks past the last integrity checkpoint, plus the '
+         'range of any index that changed since.')
+def repair(config, targeted, async_driver, incremental):
+    if targeted and (async_driver or incremental):
+        raise click.UsageError(
+            '--targeted always runs a full scan with the sync driver, '
+            'drop --async-driver & --incremental')
+
+    if async_driver and incremental:
+        raise click.UsageError(
+            '--incremental needs the integrity checkpoint, which only the '
+            'sync driver keeps, drop --async-driver')
+
     try:
-        perform_data_repair(Path(config))
+        if targeted:
+            perform_targeted_repair(Path(config))
+
+        else:
+            perform_data_repair(
+                Path(config), use_async=async_driver, incremental=incremental)
 
     except ElasticDataEmptyError:
         logging.info('no data to repair')
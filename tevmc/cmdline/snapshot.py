@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import logging
+
+from pathlib import Path
+
+import click
+
+from tevmc.config import load_config
+from tevmc.testing.database import ElasticDataEmptyError, ElasticDriver
+
+from .cli import cli
+from .repair import reset_nodeos_to_block
+
+
+@cli.command()
+@click.option(
+    '--config', default='tevmc.json',
+    help='Unified config file name.')
+@click.option(
+    '--target-dir', default='.',
+    help='target')
+@click.option(
+    '--list', 'list_only', is_flag=True, default=False,
+    help='List existing snapshots instead of creating one.')
+@click.argument('name', required=False)
+def es_snapshot(config, target_dir, list_only, name):
+    """Snapshot the chain delta & action indices of a running node into the
+    elasticsearch snapshots dir, tagged with the last indexed block.
+    """
+    try:
+        config = load_config(target_dir, config)
+
+    except FileNotFoundError:
+        print('Config not found.')
+        sys.exit(1)
+
+    es = ElasticDriver(config)
+
+    if list_only:
+        for snap in es.list_snapshots():
+            print(f'{snap["snapshot"]}: block {snap["metadata"]["block_num"]}')
+
+        return
+
+    try:
+        snapshot = es.create_snapshot(name)
+
+    except ElasticDataEmptyError:
+        print('no data to snapshot')
+        sys.exit(1)
+
+    print(
+        f'snapshot {snapshot["snapshot"]} created, '
+        f'block {snapshot["metadata"]["block_num"]}')
+
+
+def perform_es_restore(config_path, name=None, progress=True):
+    '''Restore a snapshot with only elastic up, then reset nodeos to a
+    snapshot close to the restored block so both start from the same point.
+    '''
+    from tevmc.tevmc import TEVMController
+
+    root_pwd = config_path.parent.resolve()
+    config = load_config(str(root_pwd), config_path.name)
+
+    with TEVMController(
+        config, root_pwd=root_pwd, services=['elastic']):
+        time.sleep(5)
+        es = ElasticDriver(config)
+        metadata = es.restore_snapshot(name)
+
+    logging.info(f'elastic restored up to block {metadata["block_num"]}')
+
+    reset_nodeos_to_block(
+        config_path, config, metadata['block_num'], progress=progress)
+
+    return metadata
+
+
+@cli.command()
+@click.option(
+    '--config', default='tevmc.json',
+    help='Path to config file.')
+@click.argument('name', required=False)
+def es_restore(config, name):
+    """Restore chain indices from snapshot NAME (latest by default) and
+    point nodeos & translator at the matching block, node must be down.
+
+    To bootstrap a new node copy the snapshots dir of the source node's
+    elasticsearch docker path into the new one first.
+    """
+    metadata = perform_es_restore(Path(config), name=name)
+    print(f'restored up to block {metadata["block_num"]}')
@@ -1,15 +1,59 @@
 #!/usr/bin/env python3
 
+import codecs
 import subprocess
 
 from pathlib import Path
 
 import click
+import requests
 
 from .cli import cli
 from ..config import load_config
 
 
+def stream_from_daemon(
+    config: dict,
+    source: str,
+    backlog: str,
+    timeout: tuple[float, float] = (5.0, 300.0)
+) -> bool:
+    '''Print `source` logs from the daemon log hub, False if the daemon
+    can't be reached.
+
+    `timeout` is (connect, read), the read timeout is the longest wait
+    between two chunks, a quiet service ends the stream once it passes.
+    '''
+    port = config.get('daemon', {}).get('port')
+    if not port:
+        return False
+
+    try:
+        resp = requests.get(
+            f'http://127.0.0.1:{port}/logs/{source}',
+            params={'backlog': backlog}, stream=True, timeout=timeout)
+
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        return False
+
+    if resp.status_code != 200:
+        return False
+
+    # chunks can split multi byte chars, decode across them
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    try:
+        for chunk in resp.iter_content(chunk_size=None):
+            print(decoder.decode(chunk), end='', flush=True)
+
+    except requests.exceptions.ConnectionError:
+        # read timeouts while streaming surface as connection errors
+        print(f'\nno output from daemon in {timeout[1]}s, stopping.')
+
+    print(decoder.decode(b'', final=True), end='', flush=True)
+
+    return True
+
+
 @cli.command()
 @click.option(
     '--pid', default='tevmc.pid',
@@ -23,8 +67,11 @@ from ..config import load_config
 @click.option(
     '--config', default='tevmc.json',
     help='Unified config file name.')
+@click.option(
+    '--backlog', default='100',
+    help='Lines already buffered by the daemon to print first, or \'all\'.')
 @click.argument('source')
-def stream(pid, logpath, target_dir, config, source):
+def stream(pid, logpath, target_dir, config, backlog, source):
     """Stream logs from either the tevmc daemon or a container.
     """
     config = load_config(target_dir, config)
@@ -47,6 +94,9 @@ def stream(pid, logpath, target_dir, config, source):
         source = 'telos-evm-rpc'
 
     try:
+        if source != 'daemon' and stream_from_daemon(config, source, backlog):
+            return
+
         if source == 'daemon':
             subprocess.run(['tail', '-f', logpath])
             return
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 
 import time
-import logging
 
 import click
 import requests
 
+from tevmc.logs import LogFollower
+
 from .cli import cli
 
 
@@ -14,15 +15,11 @@ from .cli import cli
     '--logpath', default='tevmc.log',
     help='Log file path.')
 def wait_init(logpath):
-    with open(logpath, 'r') as logfile:
-        while True:
-            line = logfile.readline()
-            if line:
-                print(line, end='', flush=True)
-                if 'control point reached' in line:
-                    break
-            else:
-                time.sleep(1)
+    for line in LogFollower(logpath, lines=None, filters=None, poll_interval=1.0):
+        line = line.decode('utf-8', errors='replace')
+        print(line, end='', flush=True)
+        if 'control point reached' in line:
+            break
 
 @cli.command()
 @click.argument('tx-id')
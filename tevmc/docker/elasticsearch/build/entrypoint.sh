@@ -1,4 +1,4 @@
-mkdir -p /home/elasticsearch/data /home/elasticsearch/logs
+mkdir -p /home/elasticsearch/data /home/elasticsearch/logs /home/elasticsearch/snapshots
 
 chown -R elasticsearch:elasticsearch /home/elasticsearch
 echo "permissions setup done."
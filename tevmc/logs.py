@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import time
+import logging
+import threading
+
+from typing import Callable, Iterable, Iterator, Optional
+from pathlib import Path
+from collections import deque
+
+
+# lines nodeos spams on every block that nobody waits on
+DEFAULT_LOG_FILTERS = [
+    rb'clear_expired_input_'
+]
+
+
+def compile_log_filters(
+    patterns: Optional[Iterable[bytes | re.Pattern]]
+) -> Optional[re.Pattern]:
+    '''Join byte patterns into a single regex so each line is matched once.
+    '''
+    if not patterns:
+        return None
+
+    return re.compile(b'|'.join(
+        b'(?:' + (p.pattern if isinstance(p, re.Pattern) else p) + b')'
+        for p in patterns
+    ))
+
+
+def tail_offset(fd: int, lines: int, block_size: int = 64 * 1024) -> int:
+    '''Offset of the first of the last `lines` lines of an open file,
+    reading backwards one block at a time like `tail -n`.
+    '''
+    size = os.fstat(fd).st_size
+    if lines <= 0 or size == 0:
+        return size
+
+    pos = size
+    # a trailing newline terminates the last line, doesn't start a new one
+    skip_last = os.pread(fd, 1, size - 1) == b'\n'
+    found = 0
+    while pos > 0:
+        read_size = min(block_size, pos)
+        pos -= read_size
+        block = os.pread(fd, read_size, pos)
+
+        end = len(block)
+        if skip_last and pos + end == size:
+            end -= 1
+
+        while True:
+            idx = block.rfind(b'\n', 0, end)
+            if idx == -1:
+                break
+
+            found += 1
+            if found == lines:
+                return pos + idx + 1
+
+            end = idx
+
+    return 0
+
+
+class LogFollower:
+    '''In-process `tail -n lines -f` over a log file yielding raw lines.
+
+    Polls the file for new data, follows it across rotation (path points to
+    a new inode) and truncation, and drops lines matching any of `filters`
+    before they are decoded. Iteration stops after `timeout` seconds, with
+    `timed_out` set, or when `close` is called.
+    '''
+
+    def __init__(
+        self,
+        path: Path | str,
+        lines: Optional[int] = 100,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.1,
+        filters: Optional[Iterable[bytes | re.Pattern]] = DEFAULT_LOG_FILTERS,
+        wait_for_file: float = 3.0,
+        read_size: int = 64 * 1024
+    ):
+        self.path = Path(path)
+        self.lines = lines
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.filter = compile_log_filters(filters)
+        self.wait_for_file = wait_for_file
+        self.read_size = read_size
+
+        self.timed_out = False
+        self._closed = False
+        self._fd = None
+
+    def close(self):
+        self._closed = True
+
+    def _open(self, deadline: float) -> bool:
+        while not self._closed:
+            try:
+                self._fd = os.open(self.path, os.O_RDONLY)
+                return True
+
+            except FileNotFoundError:
+                if time.monotonic() > deadline:
+                    raise
+
+                time.sleep(self.poll_interval)
+
+        return False
+
+    def _rotated(self) -> bool:
+        try:
+            st = os.stat(self.path)
+
+        except FileNotFoundError:
+            return False
+
+        return st.st_ino != os.fstat(self._fd).st_ino
+
+    def __iter__(self) -> Iterator[bytes]:
+        start = time.monotonic()
+        deadline = None if self.timeout is None else start + self.timeout
+
+        if not self._open(start + self.wait_for_file):
+            return
+
+        pos = 0 if self.lines is None else tail_offset(self._fd, self.lines)
+        buffer = bytearray()
+        try:
+            while not self._closed:
+                chunk = os.pread(self._fd, self.read_size, pos)
+                if chunk:
+                    pos += len(chunk)
+                    buffer += chunk
+
+                    line_start = 0
+                    while True:
+                        idx = buffer.find(b'\n', line_start)
+                        if idx == -1:
+                            break
+
+                        line = bytes(buffer[line_start:idx + 1])
+                        line_start = idx + 1
+                        if self.filter and self.filter.search(line):
+                            continue
+
+                        yield line
+
+                    del buffer[:line_start]
+                    continue
+
+                if deadline is not None and time.monotonic() > deadline:
+                    self.timed_out = True
+                    return
+
+                if self._rotated():
+                    # current file fully drained, switch to the new one
+                    os.close(self._fd)
+                    self._fd = None
+                    if not self._open(time.monotonic() + self.wait_for_file):
+                        return
+
+                    pos = 0
+                    buffer.clear()
+                    continue
+
+                if os.fstat(self._fd).st_size < pos:
+                    # truncated in place
+                    pos = 0
+                    buffer.clear()
+                    continue
+
+                time.sleep(self.poll_interval)
+
+        finally:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class LogRing:
+    '''Bounded buffer of log lines addressed by ever increasing offsets,
+    once full the oldest lines are dropped and readers behind them skip
+    ahead to the oldest kept line.
+    '''
+
+    def __init__(self, size: int = 10_000):
+        self.size = size
+        self._lines = deque(maxlen=size)
+        self._end = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def start(self) -> int:
+        with self._cond:
+            return self._end - len(self._lines)
+
+    @property
+    def end(self) -> int:
+        with self._cond:
+            return self._end
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def append(self, line: bytes):
+        with self._cond:
+            self._lines.append(line)
+            self._end += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def read(self, offset: int, max_lines: int = 1_000) -> tuple[list[bytes], int]:
+        '''Lines from `offset` on and the offset to continue reading from.
+        '''
+        with self._cond:
+            start = self._end - len(self._lines)
+            offset = max(offset, start)
+            count = min(self._end - offset, max_lines)
+            first = offset - start
+            lines = [self._lines[i] for i in range(first, first + count)]
+            return lines, offset + count
+
+    def wait(self, offset: int, timeout: Optional[float] = None) -> bool:
+        '''Block until a line past `offset` exists, False on timeout or if
+        the ring is closed.
+        '''
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._end > offset or self._closed, timeout=timeout)
+            return self._end > offset
+
+
+class LogSubscription:
+    '''Iterator over a `LogRing` from a given offset.
+
+    Stops on `timeout` seconds total or `idle_timeout` seconds without new
+    lines, setting `timed_out`, or when the ring closes.
+    '''
+
+    def __init__(
+        self,
+        ring: LogRing,
+        offset: int,
+        timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None
+    ):
+        self.ring = ring
+        self.offset = offset
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.timed_out = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            lines, self.offset = self.ring.read(self.offset)
+            if lines:
+                yield from lines
+                continue
+
+            if self.ring.closed:
+                return
+
+            wait = self.idle_timeout
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                wait = left if wait is None else min(wait, left)
+
+            if not self.ring.wait(self.offset, timeout=wait):
+                if self.ring.closed:
+                    return
+
+                self.timed_out = True
+                return
+
+
+class LogHub:
+    '''Reads a log source exactly once on a background thread into a
+    `LogRing`, any number of subscribers consume it from their own offset.
+
+    `open_source(first)` returns an iterable of raw lines, it is called
+    again whenever the previous one ends (container restarted, stream
+    dropped), with `first` False so it can skip what was already read.
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        open_source: Callable[[bool], Iterable[bytes]],
+        size: int = 10_000,
+        retry_interval: float = 1.0,
+        logger = None
+    ):
+        self.name = name
+        self.open_source = open_source
+        self.ring = LogRing(size=size)
+        self.retry_interval = retry_interval
+        self.logger = logger if logger else logging.getLogger()
+
+        self._stop = threading.Event()
+        self._source = None
+        self._thread = None
+
+    def _run(self):
+        first = True
+        while not self._stop.is_set():
+            try:
+                self._source = self.open_source(first)
+                first = False
+                for line in self._source:
+                    self.ring.append(line)
+                    if self._stop.is_set():
+                        break
+
+            except Exception as e:
+                self.logger.debug(f'log hub {self.name}: source ended: {e}')
+
+            self._stop.wait(self.retry_interval)
+
+        self.ring.close()
+
+    def start(self):
+        if self._thread:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run, name=f'tevmc-log-hub-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if isinstance(self._source, LogFollower):
+            self._source.close()
+
+        self.ring.close()
+
+    def subscribe(
+        self,
+        backlog: Optional[int] = 0,
+        timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None
+    ) -> LogSubscription:
+        '''Subscription starting `backlog` lines before the current end, or
+        at the oldest buffered line if `backlog` is None.
+        '''
+        if backlog is None:
+            offset = self.ring.start
+
+        else:
+            offset = max(self.ring.end - backlog, self.ring.start)
+
+        return LogSubscription(
+            self.ring, offset, timeout=timeout, idle_timeout=idle_timeout)
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+
+import time
+import logging
+import threading
+
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+from collections import deque
+
+from tevmc.testing.database import ElasticDriver
+
+
+class IndexingProgress:
+    '''Snapshot of indexer progress, `rate` & `head_rate` are blocks per
+    second exponential moving averages.
+    '''
+
+    def __init__(
+        self,
+        indexed_block: Optional[int] = None,
+        indexed_evm_block: Optional[int] = None,
+        head_block: Optional[int] = None,
+        rate: Optional[float] = None,
+        head_rate: Optional[float] = None,
+        updated_at: Optional[float] = None,
+        samples: int = 0
+    ):
+        self.indexed_block = indexed_block
+        self.indexed_evm_block = indexed_evm_block
+        self.head_block = head_block
+        self.rate = rate
+        self.head_rate = head_rate
+        self.updated_at = updated_at
+        self.samples = samples
+
+    @property
+    def lag(self) -> Optional[int]:
+        if self.indexed_block is None or self.head_block is None:
+            return None
+
+        return max(self.head_block - self.indexed_block, 0)
+
+    @property
+    def eta(self) -> Optional[float]:
+        '''Seconds until the indexer catches up with head, None while the
+        rate is unknown or the indexer is not gaining on head.
+        '''
+        lag = self.lag
+        if lag is None or self.rate is None:
+            return None
+
+        if lag == 0:
+            return 0.0
+
+        catch_up_rate = self.rate - (self.head_rate or 0.0)
+        if catch_up_rate <= 0:
+            return None
+
+        return lag / catch_up_rate
+
+    def to_dict(self) -> dict:
+        return {
+            'indexed_block': self.indexed_block,
+            'indexed_evm_block': self.indexed_evm_block,
+            'head_block': self.head_block,
+            'lag': self.lag,
+            'rate': self.rate,
+            'head_rate': self.head_rate,
+            'eta': self.eta,
+            'updated_at': self.updated_at,
+            'samples': self.samples
+        }
+
+
+def ema(prev: Optional[float], value: float, alpha: float) -> float:
+    if prev is None:
+        return value
+
+    return (alpha * value) + ((1 - alpha) * prev)
+
+
+class PollingMonitor(ABC):
+    '''Calls `sample` every `interval` seconds on a daemon thread until
+    `stop`, sample errors are logged and don't stop the loop, subclasses
+    implement `sample`.
+    '''
+
+    name = 'tevmc-monitor'
+
+    def __init__(
+        self,
+        interval: float,
+        stop_timeout: float = 10.0,
+        logger = None
+    ):
+        self.interval = interval
+        self.stop_timeout = stop_timeout
+        self.logger = logger if logger else logging.getLogger()
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    @abstractmethod
+    def sample(self):
+        ...
+
+    def _run(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                self.sample()
+
+            except Exception as e:
+                self.logger.warning(f'{self.name}: sample failed: {e}')
+
+            stop.wait(self.interval)
+
+    def start(self):
+        if self._thread:
+            return
+
+        # fresh event, a thread left behind by a timed out `stop` keeps
+        # seeing its own one set
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+
+        self._stop.set()
+        self._thread.join(timeout=self.stop_timeout)
+        if self._thread.is_alive():
+            # daemon thread, it exits once the current sample returns
+            self.logger.warning(
+                f'{self.name}: sample still running after {self.stop_timeout}s, '
+                'not waiting on it')
+
+        self._thread = None
+
+
+class IndexLagMonitor(PollingMonitor):
+    '''Polls the newest indexed delta doc and the chain head, keeps an
+    `IndexingProgress` up to date, either by calling `sample` or from a
+    background thread with `start`.
+
+    `get_head` is only called every `head_interval` seconds so remote
+    endpoints can be used as the head source.
+    '''
+
+    name = 'tevmc-lag-monitor'
+
+    def __init__(
+        self,
+        es: ElasticDriver,
+        get_head: Callable[[], int],
+        interval: float = 5.0,
+        head_interval: float = 60.0,
+        alpha: float = 0.3,
+        logger = None
+    ):
+        super().__init__(interval, logger=logger)
+        self.es = es
+        self.get_head = get_head
+        self.head_interval = head_interval
+        self.alpha = alpha
+
+        self._lock = threading.Lock()
+        self._progress = IndexingProgress()
+        self._last_indexed = None
+        self._last_head = None
+
+    @property
+    def progress(self) -> IndexingProgress:
+        with self._lock:
+            return self._progress
+
+    def _refresh_head(self, now: float, prev: IndexingProgress):
+        if (self._last_head is not None and
+            now - self._last_head[0] < self.head_interval):
+            return prev.head_block, prev.head_rate
+
+        head = self.get_head()
+        head_rate = prev.head_rate
+        if self._last_head is not None:
+            last_time, last_head = self._last_head
+            head_rate = ema(
+                head_rate, (head - last_head) / (now - last_time), self.alpha)
+
+        self._last_head = (now, head)
+        return head, head_rate
+
+    def sample(self) -> IndexingProgress:
+        now = time.monotonic()
+        prev = self.progress
+
+        head, head_rate = prev.head_block, prev.head_rate
+        try:
+            head, head_rate = self._refresh_head(now, prev)
+
+        except Exception as e:
+            self.logger.warning(f'lag monitor: couldn\'t fetch head block: {e}')
+
+        doc = self.es.get_newest_indexed_block()
+
+        indexed_block, indexed_evm_block = None, None
+        rate = prev.rate
+        if doc:
+            indexed_block, indexed_evm_block = doc.block_num, doc.global_block_num
+
+            if self._last_indexed is not None:
+                last_time, last_block = self._last_indexed
+                if now > last_time:
+                    rate = ema(
+                        rate, (indexed_block - last_block) / (now - last_time),
+                        self.alpha)
+
+            self._last_indexed = (now, indexed_block)
+
+        progress = IndexingProgress(
+            indexed_block=indexed_block,
+            indexed_evm_block=indexed_evm_block,
+            head_block=head,
+            rate=rate,
+            head_rate=head_rate,
+            updated_at=time.time(),
+            samples=prev.samples + 1
+        )
+
+        with self._lock:
+            self._progress = progress
+
+        return progress
+
+    def wait_synced(
+        self,
+        threshold: int = 100,
+        timeout: Optional[float] = None
+    ) -> IndexingProgress:
+        '''Block until lag is under `threshold` blocks, samples directly if
+        the background thread isn't running.
+        '''
+        start = time.monotonic()
+        while True:
+            if self._thread:
+                progress = self.progress
+                if progress.samples == 0:
+                    time.sleep(0.1)
+                    continue
+
+            else:
+                progress = self.sample()
+
+            lag = progress.lag
+            eta = progress.eta
+            self.logger.info(
+                f'waiting on indexer... lag: {lag}, '
+                f'rate: {progress.rate or 0:.2f} b/s, '
+                f'eta: {f"{eta:.0f}s" if eta is not None else "unknown"}')
+
+            if lag is not None and lag < threshold:
+                return progress
+
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(
+                    f'indexer still {lag} blocks behind after {timeout}s')
+
+            time.sleep(self.interval)
+
+
+class ElasticTelemetry(PollingMonitor):
+    '''Samples `_nodes/stats` and `_cat/indices` for the chain's delta &
+    action indices, keeps the last `size` samples in a ring buffer.
+
+    Counters from elastic are cumulative, samples store them as per second
+    rates over the time since the previous sample.
+    '''
+
+    name = 'tevmc-es-telemetry'
+
+    def __init__(
+        self,
+        es: ElasticDriver,
+        interval: float = 10.0,
+        size: int = 360,
+        logger = None
+    ):
+        super().__init__(interval, logger=logger)
+        self.es = es
+
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=size)
+        self._last_counters = None
+
+    def _node_counters(self) -> dict:
+        stats = self.es.elastic.nodes.stats(metric=['indices', 'jvm'])
+
+        counters = {
+            'index_total': 0,
+            'index_time_ms': 0,
+            'refresh_time_ms': 0,
+            'merge_time_ms': 0,
+            'heap_used': 0,
+            'heap_max': 0
+        }
+        for node in stats['nodes'].values():
+            indices = node.get('indices', {})
+            heap = node.get('jvm', {}).get('mem', {})
+            counters['index_total'] += indices.get('indexing', {}).get('index_total', 0)
+            counters['index_time_ms'] += indices.get('indexing', {}).get('index_time_in_millis', 0)
+            counters['refresh_time_ms'] += indices.get('refresh', {}).get('total_time_in_millis', 0)
+            counters['merge_time_ms'] += indices.get('merges', {}).get('total_time_in_millis', 0)
+            counters['heap_used'] += heap.get('heap_used_in_bytes', 0)
+            counters['heap_max'] += heap.get('heap_max_in_bytes', 0)
+
+        return counters
+
+    def _chain_indices(self) -> list[dict]:
+        rows = self.es.elastic.cat.indices(
+            index=[
+                f'{self.es.chain_name}-delta-*',
+                f'{self.es.chain_name}-action-*'
+            ],
+            format='json',
+            bytes='b',
+            h='index,docs.count,segments.count,store.size'
+        )
+        return [
+            {
+                'index': row['index'],
+                'docs': int(row.get('docs.count') or 0),
+                'segments': int(row.get('segments.count') or 0),
+                'size': int(row.get('store.size') or 0)
+            }
+            for row in rows
+        ]
+
+    def sample(self) -> dict:
+        now = time.monotonic()
+        counters = self._node_counters()
+        indices = self._chain_indices()
+
+        rates = {
+            'indexing_rate': None,
+            'index_time_rate': None,
+            'refresh_time_rate': None,
+            'merge_time_rate': None
+        }
+        if self._last_counters is not None:
+            last_time, last = self._last_counters
+            elapsed = now - last_time
+            if elapsed > 0:
+                def rate(key: str) -> float:
+                    return max(counters[key] - last[key], 0) / elapsed
+
+                rates = {
+                    'indexing_rate': rate('index_total'),
+                    'index_time_rate': rate('index_time_ms'),
+                    'refresh_time_rate': rate('refresh_time_ms'),
+                    'merge_time_rate': rate('merge_time_ms')
+                }
+
+        self._last_counters = (now, counters)
+
+        sample = {
+            'time': time.time(),
+            **rates,
+            'heap_used': counters['heap_used'],
+            'heap_max': counters['heap_max'],
+            'heap_ratio': (
+                counters['heap_used'] / counters['heap_max']
+                if counters['heap_max'] else None),
+            'segments': sum(info['segments'] for info in indices),
+            'docs': sum(info['docs'] for info in indices),
+            'indices': indices
+        }
+
+        with self._lock:
+            self._samples.append(sample)
+
+        return sample
+
+    def series(self, since: Optional[float] = None) -> list[dict]:
+        '''Buffered samples oldest first, optionally only those taken after
+        unix time `since`.
+        '''
+        with self._lock:
+            samples = list(self._samples)
+
+        if since is not None:
+            samples = [sample for sample in samples if sample['time'] > since]
+
+        return samples
+
+    @property
+    def latest(self) -> Optional[dict]:
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+
+class IndexOptimizer(PollingMonitor):
+    '''Background job that periodically freezes completed indices with
+    `ElasticDriver.optimize_completed_indices`.
+    '''
+
+    name = 'tevmc-index-optimizer'
+
+    def __init__(
+        self,
+        es: ElasticDriver,
+        interval: float = 3600.0,
+        logger = None
+    ):
+        super().__init__(interval, logger=logger)
+        self.es = es
+        self.optimized: list[str] = []
+        self.last_run: Optional[float] = None
+
+    def sample(self) -> list[str]:
+        self.es.catalog.invalidate()
+        optimized = self.es.optimize_completed_indices(stop_event=self._stop)
+        self.optimized += optimized
+        self.last_run = time.time()
+
+        if len(optimized) > 0:
+            self.logger.info(f'optimized indices: {optimized}')
+
+        return optimized
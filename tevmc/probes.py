@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+import time
+import socket
+import logging
+
+from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from websocket import create_connection
+
+
+class ProbeResult:
+    '''Outcome of waiting on a single `ReadinessProbe`.
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        ready: bool,
+        elapsed: float,
+        attempts: int,
+        error: Optional[str] = None
+    ):
+        self.name = name
+        self.ready = ready
+        self.elapsed = elapsed
+        self.attempts = attempts
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'ready': self.ready,
+            'elapsed': self.elapsed,
+            'attempts': self.attempts,
+            'error': self.error
+        }
+
+
+class ReadinessProbe:
+    '''Calls `check` until it returns truthy, sleeping with exponential
+    backoff between attempts, exceptions count as not ready yet.
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        check: Callable[[], bool],
+        timeout: float = 600.0,
+        initial_delay: float = 0.1,
+        max_delay: float = 5.0,
+        backoff: float = 2.0
+    ):
+        self.name = name
+        self.check = check
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+
+    def probe_once(self) -> tuple[bool, Optional[str]]:
+        try:
+            return bool(self.check()), None
+
+        except Exception as e:
+            return False, f'{type(e).__name__}: {e}'
+
+    def wait(self) -> ProbeResult:
+        start = time.monotonic()
+        delay = self.initial_delay
+        attempts = 0
+        while True:
+            attempts += 1
+            ready, error = self.probe_once()
+            elapsed = time.monotonic() - start
+            if ready:
+                return ProbeResult(self.name, True, elapsed, attempts)
+
+            if elapsed + delay > self.timeout:
+                return ProbeResult(self.name, False, elapsed, attempts, error)
+
+            time.sleep(delay)
+            delay = min(delay * self.backoff, self.max_delay)
+
+
+def run_probes(
+    probes: list[ReadinessProbe],
+    once: bool = False,
+    logger = None
+) -> dict[str, ProbeResult]:
+    '''Run `probes` concurrently, waiting on each unless `once` is set.
+    '''
+    if logger is None:
+        logger = logging.getLogger()
+
+    def _run(probe: ReadinessProbe) -> ProbeResult:
+        if not once:
+            return probe.wait()
+
+        start = time.monotonic()
+        ready, error = probe.probe_once()
+        return ProbeResult(
+            probe.name, ready, time.monotonic() - start, 1, error)
+
+    if len(probes) == 0:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+        results = list(pool.map(_run, probes))
+
+    for result in results:
+        if result.ready:
+            logger.info(f'{result.name} ready in {result.elapsed:.2f}s')
+
+        else:
+            logger.warning(
+                f'{result.name} not ready after {result.elapsed:.2f}s: {result.error}')
+
+    return {result.name: result for result in results}
+
+
+# checks, each returns True once the service is usable
+
+def redis_ping(host: str, port: int, timeout: float = 2.0) -> bool:
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(b'*1\r\n$4\r\nPING\r\n')
+        return sock.recv(64).startswith(b'+PONG')
+
+
+def elastic_health(
+    url: str,
+    auth: tuple[str, str],
+    status: str = 'yellow',
+    timeout: float = 2.0
+) -> bool:
+    resp = requests.get(
+        f'{url}/_cluster/health',
+        params={'wait_for_status': status, 'timeout': '1s'},
+        auth=auth, timeout=timeout)
+    return resp.status_code == 200 and not resp.json().get('timed_out', True)
+
+
+def nodeos_get_info(url: str, timeout: float = 2.0) -> bool:
+    return 'head_block_num' in requests.get(
+        f'{url}/v1/chain/get_info', timeout=timeout).json()
+
+
+def nodeos_head_advancing(url: str, timeout: float = 2.0) -> Callable[[], bool]:
+    '''Check that is ready once two `get_info` calls see different heads,
+    meaning blocks are being produced or received.
+    '''
+    last_head = None
+
+    def check() -> bool:
+        nonlocal last_head
+        head = requests.get(
+            f'{url}/v1/chain/get_info', timeout=timeout).json()['head_block_num']
+        advanced = last_head is not None and head > last_head
+        last_head = head
+        return advanced
+
+    return check
+
+
+def websocket_accepts(uri: str, timeout: float = 2.0) -> bool:
+    ws = create_connection(uri, timeout=timeout)
+    ws.close()
+    return True
+
+
+def evm_block_number(url: str, timeout: float = 2.0) -> bool:
+    resp = requests.post(
+        url,
+        json={
+            'jsonrpc': '2.0',
+            'method': 'eth_blockNumber',
+            'params': [],
+            'id': 1
+        },
+        timeout=timeout)
+    return 'result' in resp.json()
@@ -1,17 +1,56 @@
 import importlib
 from pathlib import Path
 import time
+import threading
 
-from flask import request, jsonify
+from flask import Response, request, jsonify
 
 from tevmc.cmdline.build import build_service
-from tevmc.testing.database import ElasticDataIntegrityError, ElasticDriver
+from tevmc.probes import run_probes
+from tevmc.testing.database import (
+    GAP_STRATEGY_HISTOGRAM,
+    GAP_STRATEGY_SCAN,
+    INDEX_DIGEST_FILE,
+    INTEGRITY_CHECKPOINT_FILE,
+    ElasticDataIntegrityError,
+    ElasticDriver,
+    IndexDigests
+)
 
 
 def add_routes(tevmc: 'TEVMController'):
 
     app = tevmc.api
 
+    # /digest reads thousands of docs per index, it runs on its own thread
+    digest_job = {'thread': None, 'error': None}
+    digest_lock = threading.Lock()
+
+    def compute_digests(digest_path: Path):
+        try:
+            digests = ElasticDriver(tevmc.config).compute_digests(
+                previous=IndexDigests.load(digest_path))
+            digests.save(digest_path)
+            digest_job['error'] = None
+
+        except Exception as e:
+            tevmc.logger.error(f'digest computation failed: {e}')
+            digest_job['error'] = str(e)
+
+    def digest_job_running() -> bool:
+        thread = digest_job['thread']
+        return thread is not None and thread.is_alive()
+
+    def start_digest_job(digest_path: Path):
+        with digest_lock:
+            if digest_job_running():
+                return
+
+            digest_job['thread'] = threading.Thread(
+                target=compute_digests, args=(digest_path,),
+                name='tevmc-digest', daemon=True)
+            digest_job['thread'].start()
+
     @app.route('/status', methods=['GET'])
     def status():
         result = {'services': {}}
@@ -21,6 +60,12 @@ def add_routes(tevmc: 'TEVMController'):
                 'status': cont.status
             }
 
+        result['startup'] = tevmc.startup_timings
+        result['readiness'] = {
+            name: probe.to_dict()
+            for name, probe in tevmc.readiness.items()
+        }
+
         return jsonify(result)
 
     @app.route('/restart', methods=['POST'])
@@ -80,11 +125,88 @@ def add_routes(tevmc: 'TEVMController'):
 
     @app.route('/check', methods=['GET'])
     def check():
+        incremental = request.args.get('incremental', 'false').lower() in ['1', 'true']
+        gap_strategy = request.args.get('strategy', None)
+        if gap_strategy not in [None, GAP_STRATEGY_HISTOGRAM, GAP_STRATEGY_SCAN]:
+            return jsonify(
+                error=f'unknown strategy {gap_strategy}, expected '
+                      f'{GAP_STRATEGY_HISTOGRAM} or {GAP_STRATEGY_SCAN}'), 400
+
         try:
-            ElasticDriver(tevmc.config).full_integrity_check()
+            es = ElasticDriver(tevmc.config)
+            if incremental:
+                es.incremental_integrity_check(
+                    tevmc.root_pwd / INTEGRITY_CHECKPOINT_FILE,
+                    gap_strategy=gap_strategy)
+
+            else:
+                es.full_integrity_check(gap_strategy=gap_strategy)
+
             status = 'healthy'
 
         except ElasticDataIntegrityError as e:
             status = f'unhealthy: {e}'
 
         return jsonify({'status': status})
+
+    @app.route('/indexing', methods=['GET'])
+    def indexing():
+        if not tevmc.lag_monitor:
+            return jsonify(error='lag monitor not running'), 404
+
+        return jsonify(tevmc.lag_monitor.progress.to_dict())
+
+    @app.route('/telemetry', methods=['GET'])
+    def telemetry():
+        if not tevmc.es_telemetry:
+            return jsonify(error='elastic telemetry not running'), 404
+
+        since = request.args.get('since', None)
+        return jsonify({
+            'interval': tevmc.es_telemetry.interval,
+            'samples': tevmc.es_telemetry.series(
+                since=float(since) if since else None)
+        })
+
+    @app.route('/digest', methods=['GET'])
+    def digest():
+        refresh = request.args.get('refresh', 'false').lower() in ['1', 'true']
+        digest_path = tevmc.root_pwd / INDEX_DIGEST_FILE
+
+        if refresh:
+            start_digest_job(digest_path)
+            return jsonify(status='computing'), 202
+
+        digests = IndexDigests.load(digest_path)
+        if digests:
+            return jsonify(digests.to_dict())
+
+        if digest_job_running():
+            return jsonify(status='computing'), 202
+
+        return jsonify(
+            error='no digests computed yet, request with ?refresh=1',
+            last_error=digest_job['error']), 404
+
+    @app.route('/logs/<service>', methods=['GET'])
+    def logs(service):
+        if service not in tevmc.containers:
+            return jsonify(error=f'unknown service {service}'), 404
+
+        backlog = request.args.get('backlog', '100')
+        subscription = tevmc.log_hub(service).subscribe(
+            backlog=None if backlog == 'all' else int(backlog))
+
+        return Response(iter(subscription), mimetype='text/plain')
+
+    @app.route('/ready', methods=['GET'])
+    def ready():
+        probes = [
+            tevmc.readiness_probe(service, once=True)
+            for service in tevmc.containers
+            if service in tevmc.READINESS_PROBES
+        ]
+        results = run_probes(probes, once=True, logger=tevmc.logger)
+        return jsonify({
+            name: result.to_dict() for name, result in results.items()
+        })
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import time
+import logging
+
+from typing import Callable, Iterable, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class StartupTask:
+
+    def __init__(self, name: str, fn: Callable[[], None], deps: Iterable[str] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = set(deps)
+
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            'deps': sorted(self.deps),
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'elapsed': (
+                self.finished_at - self.started_at
+                if self.finished_at is not None else None)
+        }
+
+
+class StartupScheduler:
+    '''Runs tasks on a thread pool as soon as all their dependencies are
+    done, so wall time is the critical path instead of the sum.
+
+    Dependencies on tasks that were never added are ignored, that way
+    callers can declare the full graph and only add enabled services. If
+    a task fails no new tasks are started, running ones are awaited and
+    the first error is raised.
+    '''
+
+    def __init__(self, max_workers: Optional[int] = None, logger = None):
+        self.max_workers = max_workers
+        self.logger = logger if logger else logging.getLogger()
+        self.tasks: dict[str, StartupTask] = {}
+        self.elapsed: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[[], None], deps: Iterable[str] = ()):
+        if name in self.tasks:
+            raise ValueError(f'duplicate startup task {name}')
+
+        self.tasks[name] = StartupTask(name, fn, deps=deps)
+
+    def _resolve(self):
+        for task in self.tasks.values():
+            task.deps &= set(self.tasks)
+
+        # kahn's algorithm, only to reject cycles before running anything
+        pending = {name: set(task.deps) for name, task in self.tasks.items()}
+        while pending:
+            ready = [name for name, deps in pending.items() if not deps]
+            if not ready:
+                raise ValueError(
+                    f'startup dependency cycle between {sorted(pending)}')
+
+            for name in ready:
+                del pending[name]
+
+            for deps in pending.values():
+                deps.difference_update(ready)
+
+    def _run_task(self, task: StartupTask, start: float):
+        task.started_at = time.monotonic() - start
+        self.logger.info(f'starting {task.name}...')
+        task.fn()
+        task.finished_at = time.monotonic() - start
+        self.logger.info(
+            f'{task.name} up in {task.finished_at - task.started_at:.2f}s')
+
+    def run(self) -> dict[str, dict]:
+        self._resolve()
+
+        start = time.monotonic()
+        done = set()
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers or max(len(self.tasks), 1)
+        ) as pool:
+            while True:
+                if error is None:
+                    for name, task in self.tasks.items():
+                        if (name not in done and name not in running.values() and
+                            task.deps <= done):
+                            running[pool.submit(self._run_task, task, start)] = name
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = running.pop(fut)
+                    exc = fut.exception()
+                    if exc is not None:
+                        self.logger.critical(f'{name} failed to start: {exc}')
+                        error = error or exc
+
+                    else:
+                        done.add(name)
+
+        self.elapsed = time.monotonic() - start
+
+        if error is not None:
+            raise error
+
+        self.logger.info(f'startup done in {self.elapsed:.2f}s')
+        return self.timings()
+
+    def timings(self) -> dict[str, dict]:
+        return {name: task.to_dict() for name, task in self.tasks.items()}
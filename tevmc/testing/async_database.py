@@ -0,0 +1,577 @@
+import asyncio
+import logging
+import traceback
+
+from typing import Awaitable, Callable, List, Optional
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+
+from tevmc.testing.database import (
+    GAP_STRATEGY_HISTOGRAM,
+    GAP_STRATEGY_SCAN,
+    ESGapFound,
+    ESDuplicatesFound,
+    ElasticDataEmptyError,
+    ElasticDataIntegrityError,
+    GapScanner,
+    IndexCatalog,
+    IndexInfo,
+    IntegrityReport,
+    QueryPlan,
+    StorageEosioAction,
+    StorageEosioDelta,
+    block_nums_query,
+    check_delete_task,
+    compute_integrity_shards,
+    delete_range_query,
+    doc_counts_request,
+    duplicates_query,
+    edge_block_request,
+    find_suffix_gap,
+    first_hit_source,
+    gap_bisection,
+    gap_check_shards,
+    histogram_gap_query,
+    index_stats_request,
+    indices_newer_than,
+    last_block_before_request,
+    missing_index_range,
+    parse_doc_counts,
+    parse_duplicates_page,
+    parse_index_stats,
+    parse_write_blocked,
+    purge_targets
+)
+
+
+async def run_query_plan(
+    plan: QueryPlan,
+    execute: Callable[[list], Awaitable[list]]
+):
+    '''Async `tevmc.testing.database.run_query_plan`, `execute` can run
+    every query in a batch concurrently.
+    '''
+    try:
+        batch = next(plan)
+        while True:
+            batch = plan.send(await execute(batch))
+
+    except StopIteration as stop:
+        return stop.value
+
+
+class AsyncElasticDriver:
+    '''`ElasticDriver` counterpart on top of `AsyncElasticsearch`.
+
+    Only does the I/O, queries and integrity logic are the helpers shared
+    with `ElasticDriver`. Independent queries (first & last block, both
+    halves of a histogram step, every shard scan, delta & action purges)
+    are issued together with `asyncio.gather`, at most `max_concurrency`
+    searches are in flight.
+    '''
+
+    def __init__(self, config: dict, max_concurrency: Optional[int] = None):
+        self.config = config
+        self.chain_name = config['telos-evm-rpc']['elastic_prefix']
+        self.docs_per_index = 10_000_000
+        self.index_version = config['telos-evm-rpc'].get('elasitc_index_version', 'v1.5')
+
+        es_config = config['elasticsearch']
+        self.duplicate_page_size = es_config.get('duplicate_page_size', 10_000)
+        self.scan_page_size = es_config.get('scan_page_size', 10_000)
+        self.gap_strategy = es_config.get('gap_strategy', GAP_STRATEGY_HISTOGRAM)
+        self.sliced_purge = es_config.get('sliced_purge', True)
+        self.catalog = IndexCatalog(ttl=es_config.get('catalog_ttl', 5.0))
+
+        self._sem = asyncio.Semaphore(
+            max_concurrency or es_config.get('integrity_workers', 4))
+
+        self.elastic = AsyncElasticsearch(
+            f'{es_config["protocol"]}://{es_config["host"]}',
+            basic_auth=(
+                es_config['user'], es_config['pass']
+            )
+        )
+
+    async def close(self):
+        await self.elastic.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.close()
+
+    async def _search(self, **kwargs) -> dict:
+        async with self._sem:
+            return await self.elastic.search(**kwargs)
+
+    # index catalog
+
+    async def get_index_doc_counts(self, kind: str) -> dict[str, int]:
+        async with self._sem:
+            return parse_doc_counts(await self.elastic.cat.indices(
+                **doc_counts_request(self.chain_name, kind)))
+
+    async def get_index_stats(
+        self,
+        kind: str,
+        upper: Optional[int] = None,
+        indices: Optional[List[str]] = None
+    ) -> dict:
+        return parse_index_stats(await self._search(
+            **index_stats_request(self.chain_name, kind, upper=upper, indices=indices)))
+
+    async def get_catalog(self, kind: str, ranges: bool = True) -> List[IndexInfo]:
+        '''Async `IndexCatalog.get`.
+        '''
+        rows = None if ranges else self.catalog.cached_rows(kind)
+        if rows is None:
+            rows = self.catalog.set_rows(
+                kind, await self.get_index_doc_counts(kind))
+
+        stale = self.catalog.stale_ranges(rows) if ranges else []
+        if len(stale) > 0:
+            self.catalog.set_ranges(
+                rows, stale,
+                await self.get_index_stats(kind, indices=stale))
+
+        return self.catalog.infos(rows)
+
+    async def get_ordered_delta_indices(self) -> List[str]:
+        return [
+            info.name for info in await self.get_catalog('delta', ranges=False)]
+
+    # point lookups
+
+    async def _search_one(self, index: str, field: str, value) -> Optional[dict]:
+        return first_hit_source(await self._search(
+            index=index, size=1, query={'term': {field: value}}))
+
+    async def tx_from_hash(self, h: str):
+        try:
+            source = await self._search_one(
+                f'{self.chain_name}-action-*', '@raw.hash', h)
+            return StorageEosioAction(source) if source else None
+
+        except Exception as error:
+            logging.error(traceback.format_exc())
+            logging.error(error)
+            return None
+
+    async def block_from_evm_num(self, num: int):
+        try:
+            source = await self._search_one(
+                f'{self.chain_name}-delta-*', '@global.block_num', num)
+            return StorageEosioDelta(source) if source else None
+
+        except Exception as error:
+            logging.error(traceback.format_exc())
+            logging.error(error)
+            return None
+
+    async def _edge_block(self, index: str, order: str) -> Optional[StorageEosioDelta]:
+        source = first_hit_source(
+            await self._search(**edge_block_request(index, order)))
+        return StorageEosioDelta(source) if source else None
+
+    async def get_first_indexed_block(self):
+        indices = await self.get_ordered_delta_indices()
+        if len(indices) == 0:
+            return None
+
+        try:
+            return await self._edge_block(indices[0], 'asc')
+
+        except Exception as error:
+            logging.error(traceback.format_exc())
+            logging.error(error)
+            return None
+
+    async def get_last_indexed_block(self):
+        indices = await self.get_ordered_delta_indices()
+        try:
+            for index in reversed(indices):
+                doc = await self._edge_block(index, 'desc')
+                if doc:
+                    return doc
+
+        except Exception as error:
+            logging.error(traceback.format_exc())
+            logging.error(error)
+
+        return None
+
+    async def last_valid_block_before(self, evm_block_num: int) -> Optional[StorageEosioDelta]:
+        for info in reversed(await self.get_catalog('delta', ranges=False)):
+            if info.min_block is not None and info.min_block >= evm_block_num:
+                continue
+
+            source = first_hit_source(await self._search(
+                **last_block_before_request(info.name, evm_block_num)))
+            if source:
+                return StorageEosioDelta(source)
+
+        return None
+
+    # integrity
+
+    async def find_gap_in_indices(self):
+        return find_suffix_gap(
+            [info.suffix for info in await self.get_catalog('delta', ranges=False)])
+
+    async def find_missing_index_range(
+        self,
+        lower: int,
+        upper: int
+    ) -> Optional[tuple[int, int]]:
+        return missing_index_range(await self.get_catalog('delta'), lower, upper)
+
+    async def run_histogram_gap_check(self, lower: int, upper: int, interval: int):
+        results = await self._search(
+            index=f'{self.chain_name}-delta-*',
+            size=0,
+            **histogram_gap_query(lower, upper, interval)
+        )
+        return results['aggregations']['block_histogram']['buckets']
+
+    async def find_duplicates(
+        self,
+        index: str,
+        range_field: str,
+        key_field: str,
+        lower: int,
+        upper: int
+    ) -> list:
+        dups = []
+        after_key = None
+        while True:
+            page, after_key = parse_duplicates_page(await self._search(
+                index=index,
+                size=0,
+                **duplicates_query(
+                    range_field, key_field, lower, upper,
+                    self.duplicate_page_size, after_key)
+            ))
+            dups += page
+
+            if not after_key:
+                return dups
+
+    async def find_duplicate_deltas(self, lower: int, upper: int):
+        return await self.find_duplicates(
+            f'{self.chain_name}-delta-*',
+            '@global.block_num', '@global.block_num', lower, upper)
+
+    async def find_duplicate_actions(self, lower: int, upper: int):
+        return await self.find_duplicates(
+            f'{self.chain_name}-action-*',
+            '@raw.block', '@raw.hash', lower, upper)
+
+    async def find_gaps(self, lower: int, upper: int) -> List[tuple[int, int]]:
+        '''Async version of `ElasticDriver.iter_gaps`, pages are sequential
+        by nature so this one only overlaps with other shards.
+        '''
+        scanner = GapScanner(lower, upper)
+        gaps = []
+        search_after = None
+        while True:
+            kwargs = {}
+            if search_after is not None:
+                kwargs['search_after'] = search_after
+
+            results = await self._search(
+                index=f'{self.chain_name}-delta-*',
+                size=self.scan_page_size,
+                **block_nums_query(lower, upper),
+                **kwargs
+            )
+            hits = results.get('hits', {}).get('hits', [])
+            for hit in hits:
+                gap = scanner.feed(int(hit['sort'][0]))
+                if gap:
+                    gaps.append(gap)
+
+            if len(hits) < self.scan_page_size:
+                break
+
+            search_after = hits[-1]['sort']
+
+        gap = scanner.finish()
+        if gap:
+            gaps.append(gap)
+
+        return gaps
+
+    async def check_gaps(self, lower_bound: int, upper_bound: int, interval: int) -> Optional[int]:
+        '''Same bisection as `ElasticDriver.check_gaps` but both halves of
+        each step are queried concurrently.
+        '''
+        return await run_query_plan(
+            gap_bisection(lower_bound, upper_bound, interval),
+            lambda batch: asyncio.gather(*[
+                self.run_histogram_gap_check(*args) for args in batch])
+        )
+
+    async def _check_shard_gaps(
+        self,
+        lower: int,
+        upper: int,
+        strategy: str
+    ) -> List[tuple[int, Optional[int]]]:
+        if upper - lower < 2:
+            return []
+
+        if strategy == GAP_STRATEGY_SCAN:
+            return await self.find_gaps(lower, upper)
+
+        gap = await self.check_gaps(lower, upper, upper - lower)
+        return [(int(gap), None)] if gap is not None else []
+
+    async def check_range(
+        self,
+        lower_bound: int,
+        upper_bound: int,
+        gap_strategy: Optional[str] = None
+    ) -> IntegrityReport:
+        report = IntegrityReport(lower_bound, upper_bound)
+        report.shards = compute_integrity_shards(
+            [info.suffix for info in await self.get_catalog('delta', ranges=False)],
+            lower_bound, upper_bound, self.docs_per_index
+        )
+        gap_strategy = gap_strategy or self.gap_strategy
+
+        index_gap = None
+        if upper_bound - lower_bound >= 2:
+            index_gap = await self.find_missing_index_range(lower_bound, upper_bound)
+            if index_gap:
+                logging.debug(f'whole index seems to be missing: {index_gap}')
+
+        gap_shards = gap_check_shards(
+            report.shards, lower_bound, upper_bound, index_gap, gap_strategy)
+
+        logging.info(
+            f'starting async integrity check from {lower_bound} to {upper_bound}, '
+            f'{len(report.shards)} shards, {gap_strategy} gap strategy')
+
+        delta_dups, action_dups, shard_gaps = await asyncio.gather(
+            asyncio.gather(*[
+                self.find_duplicate_deltas(start, end)
+                for start, end in report.shards
+            ]),
+            asyncio.gather(*[
+                self.find_duplicate_actions(start, end)
+                for start, end in report.shards
+            ]),
+            asyncio.gather(*[
+                self._check_shard_gaps(start, end, gap_strategy)
+                for start, end in gap_shards
+            ])
+        )
+
+        for dups in delta_dups:
+            report.delta_dups += dups
+
+        for dups in action_dups:
+            report.action_dups += dups
+
+        report.add_gaps(shard_gaps, index_gap=index_gap)
+
+        return report
+
+    async def full_integrity_check(self, gap_strategy: Optional[str] = None):
+        self.catalog.expire()
+        lower_bound_doc, upper_bound_doc = await asyncio.gather(
+            self.get_first_indexed_block(),
+            self.get_last_indexed_block()
+        )
+
+        if not lower_bound_doc or not upper_bound_doc:
+            return None
+
+        report = await self.check_range(
+            lower_bound_doc.global_block_num,
+            upper_bound_doc.global_block_num,
+            gap_strategy=gap_strategy
+        )
+        report.raise_for_errors()
+
+        return report
+
+    # purge & repair
+
+    async def _delete_by_query_sliced(
+        self,
+        index: str,
+        field: str,
+        value: int,
+        slices: int | str = 'auto',
+        poll_interval: float = 1.0
+    ):
+        '''Async `ElasticDriver._delete_by_query_sliced`, the delete runs as
+        a background ES task so no request has to outlive the client timeout.
+        '''
+        query = delete_range_query(field, value)
+        try:
+            task = await self.elastic.delete_by_query(
+                index=index,
+                query=query,
+                conflicts='proceed',
+                slices=slices,
+                refresh=False,
+                wait_for_completion=False
+            )
+
+        except NotFoundError:
+            return None
+
+        task_id = task['task']
+        logging.info(f'purging {index} {query}, task {task_id}')
+
+        while True:
+            response = check_delete_task(
+                index, await self.elastic.tasks.get(task_id=task_id))
+            if response is not None:
+                return response
+
+            await asyncio.sleep(poll_interval)
+
+    async def thaw_indices(self, indices: List[str]):
+        if len(indices) == 0:
+            return
+
+        frozen = parse_write_blocked(
+            await self.elastic.indices.get_settings(
+                index=indices, name='index.blocks.write', flat_settings=True),
+            indices)
+        if len(frozen) > 0:
+            logging.info(f'lifting write block on {frozen}')
+            await self.elastic.indices.put_settings(
+                index=frozen, settings={'index.blocks.write': None})
+
+    async def purge_newer_than(
+        self,
+        block_num,
+        evm_block_num,
+        sliced: Optional[bool] = None
+    ):
+        '''Async `ElasticDriver.purge_newer_than`, deletes always run as
+        polled background tasks, `sliced` only picks between automatic
+        slicing and a single slice.
+        '''
+        if sliced is None:
+            sliced = self.sliced_purge
+
+        logging.info(f'purging indices in db from block {block_num}...')
+
+        # deleting indices, never decide what to drop from a cached listing
+        self.catalog.invalidate()
+        deltas, actions = await asyncio.gather(
+            self.get_catalog('delta', ranges=False),
+            self.get_catalog('action', ranges=False))
+
+        delete_list = [
+            name
+            for kind, infos in [('delta', deltas), ('action', actions)]
+            for name in indices_newer_than(
+                infos, self.chain_name, kind,
+                self.index_version, block_num, self.docs_per_index)
+        ]
+
+        if delete_list:
+            delete_result = await self.elastic.indices.delete(index=delete_list)
+            logging.info(f'deleted indices result: {delete_result}')
+
+        targets = purge_targets(
+            self.chain_name, self.index_version,
+            block_num, evm_block_num, self.docs_per_index)
+        target_indices = [index for index, _, _ in targets]
+
+        await self.thaw_indices([
+            info.name for info in deltas + actions
+            if info.name in target_indices
+        ])
+
+        await asyncio.gather(*[
+            self._delete_by_query_sliced(
+                *target, slices='auto' if sliced else 1)
+            for target in targets
+        ])
+
+        # deletes ran without refresh, do a single one at the end
+        await self.elastic.indices.refresh(
+            index=target_indices, ignore_unavailable=True)
+
+        self.catalog.invalidate()
+
+    async def repair_data(self):
+        try:
+            await self.full_integrity_check()
+            doc = await self.get_last_indexed_block()
+            if doc:
+                return doc.block_num, doc.global_block_num
+
+            else:
+                raise ElasticDataEmptyError()
+
+        except ESGapFound as err:
+            logging.info(err)
+
+            doc = await self.block_from_evm_num(err.start)
+            if not doc:
+                doc = await self.last_valid_block_before(err.start)
+
+            if not doc:
+                raise ElasticDataIntegrityError('Gap found but couldn\'t find last valid block!')
+
+        except ESDuplicatesFound as err:
+            logging.info(err)
+            candidates = []
+            if len(err.action_dups) > 0:
+                tx = await self.tx_from_hash(err.action_dups[0])
+                if tx:
+                    candidates.append(self.block_from_evm_num(tx.raw.block))
+
+                else:
+                    logging.info(f'tx {err.action_dups[0]} not found, skipping...')
+
+            if len(err.delta_dups) > 0:
+                candidates.append(self.block_from_evm_num(err.delta_dups[0]))
+
+            docs = [doc for doc in await asyncio.gather(*candidates) if doc]
+
+            assert len(docs) > 0  # Min block must be non null
+
+            doc = min(docs, key=lambda d: d.block_num)
+
+        await self.purge_newer_than(doc.block_num, doc.global_block_num)
+
+        # return last valid block nums
+        return doc.block_num - 1, doc.global_block_num - 1
+
+
+class BlockingAsyncElasticDriver:
+    '''Sync facade over `AsyncElasticDriver` for the cli, each call runs on
+    its own event loop with a fresh client.
+    '''
+
+    def __init__(self, config: dict, max_concurrency: Optional[int] = None):
+        self.config = config
+        self.max_concurrency = max_concurrency
+
+    async def _run(self, method: str, *args, **kwargs):
+        async with AsyncElasticDriver(
+            self.config, max_concurrency=self.max_concurrency
+        ) as driver:
+            return await getattr(driver, method)(*args, **kwargs)
+
+    def full_integrity_check(self, gap_strategy: Optional[str] = None):
+        return asyncio.run(
+            self._run('full_integrity_check', gap_strategy=gap_strategy))
+
+    def repair_data(self):
+        return asyncio.run(self._run('repair_data'))
+
+    def purge_newer_than(self, block_num, evm_block_num, sliced: Optional[bool] = None):
+        return asyncio.run(
+            self._run('purge_newer_than', block_num, evm_block_num, sliced=sliced))
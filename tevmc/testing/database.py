@@ -1,9 +1,16 @@
 import time
 import json
+import hashlib
 import math
 import locale
 import logging
-from typing import List, Optional
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Callable, Generator, Iterable, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 from elasticsearch import Elasticsearch, NotFoundError
 
@@ -12,6 +19,26 @@ import traceback
 
 locale.setlocale(locale.LC_ALL, 'en_US.UTF-8')
 
+
+INTEGRITY_CHECKPOINT_FILE = 'integrity-checkpoint.json'
+
+# recursive histogram bisection, cheap when damage is sparse
+GAP_STRATEGY_HISTOGRAM = 'histogram'
+# linear doc value scan, reports every gap, cheap when damage is dense
+GAP_STRATEGY_SCAN = 'scan'
+
+SNAPSHOT_REPOSITORY = 'tevmc-snapshots'
+SNAPSHOT_REPO_PATH = '/home/elasticsearch/snapshots'
+
+INDEX_DIGEST_FILE = 'index-digests.json'
+
+# (block field, hash field) pairs hashed by `ElasticDriver.compute_index_digest`
+DIGEST_FIELDS = {
+    'delta': ('@global.block_num', '@evmBlockHash'),
+    'action': ('@raw.block', '@raw.hash')
+}
+
+
 def format_block_numbers(block_num: int, evm_block_num: int) -> str:
     formatted_block_num = locale.format_string('%d', block_num, grouping=True)
     formatted_evm_block_num = locale.format_string('%d', evm_block_num, grouping=True)
@@ -22,82 +49,681 @@ def get_suffix(block_num, docs_per_index):
     return str(block_num // docs_per_index).zfill(8)
 
 
-class StorageEosioDelta:
-    def __init__(self, obj: dict):
-        self.timestamp = obj.get('@timestamp')
-        self.block_num = obj.get('block_num')
-        self.global_block_num = obj.get('@global', {}).get('block_num')
-        self.block_hash = obj.get('@blockHash')
-        self.evm_block_hash = obj.get('@evmBlockHash')
-        self.evm_prev_block_hash = obj.get('@evmPrevBlockHash')
-        self.receipts_root_hash = obj.get('@receiptsRootHash')
-        self.transactions_root = obj.get('@transactionsRoot')
-        self.gas_used = obj.get('gasUsed')
-        self.gas_limit = obj.get('gasLimit')
-        self.size = obj.get('size')
-        self.code = obj.get('code')
-        self.table = obj.get('table')
+def get_source_value(obj: dict, path: str):
+    # docs can also be indexed with literal dotted keys
+    if path in obj:
+        return obj[path]
+
+    for key in path.split('.'):
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+
+    return obj
+
+
+class StorageDocument:
+    '''Base for compact `__slots__` records built from an elastic `_source`.
+
+    Subclasses map attribute names to (possibly nested, dot separated)
+    `_source` keys in `_fields`, passing `fields` only copies those
+    attributes, the rest are left as None.
+    '''
+    __slots__ = ()
+    _fields: dict[str, str] = {}
+
+    def __init__(self, obj: dict, fields: Optional[Iterable[str]] = None):
+        selected = self._fields.keys() if fields is None else set(fields)
+        for attr, path in self._fields.items():
+            setattr(
+                self, attr,
+                get_source_value(obj, path) if attr in selected else None)
+
+    @classmethod
+    def source_fields(cls, fields: Optional[Iterable[str]] = None) -> List[str]:
+        '''`_source` filter that fetches only what `fields` needs.
+        '''
+        if fields is None:
+            fields = cls._fields.keys()
+
+        return [cls._fields[attr] for attr in fields]
+
+    def to_dict(self) -> dict:
+        return {
+            attr: getattr(self, attr)
+            for attr in self._fields if not attr.startswith('_')
+        }
+
+
+class StorageEosioDelta(StorageDocument):
+    _fields = {
+        'timestamp': '@timestamp',
+        'block_num': 'block_num',
+        'global_block_num': '@global.block_num',
+        'block_hash': '@blockHash',
+        'evm_block_hash': '@evmBlockHash',
+        'evm_prev_block_hash': '@evmPrevBlockHash',
+        'receipts_root_hash': '@receiptsRootHash',
+        'transactions_root': '@transactionsRoot',
+        'gas_used': 'gasUsed',
+        'gas_limit': 'gasLimit',
+        'size': 'size',
+        'code': 'code',
+        'table': 'table'
+    }
+    __slots__ = tuple(_fields)
 
     def block_nums_to_string(self):
         return format_block_numbers(self.block_num, self.global_block_num)
 
 
-class InternalEvmTransaction:
-    def __init__(self, obj: dict):
-        self.call_type = obj.get('callType')
-        self.from_address = obj.get('from')
-        self.gas = obj.get('gas')
-        self.input = obj.get('input')
-        self.input_trimmed = obj.get('input_trimmed')
-        self.to = obj.get('to')
-        self.value = obj.get('value')
-        self.gas_used = obj.get('gasUsed')
-        self.output = obj.get('output')
-        self.subtraces = obj.get('subtraces')
-        self.trace_address = obj.get('traceAddress')
-        self.type = obj.get('type')
-        self.depth = obj.get('depth')
-        self.extra = obj.get('extra')
-
-
-class StorageEvmTransaction:
-    def __init__(self, obj: dict):
-        self.hash = obj.get('hash')
-        self.from_address = obj.get('from')
-        self.trx_index = obj.get('trx_index')
-        self.block = obj.get('block')
-        self.block_hash = obj.get('block_hash')
-        self.to = obj.get('to')
-        self.input_data = obj.get('input_data')
-        self.input_trimmed = obj.get('input_trimmed')
-        self.value = obj.get('value')
-        self.nonce = obj.get('nonce')
-        self.gas_price = obj.get('gas_price')
-        self.gas_limit = obj.get('gas_limit')
-        self.status = obj.get('status')
-        self.itxs = [InternalEvmTransaction(tx) for tx in obj.get('itxs', [])]
-        self.epoch = obj.get('epoch')
-        self.createdaddr = obj.get('createdaddr')
-        self.gasused = obj.get('gasused')
-        self.gasusedblock = obj.get('gasusedblock')
-        self.charged_gas_price = obj.get('charged_gas_price')
-        self.output = obj.get('output')
-        self.logs = obj.get('logs')
-        self.logs_bloom = obj.get('logsBloom')
-        self.errors = obj.get('errors')
-        self.value_d = obj.get('value_d')
-        self.raw = obj.get('raw')
-        self.v = obj.get('v')
-        self.r = obj.get('r')
-        self.s = obj.get('s')
-
-class StorageEosioAction:
-    def __init__(self, obj: dict):
-        self.timestamp = obj.get('@timestamp')
-        self.trx_id = obj.get('trx_id')
-        self.action_ordinal = obj.get('action_ordinal')
-        self.signatures = obj.get('signatures')
-        self.raw = StorageEvmTransaction(obj.get('@raw'))
+class InternalEvmTransaction(StorageDocument):
+    _fields = {
+        'call_type': 'callType',
+        'from_address': 'from',
+        'gas': 'gas',
+        'input': 'input',
+        'input_trimmed': 'input_trimmed',
+        'to': 'to',
+        'value': 'value',
+        'gas_used': 'gasUsed',
+        'output': 'output',
+        'subtraces': 'subtraces',
+        'trace_address': 'traceAddress',
+        'type': 'type',
+        'depth': 'depth',
+        'extra': 'extra'
+    }
+    __slots__ = tuple(_fields)
+
+
+class StorageEvmTransaction(StorageDocument):
+    '''`itxs` are kept as the raw `_source` list and only turned into
+    `InternalEvmTransaction`s on first access, `logs` is never copied.
+    '''
+    _fields = {
+        'hash': 'hash',
+        'from_address': 'from',
+        'trx_index': 'trx_index',
+        'block': 'block',
+        'block_hash': 'block_hash',
+        'to': 'to',
+        'input_data': 'input_data',
+        'input_trimmed': 'input_trimmed',
+        'value': 'value',
+        'nonce': 'nonce',
+        'gas_price': 'gas_price',
+        'gas_limit': 'gas_limit',
+        'status': 'status',
+        'epoch': 'epoch',
+        'createdaddr': 'createdaddr',
+        'gasused': 'gasused',
+        'gasusedblock': 'gasusedblock',
+        'charged_gas_price': 'charged_gas_price',
+        'output': 'output',
+        'logs': 'logs',
+        'logs_bloom': 'logsBloom',
+        'errors': 'errors',
+        'value_d': 'value_d',
+        'raw': 'raw',
+        'v': 'v',
+        'r': 'r',
+        's': 's',
+        '_itxs_source': 'itxs'
+    }
+    __slots__ = tuple(_fields) + ('_itxs',)
+
+    def __init__(self, obj: dict, fields: Optional[Iterable[str]] = None):
+        if fields is not None and 'itxs' in fields:
+            fields = set(fields) | {'_itxs_source'}
+
+        super().__init__(obj if obj else {}, fields=fields)
+        self._itxs = None
+
+    @classmethod
+    def source_fields(cls, fields: Optional[Iterable[str]] = None) -> List[str]:
+        if fields is not None:
+            fields = ['_itxs_source' if f == 'itxs' else f for f in fields]
+
+        return super().source_fields(fields)
+
+    @property
+    def itxs(self) -> List[InternalEvmTransaction]:
+        if self._itxs is None:
+            self._itxs = [
+                InternalEvmTransaction(tx)
+                for tx in (self._itxs_source or [])
+            ]
+
+        return self._itxs
+
+
+class StorageEosioAction(StorageDocument):
+    '''`raw` is parsed from the `@raw` sub document on first access.
+    '''
+    _fields = {
+        'timestamp': '@timestamp',
+        'trx_id': 'trx_id',
+        'action_ordinal': 'action_ordinal',
+        'signatures': 'signatures',
+        '_raw_source': '@raw'
+    }
+    __slots__ = tuple(_fields) + ('_raw',)
+
+    def __init__(self, obj: dict, fields: Optional[Iterable[str]] = None):
+        if fields is not None and 'raw' in fields:
+            fields = set(fields) | {'_raw_source'}
+
+        super().__init__(obj, fields=fields)
+        self._raw = None
+
+    @classmethod
+    def source_fields(cls, fields: Optional[Iterable[str]] = None) -> List[str]:
+        if fields is not None:
+            fields = ['_raw_source' if f == 'raw' else f for f in fields]
+
+        return super().source_fields(fields)
+
+    @property
+    def raw(self) -> StorageEvmTransaction:
+        if self._raw is None:
+            self._raw = StorageEvmTransaction(self._raw_source)
+
+        return self._raw
+
+
+def find_histogram_anomalies(
+    buckets: List[dict]
+) -> tuple[Optional[int], List[tuple[int, int]]]:
+    '''Vectorized scan of `run_histogram_gap_check` buckets.
+
+    Returns the first missing block between consecutive non-empty buckets
+    (empty buckets included) if any, and the (min, max) block of every
+    bucket whose doc_count doesn't match its block span, in order.
+    '''
+    counts = np.fromiter(
+        (bucket['doc_count'] for bucket in buckets),
+        dtype=np.int64, count=len(buckets))
+    non_empty = [bucket for bucket, count in zip(buckets, counts) if count > 0]
+    counts = counts[counts > 0]
+
+    mins = np.fromiter(
+        (bucket['min_block']['value'] for bucket in non_empty),
+        dtype=np.int64, count=len(non_empty))
+    maxs = np.fromiter(
+        (bucket['max_block']['value'] for bucket in non_empty),
+        dtype=np.int64, count=len(non_empty))
+
+    gap = None
+    discontinuities = np.flatnonzero(maxs[:-1] + 1 < mins[1:])
+    if len(discontinuities) > 0:
+        gap = int(maxs[discontinuities[0]] + 1)
+
+    short = np.flatnonzero(counts != (maxs - mins) + 1)
+
+    return gap, [(int(mins[i]), int(maxs[i])) for i in short]
+
+
+def histogram_gap_query(lower: int, upper: int, interval: int) -> dict:
+    return {
+        'query': {
+            'range': {
+                '@global.block_num': {
+                    'gte': lower,
+                    'lte': upper
+                }
+            }
+        },
+        'aggs': {
+            'block_histogram': {
+                'histogram': {
+                    'field': '@global.block_num',
+                    'interval': interval,
+                    'min_doc_count': 0
+                },
+                'aggs': {
+                    'min_block': {
+                        'min': {
+                            'field': '@global.block_num'
+                        }
+                    },
+                    'max_block': {
+                        'max': {
+                            'field': '@global.block_num'
+                        }
+                    }
+                }
+            }
+        }
+    }
+
+
+def duplicates_query(
+    range_field: str,
+    key_field: str,
+    lower: int,
+    upper: int,
+    page_size: int,
+    after_key: Optional[dict] = None
+) -> dict:
+    '''Composite aggregation page over `key_field` that only keeps keys
+    present on more than one doc.
+    '''
+    composite = {
+        'size': page_size,
+        'sources': [
+            {'key': {'terms': {'field': key_field}}}
+        ]
+    }
+    if after_key:
+        composite['after'] = after_key
+
+    return {
+        'query': {
+            'range': {
+                range_field: {
+                    'gte': lower,
+                    'lte': upper
+                }
+            }
+        },
+        'aggs': {
+            'duplicates': {
+                'composite': composite,
+                'aggs': {
+                    'only_dups': {
+                        'bucket_selector': {
+                            'buckets_path': {'count': '_count'},
+                            'script': 'params.count > 1'
+                        }
+                    }
+                }
+            }
+        }
+    }
+
+
+def compute_integrity_shards(
+    suffixes: List[int],
+    lower_bound: int,
+    upper_bound: int,
+    docs_per_index: int
+) -> List[tuple[int, int]]:
+    bounds = sorted({suffix * docs_per_index for suffix in suffixes})
+    bounds = [b for b in bounds if lower_bound < b <= upper_bound]
+
+    shards = []
+    for start, end in zip(
+        [lower_bound] + bounds,
+        [b - 1 for b in bounds] + [upper_bound]
+    ):
+        if len(shards) > 0 and end - start < 2:
+            shards[-1] = (shards[-1][0], end)
+        else:
+            shards.append((start, end))
+
+    return shards
+
+
+def block_field(kind: str) -> str:
+    return '@global.block_num' if kind == 'delta' else '@raw.block'
+
+
+# request builders & response parsers shared by the sync and async drivers,
+# these do no I/O so both drivers issue the exact same queries
+
+def doc_counts_request(chain_name: str, kind: str) -> dict:
+    return {
+        'index': f'{chain_name}-{kind}-*',
+        'format': 'json',
+        'h': 'index,docs.count'
+    }
+
+
+def parse_doc_counts(rows: List[dict]) -> dict[str, int]:
+    return {row['index']: int(row.get('docs.count') or 0) for row in rows}
+
+
+def index_stats_request(
+    chain_name: str,
+    kind: str,
+    upper: Optional[int] = None,
+    indices: Optional[List[str]] = None
+) -> dict:
+    field = block_field(kind)
+    query = {'match_all': {}}
+    if upper is not None:
+        query = {'range': {field: {'lte': upper}}}
+
+    return {
+        'index': indices if indices else f'{chain_name}-{kind}-*',
+        'ignore_unavailable': True,
+        'size': 0,
+        'query': query,
+        'aggs': {
+            'per_index': {
+                'terms': {'field': '_index', 'size': 10_000},
+                'aggs': {
+                    'min_block': {'min': {'field': field}},
+                    'max_block': {'max': {'field': field}}
+                }
+            }
+        }
+    }
+
+
+def parse_index_stats(results: dict) -> dict:
+    stats = {}
+    for bucket in results.get('aggregations', {}).get('per_index', {}).get('buckets', []):
+        stats[bucket['key']] = {
+            'docs': bucket['doc_count'],
+            'min_block': int(bucket['min_block']['value']),
+            'max_block': int(bucket['max_block']['value'])
+        }
+
+    return stats
+
+
+def parse_write_blocked(settings: dict, indices: List[str]) -> List[str]:
+    '''Names in `indices` with `index.blocks.write` set, in input order.
+    '''
+    return [
+        name for name in indices
+        if settings.get(name, {}).get(
+            'settings', {}).get('index.blocks.write') == 'true'
+    ]
+
+
+def edge_block_request(index: str, order: str) -> dict:
+    return {
+        'index': index,
+        'size': 1,
+        'sort': [{'block_num': {'order': order}}]
+    }
+
+
+def last_block_before_request(index: str, evm_block_num: int) -> dict:
+    return {
+        'index': index,
+        'size': 1,
+        'sort': [{'@global.block_num': {'order': 'desc'}}],
+        'query': {
+            'range': {
+                '@global.block_num': {
+                    'lt': evm_block_num
+                }
+            }
+        }
+    }
+
+
+def first_hit_source(results: dict) -> Optional[dict]:
+    hits = results.get('hits', {}).get('hits', [])
+    if len(hits) == 0:
+        return None
+
+    return hits[0]['_source']
+
+
+def parse_duplicates_page(results: dict) -> tuple[list, Optional[dict]]:
+    '''Duplicated keys on a `duplicates_query` page and the key to resume
+    from, None once there are no more pages.
+    '''
+    agg = results.get('aggregations', {}).get('duplicates')
+    if not agg:
+        return [], None
+
+    return [bucket['key']['key'] for bucket in agg['buckets']], agg.get('after_key')
+
+
+def block_nums_query(lower: int, upper: int) -> dict:
+    '''Search args to page through `@global.block_num` doc values in
+    [lower, upper] with `search_after`.
+    '''
+    return {
+        'source': False,
+        'track_total_hits': False,
+        'docvalue_fields': ['@global.block_num'],
+        'sort': [{'@global.block_num': {'order': 'asc'}}],
+        'query': {
+            'range': {
+                '@global.block_num': {
+                    'gte': lower,
+                    'lte': upper
+                }
+            }
+        },
+        'filter_path': ['hits.hits.sort']
+    }
+
+
+def delete_range_query(field: str, value: int, upper: Optional[int] = None) -> dict:
+    field_range = {'gte': value}
+    if upper is not None:
+        field_range['lte'] = upper
+
+    return {'range': {field: field_range}}
+
+
+def check_delete_task(index: str, result: dict) -> Optional[dict]:
+    '''Log progress of a `delete_by_query` task from `tasks.get`, returns
+    its response once completed, None while still running.
+    '''
+    status = result['task'].get('status', {})
+    logging.info(
+        f'purge {index}: '
+        f'{status.get("deleted", 0)}/{status.get("total", 0)} docs deleted')
+
+    if not result['completed']:
+        return None
+
+    response = result.get('response', {})
+    if 'error' in result or len(response.get('failures', [])) > 0:
+        raise ElasticDataIntegrityError(
+            f'purge of {index} failed: {result.get("error", response.get("failures"))}')
+
+    logging.debug(f'delete result: {response}')
+    return response
+
+
+def purge_targets(
+    chain_name: str,
+    index_version: str,
+    block_num: int,
+    evm_block_num: int,
+    docs_per_index: int
+) -> List[tuple[str, str, int]]:
+    '''(index, field, lower bound) of the docs to delete inside the delta &
+    action indices holding `block_num`.
+    '''
+    suffix = get_suffix(block_num, docs_per_index)
+    return [
+        (f'{chain_name}-delta-{index_version}-{suffix}', 'block_num', block_num),
+        (f'{chain_name}-action-{index_version}-{suffix}', '@raw.block', evm_block_num)
+    ]
+
+
+def indices_newer_than(
+    infos: List['IndexInfo'],
+    chain_name: str,
+    kind: str,
+    index_version: str,
+    block_num: int,
+    docs_per_index: int
+) -> List[str]:
+    '''Names of `kind` indices entirely past the one holding `block_num`.
+    '''
+    target_num = int(get_suffix(block_num, docs_per_index))
+    prefix = f'{chain_name}-{kind}-{index_version}-'
+    return [
+        info.name for info in infos
+        if info.name.startswith(prefix) and info.suffix > target_num
+    ]
+
+
+# integrity logic shared by the sync and async drivers
+
+def find_suffix_gap(suffixes: List[int]) -> Optional[dict]:
+    for prev, curr in zip(suffixes, suffixes[1:]):
+        if curr - prev > 1:
+            return {
+                'gapStart': prev,
+                'gapEnd': curr
+            }
+
+    return None
+
+
+def missing_index_range(
+    deltas: List['IndexInfo'],
+    lower: int,
+    upper: int
+) -> Optional[tuple[int, int]]:
+    '''Evm block range covered by the first whole missing delta index,
+    from the block after the previous index max to the one before the next
+    index min, clipped to [lower, upper].
+    '''
+    gap = find_suffix_gap([info.suffix for info in deltas])
+    if not gap:
+        return None
+
+    by_suffix = {info.suffix: info for info in deltas}
+    prev_info = by_suffix[gap['gapStart']]
+    next_info = by_suffix[gap['gapEnd']]
+    if prev_info.max_block is None or next_info.min_block is None:
+        return None
+
+    start = max(prev_info.max_block + 1, lower)
+    end = min(next_info.min_block - 1, upper)
+    if start > end:
+        return None
+
+    return start, end
+
+
+def gap_check_shards(
+    shards: List[tuple[int, int]],
+    lower_bound: int,
+    upper_bound: int,
+    index_gap: Optional[tuple[int, int]],
+    strategy: str
+) -> List[tuple[int, int]]:
+    '''Bounds to run `strategy` gap checks on, one per shard.
+
+    Shards overlap by one block so gaps right at a shard boundary are
+    visible from inside the next shard. The histogram strategy only reports
+    the first gap, a missing index already is one so no shards are checked,
+    a scan reports every gap so it always runs.
+    '''
+    if strategy not in [GAP_STRATEGY_HISTOGRAM, GAP_STRATEGY_SCAN]:
+        raise ValueError(f'Unknown gap strategy \'{strategy}\'')
+
+    if upper_bound - lower_bound < 2:
+        return []
+
+    if index_gap is not None and strategy != GAP_STRATEGY_SCAN:
+        return []
+
+    return [
+        (start - 1 if i > 0 else start, end)
+        for i, (start, end) in enumerate(shards)
+    ]
+
+
+QueryPlan = Generator[list, list, Optional[int]]
+
+
+def gap_bisection(lower_bound: int, upper_bound: int, interval: int) -> QueryPlan:
+    '''Recursive histogram bisection looking for the first missing block.
+
+    Written as a query plan: yields batches of `run_histogram_gap_check`
+    args, expects their buckets sent back in the same order, and returns
+    the gap or None, see `run_query_plan`.
+    '''
+    interval = math.ceil(interval)
+
+    # Base case
+    if interval == 1:
+        return lower_bound
+
+    middle = (upper_bound + lower_bound) // 2
+
+    logging.debug(f'calculated middle {middle}')
+
+    lower_buckets, upper_buckets = yield [
+        (lower_bound, middle, interval // 2),
+        (middle + 1, upper_bound, interval // 2)
+    ]
+
+    # Recurse on the first half
+    if len(lower_buckets) == 0:
+        return middle  # Gap detected
+    elif lower_buckets[-1]['max_block']['value'] < middle:
+        lower_gap = yield from gap_bisection(lower_bound, middle, interval // 2)
+        if lower_gap:
+            return lower_gap
+
+    # Recurse on the second half
+    if len(upper_buckets) == 0:
+        return middle + 1  # Gap detected
+    elif upper_buckets[0]['min_block']['value'] > middle + 1:
+        upper_gap = yield from gap_bisection(middle + 1, upper_bound, interval // 2)
+        if upper_gap:
+            return upper_gap
+
+    # Check for gap between the halves
+    if (lower_buckets[-1]['max_block']['value'] + 1) < upper_buckets[0]['min_block']['value']:
+        return lower_buckets[-1]['max_block']['value']
+
+    # Find gaps between and inside buckets, only drill into short
+    # buckets that sit before the first discontinuity
+    gap, short_buckets = find_histogram_anomalies(lower_buckets + upper_buckets)
+    for bucket_min, bucket_max in short_buckets:
+        if gap is not None and bucket_min > gap:
+            break
+
+        inside_gap = yield from gap_bisection(bucket_min, bucket_max, interval // 2)
+        if inside_gap:
+            return inside_gap
+
+    return gap
+
+
+def run_query_plan(plan: QueryPlan, execute: Callable[[list], list]):
+    '''Drive a query plan, `execute` gets each batch of query args and
+    returns their results in order, returns what the plan returns.
+    '''
+    try:
+        batch = next(plan)
+        while True:
+            batch = plan.send(execute(batch))
+
+    except StopIteration as stop:
+        return stop.value
+
+
+class GapScanner:
+    '''Folds ascending block nums into inclusive `(start, end)` ranges of
+    blocks missing from [lower, upper].
+    '''
+
+    def __init__(self, lower: int, upper: int):
+        self.upper = upper
+        self.prev = lower - 1
+
+    def feed(self, block_num: int) -> Optional[tuple[int, int]]:
+        gap = None
+        if block_num > self.prev + 1:
+            gap = (self.prev + 1, block_num - 1)
+
+        self.prev = max(self.prev, block_num)
+        return gap
+
+    def finish(self) -> Optional[tuple[int, int]]:
+        if self.prev < self.upper:
+            return self.prev + 1, self.upper
+
+        return None
 
 
 def index_to_suffix_num(index: str) -> int:
@@ -137,6 +763,422 @@ class ESGapFound(ElasticDataIntegrityError):
         self.start = start
 
 
+class IntegrityReport:
+    '''Merged result of a sharded integrity check.
+    '''
+
+    def __init__(self, lower: int, upper: int):
+        self.lower = lower
+        self.upper = upper
+        self.shards: List[tuple[int, int]] = []
+        self.delta_dups: List[int] = []
+        self.action_dups: List[str] = []
+        self.gaps: List[int] = []
+        self.gap_ranges: List[tuple[int, Optional[int]]] = []
+
+    @property
+    def first_gap(self) -> Optional[int]:
+        return min(self.gaps) if len(self.gaps) > 0 else None
+
+    @property
+    def healthy(self) -> bool:
+        return (
+            len(self.delta_dups) + len(self.action_dups) + len(self.gaps)) == 0
+
+    def raise_for_errors(self, max_listed: int = 10):
+        '''Raise for the first error kind found, logs and messages only list
+        the first `max_listed` duplicates, the exception carries them all.
+        '''
+        if len(self.delta_dups) > 0:
+            logging.error(
+                f'{len(self.delta_dups)} block duplicates found, first: '
+                f'{json.dumps(self.delta_dups[:max_listed])}')
+
+        if len(self.action_dups) > 0:
+            logging.error(
+                f'{len(self.action_dups)} tx duplicates found, first: '
+                f'{json.dumps(self.action_dups[:max_listed])}')
+
+        if len(self.delta_dups) + len(self.action_dups) > 0:
+            raise ESDuplicatesFound(
+                f'Duplicates found! '
+                f'{len(self.action_dups)} txs {self.action_dups[:max_listed]}, '
+                f'{len(self.delta_dups)} blocks {self.delta_dups[:max_listed]}',
+                self.delta_dups, self.action_dups
+            )
+
+        gap = self.first_gap
+        if gap is not None:
+            raise ESGapFound(f'Gap found! {int(gap)}', int(gap))
+
+    def add_gaps(
+        self,
+        shard_gaps: Iterable[List[tuple[int, Optional[int]]]],
+        index_gap: Optional[tuple[int, int]] = None
+    ):
+        '''Add the gap ranges found per shard, plus the missing index range
+        unless a shard range already covers it.
+        '''
+        for gaps in shard_gaps:
+            for start, end in gaps:
+                self.gaps.append(start)
+                self.gap_ranges.append((start, end))
+
+        if index_gap is not None and not any(
+            start <= index_gap[0] and end is not None and end >= index_gap[1]
+            for start, end in self.gap_ranges
+        ):
+            self.gaps.append(index_gap[0])
+            self.gap_ranges.append(index_gap)
+
+    def merge(self, other: 'IntegrityReport'):
+        self.shards += other.shards
+        # dict keeps first seen order, membership checks are O(1)
+        self.delta_dups = list(dict.fromkeys(self.delta_dups + other.delta_dups))
+        self.action_dups = list(dict.fromkeys(self.action_dups + other.action_dups))
+        self.gaps += other.gaps
+        self.gap_ranges += other.gap_ranges
+
+    def to_dict(self) -> dict:
+        return {
+            'lower': self.lower,
+            'upper': self.upper,
+            'shards': self.shards,
+            'delta_dups': self.delta_dups,
+            'action_dups': self.action_dups,
+            'gaps': self.gaps,
+            'gap_ranges': self.gap_ranges
+        }
+
+
+class IntegrityCheckpoint:
+    '''Last verified block plus per-index stats (docs, min & max block)
+    as they were up to that block, persisted as json.
+    '''
+
+    def __init__(
+        self,
+        last_block: int,
+        deltas: dict | None = None,
+        actions: dict | None = None
+    ):
+        self.last_block = last_block
+        self.deltas = deltas if deltas else {}
+        self.actions = actions if actions else {}
+
+    @staticmethod
+    def load(path: Path) -> Optional['IntegrityCheckpoint']:
+        try:
+            with open(path, 'r') as checkpoint_file:
+                checkpoint = json.loads(checkpoint_file.read())
+
+            return IntegrityCheckpoint(
+                checkpoint['last_block'],
+                deltas=checkpoint['deltas'],
+                actions=checkpoint['actions']
+            )
+
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def save(self, path: Path):
+        tmp_path = Path(f'{path}.tmp')
+        with open(tmp_path, 'w+') as checkpoint_file:
+            checkpoint_file.write(json.dumps({
+                'last_block': self.last_block,
+                'deltas': self.deltas,
+                'actions': self.actions
+            }, indent=4))
+
+        tmp_path.replace(path)
+
+
+class IndexDigest:
+    '''Doc count, block range and a sha256 over the sorted
+    (block, hash) pairs of a single index.
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        docs: int,
+        min_block: Optional[int],
+        max_block: Optional[int],
+        digest: str
+    ):
+        self.name = name
+        self.docs = docs
+        self.min_block = min_block
+        self.max_block = max_block
+        self.digest = digest
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, IndexDigest) and self.to_dict() == other.to_dict()
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'docs': self.docs,
+            'min_block': self.min_block,
+            'max_block': self.max_block,
+            'digest': self.digest
+        }
+
+    @staticmethod
+    def from_dict(obj: dict) -> 'IndexDigest':
+        return IndexDigest(
+            obj['name'],
+            obj['docs'],
+            obj['min_block'],
+            obj['max_block'],
+            obj['digest']
+        )
+
+
+class IndexDigests:
+    '''Digest of every delta & action index of a node, persisted as json
+    so nodes can be compared by exchanging this file only.
+    '''
+
+    def __init__(
+        self,
+        chain_name: str,
+        indices: dict[str, IndexDigest] | None = None,
+        created_at: Optional[float] = None
+    ):
+        self.chain_name = chain_name
+        self.indices = indices if indices else {}
+        self.created_at = created_at if created_at else time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            'chain_name': self.chain_name,
+            'created_at': self.created_at,
+            'indices': {
+                name: digest.to_dict()
+                for name, digest in sorted(self.indices.items())
+            }
+        }
+
+    @staticmethod
+    def from_dict(obj: dict) -> 'IndexDigests':
+        return IndexDigests(
+            obj['chain_name'],
+            indices={
+                name: IndexDigest.from_dict(digest)
+                for name, digest in obj['indices'].items()
+            },
+            created_at=obj['created_at']
+        )
+
+    @staticmethod
+    def load(path: Path) -> Optional['IndexDigests']:
+        try:
+            with open(path, 'r') as digests_file:
+                return IndexDigests.from_dict(json.loads(digests_file.read()))
+
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def save(self, path: Path):
+        tmp_path = Path(f'{path}.tmp')
+        with open(tmp_path, 'w+') as digests_file:
+            digests_file.write(json.dumps(self.to_dict(), indent=4))
+
+        tmp_path.replace(path)
+
+    def diff(self, other: 'IndexDigests') -> dict:
+        '''Index names that differ between both nodes, only these need to
+        be drilled into.
+        '''
+        names = set(self.indices) | set(other.indices)
+        return {
+            'mismatched': sorted(
+                name for name in names
+                if name in self.indices and name in other.indices and
+                self.indices[name] != other.indices[name]
+            ),
+            'missing': sorted(
+                name for name in names if name not in self.indices),
+            'extra': sorted(
+                name for name in names if name not in other.indices)
+        }
+
+
+class LRUCache:
+    '''Size bounded, thread safe least recently used mapping that counts
+    hits & misses on `get`.
+    '''
+
+    def __init__(self, size: int):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def discard_if(self, predicate):
+        '''Drop every entry for which `predicate(key, value)` is true.
+        '''
+        with self._lock:
+            for key in [k for k, v in self._data.items() if predicate(k, v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._data),
+            'max_size': self.size,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+class IndexInfo:
+    '''Snapshot of a single chain index as seen by the `IndexCatalog`.
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        docs: int,
+        min_block: Optional[int] = None,
+        max_block: Optional[int] = None
+    ):
+        self.name = name
+        self.suffix = index_to_suffix_num(name)
+        self.docs = docs
+        self.min_block = min_block
+        self.max_block = max_block
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'suffix': self.suffix,
+            'docs': self.docs,
+            'min_block': self.min_block,
+            'max_block': self.max_block
+        }
+
+
+class IndexCatalog:
+    '''Ordered delta & action index list with doc counts and min/max block.
+
+    Lookups without ranges reuse the last `_cat/indices` listing for `ttl`
+    seconds, lookups with ranges always list again and only aggregate the
+    indices whose doc count moved since their range was last fetched,
+    usually just the index being written to. Code that deletes indices
+    calls `invalidate`, integrity checks call `expire` first so they never
+    start from a stale listing.
+
+    `get` fetches through the sync `driver`, the async driver keeps its own
+    catalog and does the I/O around `cached_rows`, `set_rows`,
+    `stale_ranges`, `set_ranges` and `infos` itself.
+    '''
+
+    def __init__(self, driver: Optional['ElasticDriver'] = None, ttl: float = 5.0):
+        self.driver = driver
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._rows: dict[str, List[tuple[str, int]]] = {}
+        self._fetched_at: dict[str, float] = {}
+        # index name -> (doc count the range was fetched at, min, max)
+        self._ranges: dict[str, tuple[int, Optional[int], Optional[int]]] = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at.clear()
+            self._ranges.clear()
+
+    def expire(self):
+        '''Drop the cached listings but keep block ranges, they are keyed
+        by doc count and get re-validated against the next listing.
+        '''
+        with self._lock:
+            self._fetched_at.clear()
+
+    def cached_rows(self, kind: str) -> Optional[List[tuple[str, int]]]:
+        '''(name, docs) rows of `kind` if still fresh under `ttl`.
+        '''
+        fetched_at = self._fetched_at.get(kind)
+        if (self.ttl > 0 and fetched_at is not None and
+            time.monotonic() - fetched_at <= self.ttl):
+            return self._rows[kind]
+
+        return None
+
+    def set_rows(self, kind: str, counts: dict[str, int]) -> List[tuple[str, int]]:
+        rows = sorted(counts.items(), key=lambda row: index_to_suffix_num(row[0]))
+        self._rows[kind] = rows
+        self._fetched_at[kind] = time.monotonic()
+        return rows
+
+    def stale_ranges(self, rows: List[tuple[str, int]]) -> List[str]:
+        '''Indices whose block range was fetched at a different doc count.
+        '''
+        return [
+            name for name, docs in rows
+            if self._ranges.get(name, (None,))[0] != docs
+        ]
+
+    def set_ranges(self, rows: List[tuple[str, int]], stale: List[str], stats: dict):
+        for name, docs in rows:
+            if name in stale:
+                index_stats = stats.get(name, {})
+                self._ranges[name] = (
+                    docs,
+                    index_stats.get('min_block'),
+                    index_stats.get('max_block')
+                )
+
+    def infos(self, rows: List[tuple[str, int]]) -> List[IndexInfo]:
+        return [
+            IndexInfo(name, docs, *self._ranges.get(name, (None, None, None))[1:])
+            for name, docs in rows
+        ]
+
+    def get(self, kind: str, ranges: bool = True) -> List[IndexInfo]:
+        '''Current `kind` indices ordered by suffix, with `ranges` False no
+        aggregation runs, the listing can be up to `ttl` seconds old and
+        indices keep the last block range fetched for them, which can be
+        stale or None.
+        '''
+        with self._lock:
+            rows = None if ranges else self.cached_rows(kind)
+            if rows is None:
+                rows = self.set_rows(kind, self.driver.get_index_doc_counts(kind))
+
+            stale = self.stale_ranges(rows) if ranges else []
+            if len(stale) > 0:
+                self.set_ranges(
+                    rows, stale,
+                    self.driver.get_index_stats(kind, indices=stale))
+
+            return self.infos(rows)
+
 
 class ElasticDriver:
 
@@ -146,6 +1188,27 @@ class ElasticDriver:
         self.docs_per_index = 10_000_000
 
         es_config = config['elasticsearch']
+        self.integrity_workers = es_config.get('integrity_workers', 4)
+        self.duplicate_page_size = es_config.get('duplicate_page_size', 10_000)
+        self.scan_page_size = es_config.get('scan_page_size', 10_000)
+        self.gap_strategy = es_config.get('gap_strategy', GAP_STRATEGY_HISTOGRAM)
+        self.sliced_purge = es_config.get('sliced_purge', True)
+        self.snapshot_timeout = es_config.get('snapshot_timeout', 3600)
+        self.catalog = IndexCatalog(
+            self, ttl=es_config.get('catalog_ttl', 5.0))
+
+        self.index_version = config['telos-evm-rpc'].get('elasitc_index_version', 'v1.5')
+        self.evm_block_delta = config.get(
+            'telosevm-translator', {}).get('evm_block_delta', 0)
+
+        hash_cache_size = es_config.get('hash_cache_size', 0)
+        self.hash_cache = LRUCache(hash_cache_size) if hash_cache_size > 0 else None
+
+        # point lookup results, misses are never cached
+        lookup_cache_size = es_config.get('lookup_cache_size', 4096)
+        self.delta_by_evm_cache = LRUCache(lookup_cache_size)
+        self.delta_by_native_cache = LRUCache(lookup_cache_size)
+        self.action_by_hash_cache = LRUCache(lookup_cache_size)
         self.elastic = Elasticsearch(
             f'{es_config["protocol"]}://{es_config["host"]}',
             basic_auth=(
@@ -153,31 +1216,80 @@ class ElasticDriver:
             )
         )
 
+    def route_index(self, kind: str, evm_block_num: int) -> str:
+        '''Name of the single `kind` index holding `evm_block_num`.
+
+        Uses the last known block ranges in the catalog without refreshing
+        them, falls back to the index the suffix math gives for the native
+        block num and as a last resort to the whole `{chain}-{kind}-*`
+        pattern.
+        '''
+        infos = self.catalog.get(kind, ranges=False)
+        for info in infos:
+            if (info.min_block is not None and
+                info.min_block <= evm_block_num <= info.max_block):
+                return info.name
+
+        native_block_num = evm_block_num + self.evm_block_delta
+        name = f'{self.chain_name}-{kind}-{self.index_version}-{get_suffix(native_block_num, self.docs_per_index)}'
+        if name in [info.name for info in infos]:
+            return name
+
+        return f'{self.chain_name}-{kind}-*'
+
+    def _search_one(self, index: str, field: str, value) -> Optional[dict]:
+        # routed index can be gone from a listing up to `catalog_ttl` old
+        result = self.elastic.search(
+            index=index,
+            ignore_unavailable=True,
+            size=1,
+            query={
+                'term': {
+                    field: value
+                }
+            }
+        )
+
+        logging.debug(result)
+
+        hits = result.get('hits', {}).get('hits', [])
+        if len(hits) == 0:
+            return None
+
+        return hits[0]['_source']
+
     def tx_from_hash(self, h: str):
+        action = self.action_by_hash_cache.get(h)
+        if action is not None:
+            return action
+
         try:
-            result = self.elastic.search(
-                index=f'{self.chain_name}-action-*',
-                size=1,
-                query={
-                    'match': {
-                        '@raw.hash': h
-                    }
-                }
-            )
+            index = f'{self.chain_name}-action-*'
+            block = None
+            if self.hash_cache is not None:
+                block = self.hash_cache.get(h)
 
-            logging.info(f'tx_from_hash: {h}')
-            logging.info(result)
+            if block is not None:
+                index = self.route_index('action', block)
 
-            if 'hits' not in result:
-                return None
+            logging.info(f'tx_from_hash: {h}, index: {index}')
 
-            if 'hits' not in result['hits']:
-                return None
+            source = self._search_one(index, '@raw.hash', h)
+
+            wildcard = f'{self.chain_name}-action-*'
+            if not source and index != wildcard:
+                source = self._search_one(wildcard, '@raw.hash', h)
 
-            if len(result['hits']['hits']) == 0:
+            if not source:
                 return None
 
-            return StorageEosioAction(result['hits']['hits'][0]['_source'])
+            action = StorageEosioAction(source)
+
+            if self.hash_cache is not None and action.raw.block is not None:
+                self.hash_cache.put(h, int(action.raw.block))
+
+            self.action_by_hash_cache.put(h, action)
+            return action
 
         except BaseException as error:
             logging.error(traceback.format_exc())
@@ -185,43 +1297,93 @@ class ElasticDriver:
             return None
 
     def block_from_evm_num(self, num: int):
+        doc = self.delta_by_evm_cache.get(num)
+        if doc is not None:
+            return doc
+
         try:
-            result = self.elastic.search(
-                index=f'{self.chain_name}-delta-*',
-                size=1,
-                query={
-                    'match': {
-                        '@global.block_num': num
-                    }
-                }
-            )
+            index = self.route_index('delta', num)
 
-            logging.info(f'block_from_evm_num: {num}')
-            logging.info(result)
+            logging.info(f'block_from_evm_num: {num}, index: {index}')
 
-            if 'hits' not in result:
-                return None
+            source = self._search_one(index, '@global.block_num', num)
 
-            if 'hits' not in result['hits']:
+            # routing uses block ranges that can lag behind, retry on a miss
+            wildcard = f'{self.chain_name}-delta-*'
+            if not source and index != wildcard:
+                source = self._search_one(wildcard, '@global.block_num', num)
+
+            if not source:
                 return None
 
-            if len(result['hits']['hits']) == 0:
+            doc = StorageEosioDelta(source)
+            self.delta_by_evm_cache.put(num, doc)
+            return doc
+
+        except BaseException as error:
+            logging.error(traceback.format_exc())
+            logging.error(error)
+            return None
+
+    def block_from_native_num(self, num: int):
+        doc = self.delta_by_native_cache.get(num)
+        if doc is not None:
+            return doc
+
+        try:
+            index = self.route_index('delta', num - self.evm_block_delta)
+
+            logging.info(f'block_from_native_num: {num}, index: {index}')
+
+            source = self._search_one(index, 'block_num', num)
+
+            # evm_block_delta can be off, retry against every index
+            wildcard = f'{self.chain_name}-delta-*'
+            if not source and index != wildcard:
+                source = self._search_one(wildcard, 'block_num', num)
+
+            if not source:
                 return None
 
-            return StorageEosioDelta(result['hits']['hits'][0]['_source'])
+            doc = StorageEosioDelta(source)
+            self.delta_by_native_cache.put(num, doc)
+            return doc
 
         except BaseException as error:
             logging.error(traceback.format_exc())
             logging.error(error)
             return None
 
-    def get_ordered_delta_indices(self):
-        index_pattern = f'{self.chain_name}-delta-*'
-        delta_indices = self.elastic.indices.get(index=index_pattern)
-        delta_indices = list(delta_indices.keys())
-        delta_indices.sort(key=lambda x: index_to_suffix_num(x))
+    def cache_stats(self) -> dict:
+        return {
+            'delta_by_evm': self.delta_by_evm_cache.stats(),
+            'delta_by_native': self.delta_by_native_cache.stats(),
+            'action_by_hash': self.action_by_hash_cache.stats()
+        }
+
+    def invalidate_lookups(self, evm_lower: int, evm_upper: Optional[int] = None):
+        '''Drop cached lookups for evm blocks >= `evm_lower`, or in
+        [evm_lower, evm_upper] if passed.
+        '''
+        def in_range(evm_block_num) -> bool:
+            if evm_block_num is None:
+                return True
+
+            return (evm_block_num >= evm_lower and
+                    (evm_upper is None or evm_block_num <= evm_upper))
 
-        return delta_indices
+        self.delta_by_evm_cache.discard_if(
+            lambda _, doc: in_range(doc.global_block_num))
+        self.delta_by_native_cache.discard_if(
+            lambda _, doc: in_range(doc.global_block_num))
+        self.action_by_hash_cache.discard_if(
+            lambda _, action: in_range(action.raw.block))
+
+        if self.hash_cache is not None:
+            self.hash_cache.discard_if(lambda _, block: in_range(block))
+
+    def get_ordered_delta_indices(self):
+        return [info.name for info in self.catalog.get('delta', ranges=False)]
 
     def get_first_indexed_block(self):
         indices = self.get_ordered_delta_indices()
@@ -229,20 +1391,11 @@ class ElasticDriver:
         if len(indices) == 0:
             return None
 
-        first_index = indices.pop(0)
         try:
-            result = self.elastic.search(
-                index=first_index,
-                size=1,
-                sort=[
-                    {'block_num': {'order': 'asc'}}
-                ]
-            )
+            source = first_hit_source(
+                self.elastic.search(**edge_block_request(indices[0], 'asc')))
 
-            if result.get('hits', {}).get('hits') and len(result.get('hits', {}).get('hits')) == 0:
-                return None
-
-            return StorageEosioDelta(result.get('hits', {}).get('hits', [])[0].get('_source'))
+            return StorageEosioDelta(source) if source else None
 
         except BaseException as error:
             logging.error(traceback.format_exc())
@@ -254,22 +1407,14 @@ class ElasticDriver:
         if len(indices) == 0:
             return None
 
-        for i in range(len(indices) - 1, -1, -1):
-            last_index = indices[i]
+        for last_index in reversed(indices):
             try:
-                result = self.elastic.search(
-                    index=last_index,
-                    size=1,
-                    sort=[
-                        {'block_num': {'order': 'desc'}}
-                    ]
-                )
+                block_doc = first_hit_source(
+                    self.elastic.search(**edge_block_request(last_index, 'desc')))
 
-                hits = result.get('hits', {}).get('hits', [])
-                if not hits or len(hits) == 0:
+                if not block_doc:
                     continue
 
-                block_doc = hits[0].get('_source')
                 logging.debug(f'getLastIndexedBlock:\n{json.dumps(block_doc, indent=4)}')
 
                 return StorageEosioDelta(block_doc)
@@ -281,56 +1426,57 @@ class ElasticDriver:
 
         return None
 
+    def get_newest_indexed_block(self) -> Optional[StorageEosioDelta]:
+        '''Last delta doc of the newest non empty delta index, read with a
+        `_cat/indices` call plus a sorted `size=1` search, never aggregates
+        nor goes through the catalog so it's cheap enough to poll.
+        '''
+        counts = self.get_index_doc_counts('delta')
+        for index in sorted(counts, key=index_to_suffix_num, reverse=True):
+            if counts[index] == 0:
+                continue
+
+            source = first_hit_source(
+                self.elastic.search(**edge_block_request(index, 'desc')))
+            if source:
+                return StorageEosioDelta(source)
+
+        return None
+
+    def last_valid_block_before(self, evm_block_num: int) -> Optional[StorageEosioDelta]:
+        '''Delta doc with the highest `@global.block_num` strictly below
+        `evm_block_num`, walking the delta indices backwards with a single
+        range + sort desc query each, indices that only hold newer blocks
+        are skipped using the catalog.
+        '''
+        for info in reversed(self.catalog.get('delta', ranges=False)):
+            if info.min_block is not None and info.min_block >= evm_block_num:
+                continue
+
+            source = first_hit_source(self.elastic.search(
+                **last_block_before_request(info.name, evm_block_num)))
+            if source:
+                return StorageEosioDelta(source)
+
+        return None
+
     def find_gap_in_indices(self):
         delta_indices = self.get_ordered_delta_indices()
         logging.debug('delta indices: ')
         logging.debug(json.dumps(delta_indices, indent=4))
-        for i in range(1, len(delta_indices)):
-            previous_index_suffix_num = index_to_suffix_num(delta_indices[i - 1])
-            current_index_suffix_num = index_to_suffix_num(delta_indices[i])
-
-            if current_index_suffix_num - previous_index_suffix_num > 1:
-                return {
-                    'gapStart': previous_index_suffix_num,
-                    'gapEnd': current_index_suffix_num
-                }
+        return find_suffix_gap(
+            [index_to_suffix_num(index) for index in delta_indices])
 
-        # Return None if no gaps found
-        return None
+    def find_missing_index_range(
+        self,
+        lower: int,
+        upper: int
+    ) -> Optional[tuple[int, int]]:
+        return missing_index_range(self.catalog.get('delta'), lower, upper)
 
     def run_histogram_gap_check(self, lower: int, upper: int, interval: int):
         index_name = f'{self.chain_name}-delta-*'
-        body = {
-            'query': {
-                'range': {
-                    '@global.block_num': {
-                        'gte': lower,
-                        'lte': upper
-                    }
-                }
-            },
-            'aggs': {
-                'block_histogram': {
-                    'histogram': {
-                        'field': '@global.block_num',
-                        'interval': interval,
-                        'min_doc_count': 0
-                    },
-                    'aggs': {
-                        'min_block': {
-                            'min': {
-                                'field': '@global.block_num'
-                            }
-                        },
-                        'max_block': {
-                            'max': {
-                                'field': '@global.block_num'
-                            }
-                        }
-                    }
-                }
-            }
-        }
+        body = histogram_gap_query(lower, upper, interval)
         results = self.elastic.search(index=index_name, size=0, **body)
 
         buckets = results['aggregations']['block_histogram']['buckets']
@@ -340,195 +1486,513 @@ class ElasticDriver:
 
         return buckets
 
-    def find_duplicate_deltas(self, lower: int, upper: int):
-        index_name = f'{self.chain_name}-delta-*'
-        body = {
-            'query': {
-                'range': {
-                    '@global.block_num': {
-                        'gte': lower,
-                        'lte': upper
-                    }
-                }
-            },
-            'aggs': {
-                'duplicate_blocks': {
-                    'terms': {
-                        'field': '@global.block_num',
-                        'min_doc_count': 2,
-                        'size': 100
-                    }
-                }
-            }
-        }
-        results = self.elastic.search(index=index_name, size=0, **body)
+    def iter_duplicates(
+        self,
+        index: str,
+        range_field: str,
+        key_field: str,
+        lower: int,
+        upper: int,
+        page_size: Optional[int] = None
+    ) -> Iterator:
+        '''Stream every `key_field` value that appears on more than one doc
+        with `range_field` in [lower, upper].
+
+        Uses a composite aggregation paged with `after_key`, so ES only ever
+        materializes `page_size` buckets at a time, a `bucket_selector`
+        prunes unique keys server side, which means a page can come back
+        empty while there are still more pages to go.
+        '''
+        page_size = page_size or self.duplicate_page_size
+        after_key = None
+        while True:
+            dups, after_key = parse_duplicates_page(self.elastic.search(
+                index=index,
+                size=0,
+                **duplicates_query(
+                    range_field, key_field, lower, upper, page_size, after_key)
+            ))
+
+            yield from dups
+
+            if not after_key:
+                return
+
+    def iter_duplicate_deltas(self, lower: int, upper: int, page_size: Optional[int] = None):
+        logging.debug(f'iterDuplicateDeltas: {lower}-{upper}')
+        yield from self.iter_duplicates(
+            f'{self.chain_name}-delta-*',
+            '@global.block_num', '@global.block_num',
+            lower, upper, page_size=page_size
+        )
 
-        if 'aggregations' in results:
-            buckets = results['aggregations']['duplicate_blocks']['buckets']
-            logging.debug(f'findDuplicateDeltas: {lower}-{upper}')
-            return [bucket['key'] for bucket in buckets]
-        else:
-            return []
+    def iter_duplicate_actions(self, lower: int, upper: int, page_size: Optional[int] = None):
+        logging.debug(f'iterDuplicateActions: {lower}-{upper}')
+        yield from self.iter_duplicates(
+            f'{self.chain_name}-action-*',
+            '@raw.block', '@raw.hash',
+            lower, upper, page_size=page_size
+        )
+
+    def find_duplicate_deltas(self, lower: int, upper: int):
+        return list(self.iter_duplicate_deltas(lower, upper))
 
     def find_duplicate_actions(self, lower: int, upper: int):
-        index_name = f'{self.chain_name}-action-*'
-        body = {
-            'query': {
-                'range': {
-                    '@raw.block': {
-                        'gte': lower,
-                        'lte': upper
-                    }
-                }
-            },
-            'aggs': {
-                'duplicate_txs': {
-                    'terms': {
-                        'field': '@raw.hash',
-                        'min_doc_count': 2,
-                        'size': 100
-                    }
-                }
-            }
-        }
-        results = self.elastic.search(index=index_name, size=0, **body)
+        return list(self.iter_duplicate_actions(lower, upper))
 
-        if 'aggregations' in results:
-            buckets = results['aggregations']['duplicate_txs']['buckets']
-            logging.debug(f'findDuplicateActions: {lower}-{upper}')
-            return [bucket['key'] for bucket in buckets]
-        else:
+    def check_gaps(self, lower_bound: int, upper_bound: int, interval: int) -> Optional[int]:
+        return run_query_plan(
+            gap_bisection(lower_bound, upper_bound, interval),
+            lambda batch: [self.run_histogram_gap_check(*args) for args in batch]
+        )
+
+    def get_integrity_shards(self, lower_bound: int, upper_bound: int):
+        '''Split [lower_bound, upper_bound] into contiguous shards, one per
+        delta index, bounded by the index suffix ranges.
+
+        Shards always cover the whole range even if an index doesn't exist,
+        queries run against the index wildcard so doc placement doesn't
+        affect correctness, shards spanning less than 3 blocks get merged
+        into their predecessor.
+        '''
+        return compute_integrity_shards(
+            [index_to_suffix_num(index) for index in self.get_ordered_delta_indices()],
+            lower_bound, upper_bound, self.docs_per_index
+        )
+
+    def iter_block_nums(
+        self,
+        lower: int,
+        upper: int,
+        page_size: Optional[int] = None
+    ) -> Iterator[int]:
+        '''Stream every `@global.block_num` in [lower, upper] in ascending
+        order, read from doc values through `search_after` pages.
+
+        Duplicated block nums that straddle a page boundary are only yielded
+        once.
+        '''
+        page_size = page_size or self.scan_page_size
+        search_after = None
+        while True:
+            kwargs = {}
+            if search_after is not None:
+                kwargs['search_after'] = search_after
+
+            results = self.elastic.search(
+                index=f'{self.chain_name}-delta-*',
+                size=page_size,
+                **block_nums_query(lower, upper),
+                **kwargs
+            )
+
+            hits = results.get('hits', {}).get('hits', [])
+            for hit in hits:
+                yield int(hit['sort'][0])
+
+            if len(hits) < page_size:
+                return
+
+            search_after = hits[-1]['sort']
+
+    def iter_documents(
+        self,
+        kind: str,
+        lower: int,
+        upper: int,
+        source: Optional[List[str]] = None,
+        page_size: Optional[int] = None,
+        keep_alive: str = '2m'
+    ) -> Iterator[dict]:
+        '''Stream `_source` of every `kind` ('delta' or 'action') doc with
+        block in [lower, upper], ordered by block, over a point in time so
+        the result is consistent while the translator keeps indexing.
+        '''
+        page_size = page_size or self.scan_page_size
+        field = '@global.block_num' if kind == 'delta' else '@raw.block'
+
+        pit = self.elastic.open_point_in_time(
+            index=f'{self.chain_name}-{kind}-*', keep_alive=keep_alive)
+        pit_id = pit['id']
+        search_after = None
+        try:
+            while True:
+                kwargs = {}
+                if search_after is not None:
+                    kwargs['search_after'] = search_after
+
+                if source is not None:
+                    kwargs['source'] = source
+
+                results = self.elastic.search(
+                    pit={'id': pit_id, 'keep_alive': keep_alive},
+                    size=page_size,
+                    track_total_hits=False,
+                    sort=[
+                        {field: {'order': 'asc'}},
+                        {'_shard_doc': {'order': 'asc'}}
+                    ],
+                    query={
+                        'range': {
+                            field: {
+                                'gte': lower,
+                                'lte': upper
+                            }
+                        }
+                    },
+                    **kwargs
+                )
+                pit_id = results.get('pit_id', pit_id)
+
+                hits = results.get('hits', {}).get('hits', [])
+                for hit in hits:
+                    yield hit['_source']
+
+                if len(hits) < page_size:
+                    return
+
+                search_after = hits[-1]['sort']
+
+        finally:
+            self.elastic.close_point_in_time(id=pit_id)
+
+    def iter_gaps(
+        self,
+        lower: int,
+        upper: int,
+        page_size: Optional[int] = None
+    ) -> Iterator[tuple[int, int]]:
+        '''Single linear pass over [lower, upper] yielding every missing
+        block range as an inclusive `(start, end)` tuple.
+        '''
+        scanner = GapScanner(lower, upper)
+        for block_num in self.iter_block_nums(lower, upper, page_size=page_size):
+            gap = scanner.feed(block_num)
+            if gap:
+                yield gap
+
+        gap = scanner.finish()
+        if gap:
+            yield gap
+
+    def _check_shard_gaps(
+        self,
+        lower: int,
+        upper: int,
+        strategy: str
+    ) -> List[tuple[int, Optional[int]]]:
+        '''Gap ranges found in shard, with the histogram strategy only the
+        first gap start is known so its range end is None.
+        '''
+        if upper - lower < 2:
             return []
 
-    def check_gaps(self, lower_bound: int, upper_bound: int, interval: int) -> Optional[int]:
+        if strategy == GAP_STRATEGY_SCAN:
+            return list(self.iter_gaps(lower, upper))
 
-        interval = math.ceil(interval)
-
-        # Base case
-        if interval == 1:
-            return lower_bound
-
-        middle = (upper_bound + lower_bound) // 2
-
-        logging.debug(f'calculated middle {middle}')
-
-        logging.debug('first half')
-        # Recurse on the first half
-        lower_buckets = self.run_histogram_gap_check(lower_bound, middle, interval // 2)
-        if len(lower_buckets) == 0:
-            return middle  # Gap detected
-        elif lower_buckets[-1]['max_block']['value'] < middle:
-            lower_gap = self.check_gaps(lower_bound, middle, interval // 2)
-            if lower_gap:
-                return lower_gap
-
-        logging.debug('second half')
-        # Recurse on the second half
-        upper_buckets = self.run_histogram_gap_check(middle + 1, upper_bound, interval // 2)
-        if len(upper_buckets) == 0:
-            return middle + 1  # Gap detected
-        elif upper_buckets[0]['min_block']['value'] > middle + 1:
-            upper_gap = self.check_gaps(middle + 1, upper_bound, interval // 2)
-            if upper_gap:
-                return upper_gap
-
-        # Check for gap between the halves
-        if (lower_buckets[-1]['max_block']['value'] + 1) < upper_buckets[0]['min_block']['value']:
-            return lower_buckets[-1]['max_block']['value']
-
-        # Find gaps inside bucket by doc_count
-        buckets = lower_buckets + upper_buckets
-        for i in range(len(buckets)):
-            if buckets[i]['doc_count'] != (buckets[i]['max_block']['value'] - buckets[i]['min_block']['value']) + 1:
-                inside_gap = self.check_gaps(buckets[i]['min_block']['value'], buckets[i]['max_block']['value'], interval // 2)
-                if inside_gap:
-                    return inside_gap
-
-        # No gap found
-        return None
+        gap = self.check_gaps(lower, upper, upper - lower)
+        return [(int(gap), None)] if gap is not None else []
 
-    def full_integrity_check(self):
+    def check_range(
+        self,
+        lower_bound: int,
+        upper_bound: int,
+        max_workers: Optional[int] = None,
+        gap_strategy: Optional[str] = None
+    ) -> IntegrityReport:
+        '''Run duplicate & gap scans over [lower_bound, upper_bound], return
+        the merged report without raising.
+        '''
+        report = IntegrityReport(lower_bound, upper_bound)
+        report.shards = self.get_integrity_shards(lower_bound, upper_bound)
+
+        workers = max_workers or self.integrity_workers
+        gap_strategy = gap_strategy or self.gap_strategy
+
+        # First just check if whole indices are missing
+        index_gap = None
+        if upper_bound - lower_bound >= 2:
+            index_gap = self.find_missing_index_range(lower_bound, upper_bound)
+            if index_gap:
+                logging.debug(f'whole index seems to be missing: {index_gap}')
+
+        gap_shards = gap_check_shards(
+            report.shards, lower_bound, upper_bound, index_gap, gap_strategy)
+
+        logging.info(
+            f'starting integrity check from {lower_bound} to {upper_bound}, '
+            f'{len(report.shards)} shards, {workers} workers, '
+            f'{gap_strategy} gap strategy')
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            delta_futs = [
+                pool.submit(self.find_duplicate_deltas, start, end)
+                for start, end in report.shards
+            ]
+            action_futs = [
+                pool.submit(self.find_duplicate_actions, start, end)
+                for start, end in report.shards
+            ]
+            gap_futs = [
+                pool.submit(self._check_shard_gaps, start, end, gap_strategy)
+                for start, end in gap_shards
+            ]
+
+            for fut in delta_futs:
+                report.delta_dups += fut.result()
+
+            for fut in action_futs:
+                report.action_dups += fut.result()
+
+            report.add_gaps(
+                [fut.result() for fut in gap_futs], index_gap=index_gap)
+
+        return report
+
+    def full_integrity_check(
+        self,
+        max_workers: Optional[int] = None,
+        gap_strategy: Optional[str] = None
+    ):
+        self.catalog.expire()
         lower_bound_doc = self.get_first_indexed_block()
         upper_bound_doc = self.get_last_indexed_block()
 
         if not lower_bound_doc or not upper_bound_doc:
             return None
 
-        lower_bound = lower_bound_doc.global_block_num
-        upper_bound = upper_bound_doc.global_block_num
-        step = 10_000_000
+        report = self.check_range(
+            lower_bound_doc.global_block_num,
+            upper_bound_doc.global_block_num,
+            max_workers=max_workers,
+            gap_strategy=gap_strategy
+        )
+        report.raise_for_errors()
 
-        delta_duplicates = []
-        action_duplicates = []
+        return report
 
-        for current_lower in range(lower_bound, upper_bound, step):
-            current_upper = min(current_lower + step, upper_bound)
+    def get_index_stats(
+        self,
+        kind: str,
+        upper: Optional[int] = None,
+        indices: Optional[List[str]] = None
+    ) -> dict:
+        '''Doc count and min/max block per index of `kind` ('delta' or
+        'action'), optionally only counting docs up to block `upper` and only
+        aggregating over `indices`.
+        '''
+        return parse_index_stats(self.elastic.search(
+            **index_stats_request(self.chain_name, kind, upper=upper, indices=indices)))
+
+    def get_index_doc_counts(self, kind: str) -> dict[str, int]:
+        '''Doc count of every `kind` index straight from `_cat/indices`,
+        no aggregation involved.
+        '''
+        return parse_doc_counts(
+            self.elastic.cat.indices(**doc_counts_request(self.chain_name, kind)))
+
+    def _changed_indices(
+        self,
+        kind: str,
+        prev_stats: dict,
+        counts: dict[str, int],
+        last_block: int
+    ) -> List[str]:
+        '''Indices whose docs up to `last_block` may differ from the ones in
+        `prev_stats`.
+
+        Indices whose `_cat/indices` doc count still matches are skipped,
+        only the rest (usually just the one being written to) get a range
+        count up to `last_block`.
+        '''
+        field = '@global.block_num' if kind == 'delta' else '@raw.block'
+        changed = []
+        for index in sorted(set(prev_stats) | set(counts)):
+            prev = prev_stats.get(index)
+            if index not in counts:
+                changed.append(index)
+                continue
+
+            if prev is not None and counts[index] == prev['docs']:
+                continue
+
+            docs = self.elastic.count(
+                index=index,
+                query={'range': {field: {'lte': last_block}}}
+            )['count']
+            if docs != (prev['docs'] if prev else 0):
+                changed.append(index)
 
-            delta_duplicates += self.find_duplicate_deltas(current_lower, current_upper)
-            action_duplicates += self.find_duplicate_actions(current_lower, current_upper)
+        return changed
 
-        if len(delta_duplicates) > 0:
-            logging.error(f'block duplicates found: {json.dumps(delta_duplicates)}')
+    def _save_checkpoint(
+        self,
+        checkpoint_path: Path,
+        last_block: int,
+        previous: Optional[IntegrityCheckpoint] = None
+    ):
+        '''Store `last_block` and the per index stats up to it, stats of
+        indices whose doc count didn't move since `previous` are reused so
+        only those being written to get aggregated.
+        '''
+        stats = {}
+        for kind in ['delta', 'action']:
+            if previous is None:
+                stats[kind] = self.get_index_stats(kind, upper=last_block)
+                continue
+
+            prev_stats = previous.deltas if kind == 'delta' else previous.actions
+            counts = self.get_index_doc_counts(kind)
+            stats[kind] = {
+                index: prev_stats[index]
+                for index, docs in counts.items()
+                if index in prev_stats and prev_stats[index]['docs'] == docs
+            }
+            stale = [index for index in counts if index not in stats[kind]]
+            if len(stale) > 0:
+                stats[kind].update(
+                    self.get_index_stats(kind, upper=last_block, indices=stale))
+
+        IntegrityCheckpoint(
+            last_block,
+            deltas=stats['delta'],
+            actions=stats['action']
+        ).save(checkpoint_path)
+
+    def incremental_integrity_check(
+        self,
+        checkpoint_path: Path,
+        max_workers: Optional[int] = None,
+        gap_strategy: Optional[str] = None
+    ):
+        '''Like `full_integrity_check` but only scans blocks newer than the
+        last verified block stored at `checkpoint_path`, plus the block range
+        of any index whose docs up to that block changed since.
 
-        if len(action_duplicates) > 0:
-            logging.error(f'tx duplicates found: {json.dumps(action_duplicates)}')
+        The checkpoint is only advanced when the checked ranges are healthy.
+        '''
+        self.catalog.expire()
+        checkpoint = IntegrityCheckpoint.load(checkpoint_path)
 
-        if len(delta_duplicates) + len(action_duplicates) > 0:
-            raise ESDuplicatesFound(
-                f'Duplicates found! {action_duplicates}, {delta_duplicates}',
-                delta_duplicates, action_duplicates
+        upper_bound_doc = self.get_last_indexed_block()
+        if not upper_bound_doc:
+            return None
+
+        upper_bound = upper_bound_doc.global_block_num
+
+        if (checkpoint is None or
+            upper_bound < checkpoint.last_block):
+            logging.info('no usable integrity checkpoint, running full check...')
+            report = self.full_integrity_check(
+                max_workers=max_workers, gap_strategy=gap_strategy)
+            if report:
+                self._save_checkpoint(checkpoint_path, report.upper)
+
+            return report
+
+        ranges = []
+        if upper_bound > checkpoint.last_block:
+            # start at last verified block so a gap right after it shows
+            ranges.append((checkpoint.last_block, upper_bound))
+
+        for kind, prev_stats in [
+            ('delta', checkpoint.deltas),
+            ('action', checkpoint.actions)
+        ]:
+            changed = self._changed_indices(
+                kind, prev_stats,
+                self.get_index_doc_counts(kind),
+                checkpoint.last_block
             )
+            if len(changed) == 0:
+                continue
+
+            curr_stats = self.get_index_stats(
+                kind, upper=checkpoint.last_block, indices=changed)
+            for index in changed:
+                prev = prev_stats.get(index)
+                curr = curr_stats.get(index)
+                if prev == curr:
+                    continue
 
-        if upper_bound - lower_bound < 2:
-            return
+                logging.info(f'index {index} changed since last check, re-checking...')
+                stats = [s for s in [prev, curr] if s]
+                ranges.append((
+                    min(s['min_block'] for s in stats),
+                    max(s['max_block'] for s in stats)
+                ))
 
-        # First just check if whole indices are missing
-        gap = self.find_gap_in_indices()
-        if gap:
-            logging.debug('whole index seems to be missing')
-            lower = gap['gapStart'] * self.docs_per_index
-            upper = (gap['gapStart'] + 1) * self.docs_per_index
-            agg = self.run_histogram_gap_check(
-                lower, upper, self.docs_per_index)
-            gap = agg[0]['max_block']['value'] + 1
-            raise ESGapFound(f'Gap found! {int(gap)}', int(gap))
+        report = IntegrityReport(
+            min([r[0] for r in ranges], default=checkpoint.last_block),
+            upper_bound
+        )
+        for lower, upper in ranges:
+            report.merge(
+                self.check_range(
+                    lower, upper,
+                    max_workers=max_workers,
+                    gap_strategy=gap_strategy))
 
-        initial_interval = upper_bound - lower_bound
+        report.raise_for_errors()
 
-        logging.info(f'starting full gap check from {lower_bound} to {upper_bound}')
+        self._save_checkpoint(checkpoint_path, upper_bound, previous=checkpoint)
 
-        gap = self.check_gaps(lower_bound, upper_bound, initial_interval)
-        if gap:
-            raise ESGapFound(f'Gap found! {int(gap)}', int(gap))
+        return report
 
-    def _purge_blocks_newer_than(self, block_num, evm_block_num):
-        target_suffix = get_suffix(block_num, self.docs_per_index)
-        delta_index = f'{self.chain_name}-delta-v1.5-{target_suffix}'
-        action_index = f'{self.chain_name}-action-v1.5-{target_suffix}'
+    def _purge_blocks_newer_than(
+        self,
+        block_num,
+        evm_block_num,
+        sliced: Optional[bool] = None
+    ):
+        targets = purge_targets(
+            self.chain_name, self.index_version,
+            block_num, evm_block_num, self.docs_per_index)
+        target_indices = [index for index, _, _ in targets]
 
-        try:
-            self._delete_by_query(delta_index, 'block_num', block_num)
+        self.thaw_indices([
+            info.name
+            for kind in ['delta', 'action']
+            for info in self.catalog.get(kind, ranges=False)
+            if info.name in target_indices
+        ])
 
-        except NotFoundError:
-            ...
+        if sliced is None:
+            sliced = self.sliced_purge
 
-        try:
-            self._delete_by_query(action_index, '@raw.block', evm_block_num)
+        if not sliced:
+            for index, field, value in targets:
+                try:
+                    self._delete_by_query(index, field, value)
+
+                except NotFoundError:
+                    ...
+
+            return
+
+        def _purge(index, field, value):
+            try:
+                self._delete_by_query_sliced(index, field, value)
+
+            except NotFoundError:
+                ...
 
-        except NotFoundError:
-            ...
+        with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            futs = [pool.submit(_purge, *target) for target in targets]
+            for fut in futs:
+                fut.result()
+
+        # deletes ran without refresh, do a single one at the end
+        self.elastic.indices.refresh(
+            index=target_indices,
+            ignore_unavailable=True
+        )
 
     def _delete_by_query(self, index, field, value):
         try:
             result = self.elastic.delete_by_query(
                 index=index,
-                query={
-                    'range': {
-                        field: {
-                            'gte': value
-                        }
-                    }
-                },
+                query=delete_range_query(field, value),
                 conflicts='proceed',
                 refresh=True,
                 error_trace=True
@@ -538,14 +2002,48 @@ class ElasticDriver:
             if e.__class__.__name__ != 'ResponseError' or e.info['error']['type'] != 'index_not_found_exception':
                 raise e
 
+    def _delete_by_query_sliced(
+        self,
+        index,
+        field,
+        value,
+        upper: Optional[int] = None,
+        poll_interval: float = 1.0
+    ):
+        '''Launch a sliced delete_by_query as a background ES task and poll
+        the tasks api until it completes. Doesn't refresh the index.
+
+        Deletes docs with `field` >= `value`, or in [value, upper] if passed.
+        '''
+        query = delete_range_query(field, value, upper=upper)
+        task = self.elastic.delete_by_query(
+            index=index,
+            query=query,
+            conflicts='proceed',
+            slices='auto',
+            refresh=False,
+            wait_for_completion=False
+        )
+        task_id = task['task']
+        logging.info(f'purging {index} {query}, task {task_id}')
+
+        while True:
+            response = check_delete_task(
+                index, self.elastic.tasks.get(task_id=task_id))
+            if response is not None:
+                return response
+
+            time.sleep(poll_interval)
+
     def _purge_indices_newer_than(self, block_num):
         logging.info(f'purging indices in db from block {block_num}...')
-        target_suffix = get_suffix(block_num, self.docs_per_index)
-        target_num = int(target_suffix)
-        delete_list = []
-
-        delete_list += self._collect_indices_to_delete('delta-v1.5', target_num)
-        delete_list += self._collect_indices_to_delete('action-v1.5', target_num)
+        delete_list = [
+            name
+            for kind in ['delta', 'action']
+            for name in indices_newer_than(
+                self.catalog.get(kind, ranges=False), self.chain_name, kind,
+                self.index_version, block_num, self.docs_per_index)
+        ]
 
         if delete_list:
             delete_result = self.elastic.indices.delete(index=delete_list)
@@ -553,20 +2051,22 @@ class ElasticDriver:
 
         return delete_list
 
-    def _collect_indices_to_delete(self, subfix, target_num):
-        indices = self.elastic.cat.indices(
-            index=f'{self.chain_name}-{subfix}-*',
-            format='json'
-        )
-        return [index['index'] for index in indices if index_to_suffix_num(index['index']) > target_num]
-
-    def purge_newer_than(self, block_num, evm_block_num):
+    def purge_newer_than(self, block_num, evm_block_num, sliced: Optional[bool] = None):
+        # deleting indices, never decide what to drop from a cached listing
+        self.catalog.invalidate()
         self._purge_indices_newer_than(block_num)
-        self._purge_blocks_newer_than(block_num, evm_block_num)
+        self._purge_blocks_newer_than(block_num, evm_block_num, sliced=sliced)
+        self.catalog.invalidate()
+        self.invalidate_lookups(evm_block_num)
 
-    def repair_data(self):
+    def repair_data(self, checkpoint_path: Optional[Path] = None):
         try:
-            self.full_integrity_check()
+            if checkpoint_path:
+                self.incremental_integrity_check(checkpoint_path)
+
+            else:
+                self.full_integrity_check()
+
             doc = self.get_last_indexed_block()
             if doc:
                 return doc.block_num, doc.global_block_num
@@ -579,14 +2079,9 @@ class ElasticDriver:
 
             bnum = err.start
             doc = self.block_from_evm_num(bnum)
-            backstep = 10
-            exp = 1
-            while not doc and exp < 6:
-                logging.info(f'block #{bnum} query returned None, trying older block...')
-                bnum -= backstep ** exp
-                exp += 1
-                time.sleep(1)
-                doc = self.block_from_evm_num(bnum)
+            if not doc:
+                logging.info(f'block #{bnum} query returned None, looking for last valid block...')
+                doc = self.last_valid_block_before(bnum)
 
             if not doc:
                 raise ElasticDataIntegrityError('Gap found but couldn\'t find last valid block!')
@@ -600,15 +2095,20 @@ class ElasticDriver:
 
             act_block = None
             if len(err.action_dups) > 0:
-                act_evm_block = es.tx_from_hash(err.action_dups[0]).raw.block
-                act_block = es.block_from_evm_num(act_evm_block)
-                min_block = act_block
+                tx = self.tx_from_hash(err.action_dups[0])
+                if tx:
+                    act_block = self.block_from_evm_num(tx.raw.block)
+                    min_block = act_block
+
+                else:
+                    logging.info(f'tx {err.action_dups[0]} not found, skipping...')
 
             delta_block = None
             if len(err.delta_dups) > 0:
-                delta_block = es.block_from_evm_num(err.delta_dups[0])
+                delta_block = self.block_from_evm_num(err.delta_dups[0])
 
-                if min_block and min_block.block_num > delta_block.block_num:
+                if delta_block and (
+                    not min_block or min_block.block_num > delta_block.block_num):
                     min_block = delta_block
 
             assert min_block  # Min block must be non null
@@ -619,3 +2119,471 @@ class ElasticDriver:
 
         # return last valid block nums
         return doc.block_num - 1, doc.global_block_num - 1
+
+    def find_damaged_ranges(
+        self,
+        lower: Optional[int] = None,
+        upper: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ) -> List[tuple[int, int]]:
+        '''Every damaged evm block range, gaps and duplicated blocks or txs,
+        merged into sorted, non overlapping inclusive ranges.
+        '''
+        self.catalog.expire()
+        if lower is None or upper is None:
+            lower_bound_doc = self.get_first_indexed_block()
+            upper_bound_doc = self.get_last_indexed_block()
+            if not lower_bound_doc or not upper_bound_doc:
+                raise ElasticDataEmptyError()
+
+            lower = lower_bound_doc.global_block_num
+            upper = upper_bound_doc.global_block_num
+
+        report = self.check_range(
+            lower, upper,
+            max_workers=max_workers,
+            gap_strategy=GAP_STRATEGY_SCAN
+        )
+
+        damaged = [
+            (int(start), int(end if end is not None else start))
+            for start, end in report.gap_ranges
+        ]
+        damaged += [(int(block), int(block)) for block in report.delta_dups]
+        for tx_hash in report.action_dups:
+            tx = self.tx_from_hash(tx_hash)
+            if tx:
+                damaged.append((int(tx.raw.block), int(tx.raw.block)))
+
+        merged = []
+        for start, end in sorted(damaged):
+            if len(merged) > 0 and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+
+        return merged
+
+    def targeted_repair(
+        self,
+        ranges: Optional[List[tuple[int, int]]] = None
+    ) -> List[dict]:
+        '''Delete only the docs on each damaged range instead of everything
+        newer than the first one.
+
+        Returns a work list, one entry per range with its native
+        (`start_block`, `end_block`) and evm bounds plus the hash of the
+        evm block right before it (`prev_hash`), for the translator to
+        backfill one at a time.
+        '''
+        if ranges is None:
+            ranges = self.find_damaged_ranges()
+
+        # deletes only shrink index ranges, one listing covers every range
+        indices = self.catalog.get('delta') + self.catalog.get('action')
+
+        work_list = []
+        for start, end in ranges:
+            # native minus evm block number, from the closest valid delta
+            prev_doc = self.last_valid_block_before(start)
+            if not prev_doc:
+                raise ElasticDataIntegrityError(
+                    f'no valid block found before evm block {start}')
+
+            offset = prev_doc.block_num - prev_doc.global_block_num
+
+            logging.info(f'repairing evm blocks {start}-{end}...')
+            self.thaw_indices([
+                info.name for info in indices
+                if info.min_block is not None and
+                    info.min_block <= end and info.max_block >= start
+            ])
+            for kind, field in [
+                ('delta', '@global.block_num'),
+                ('action', '@raw.block')
+            ]:
+                try:
+                    self._delete_by_query_sliced(
+                        f'{self.chain_name}-{kind}-*', field, start, upper=end)
+
+                except NotFoundError:
+                    ...
+
+            self.invalidate_lookups(start, end)
+
+            work_list.append({
+                'start_block': start + offset,
+                'end_block': end + offset,
+                'evm_start_block': start,
+                'evm_end_block': end,
+                'prev_hash': prev_doc.evm_block_hash
+            })
+
+        if len(ranges) > 0:
+            self.elastic.indices.refresh(
+                index=[
+                    f'{self.chain_name}-delta-*',
+                    f'{self.chain_name}-action-*'
+                ],
+                ignore_unavailable=True
+            )
+            self.catalog.invalidate()
+
+        return work_list
+
+    # index lifecycle
+
+    def get_completed_indices(self) -> List[str]:
+        '''Delta & action indices that will never be written to again.
+
+        A delta index is complete when a newer delta index exists, it holds
+        exactly one doc per block in its range and the next index starts
+        right after it; an action index is complete when its delta
+        counterpart is and a newer action index exists.
+        '''
+        deltas = self.catalog.get('delta')
+        actions = self.catalog.get('action')
+
+        completed_suffixes = set()
+        completed = []
+        for info, next_info in zip(deltas, deltas[1:]):
+            if (info.min_block is None or info.max_block is None or
+                next_info.min_block is None):
+                continue
+
+            if info.docs != info.max_block - info.min_block + 1:
+                continue
+
+            if next_info.min_block != info.max_block + 1:
+                continue
+
+            completed_suffixes.add(info.suffix)
+            completed.append(info.name)
+
+        completed += [
+            info.name for info in actions[:-1]
+            if info.suffix in completed_suffixes
+        ]
+
+        return completed
+
+    def get_write_blocked_indices(self, indices: List[str]) -> List[str]:
+        if len(indices) == 0:
+            return []
+
+        return parse_write_blocked(
+            self.elastic.indices.get_settings(
+                index=indices, name='index.blocks.write', flat_settings=True),
+            indices)
+
+    def freeze_index(self, index: str, max_num_segments: int = 1):
+        '''Block writes on `index` then force-merge it down to
+        `max_num_segments`.
+        '''
+        self.elastic.indices.put_settings(
+            index=index, settings={'index.blocks.write': True})
+
+        self.elastic.options(request_timeout=3600).indices.forcemerge(
+            index=index, max_num_segments=max_num_segments)
+
+    def thaw_indices(self, indices: List[str]):
+        '''Lift the write block set by `freeze_index`, needed before any
+        purge or repair touches a frozen index.
+        '''
+        frozen = self.get_write_blocked_indices(indices)
+        if len(frozen) == 0:
+            return
+
+        logging.info(f'lifting write block on {frozen}')
+        self.elastic.indices.put_settings(
+            index=frozen, settings={'index.blocks.write': None})
+
+    def optimize_completed_indices(
+        self,
+        dry_run: bool = False,
+        stop_event: Optional[threading.Event] = None
+    ) -> List[str]:
+        '''Freeze every completed index that isn't frozen yet, returns the
+        names of the indices (to be) optimized.
+
+        A single force-merge can take very long, if `stop_event` gets set
+        no new index is started and only the ones already done are returned.
+        '''
+        completed = self.get_completed_indices()
+        frozen = set(self.get_write_blocked_indices(completed))
+        pending = [name for name in completed if name not in frozen]
+
+        for i, index in enumerate(pending):
+            if stop_event is not None and stop_event.is_set():
+                logging.info(f'optimizer stopped, skipping {pending[i:]}')
+                return pending[:i]
+
+            if dry_run:
+                logging.info(f'would optimize {index}')
+                continue
+
+            start = time.time()
+            self.freeze_index(index)
+            logging.info(f'optimized {index} in {time.time() - start:.2f}s')
+
+        return pending
+
+    # snapshots
+
+    def chain_index_patterns(self) -> List[str]:
+        return [
+            f'{self.chain_name}-delta-*',
+            f'{self.chain_name}-action-*'
+        ]
+
+    def ensure_snapshot_repository(self):
+        self.elastic.snapshot.create_repository(
+            name=SNAPSHOT_REPOSITORY,
+            type='fs',
+            settings={
+                'location': SNAPSHOT_REPO_PATH,
+                'compress': True
+            }
+        )
+
+    def list_snapshots(self) -> List[dict]:
+        '''Snapshots of this chain in the repository, oldest first.
+        '''
+        self.ensure_snapshot_repository()
+        result = self.elastic.snapshot.get(
+            repository=SNAPSHOT_REPOSITORY, snapshot='*')
+
+        snapshots = [
+            snap for snap in result.get('snapshots', [])
+            if (snap.get('metadata') or {}).get('chain_name') == self.chain_name
+        ]
+        snapshots.sort(key=lambda snap: snap['start_time_in_millis'])
+        return snapshots
+
+    def create_snapshot(self, name: Optional[str] = None) -> dict:
+        '''Snapshot the chain delta & action indices.
+
+        The last indexed block is recorded in the snapshot metadata before
+        starting, anything the translator writes while the snapshot runs is
+        trimmed on restore so the indices always pair with that block.
+        '''
+        doc = self.get_last_indexed_block()
+        if not doc:
+            raise ElasticDataEmptyError()
+
+        if not name:
+            name = f'{self.chain_name}-{doc.block_num}'
+
+        self.ensure_snapshot_repository()
+
+        metadata = {
+            'chain_name': self.chain_name,
+            'index_version': self.index_version,
+            'block_num': doc.block_num,
+            'evm_block_num': doc.global_block_num
+        }
+        # waits for completion, way past the default client timeout
+        result = self.elastic.options(
+            request_timeout=self.snapshot_timeout).snapshot.create(
+            repository=SNAPSHOT_REPOSITORY,
+            snapshot=name,
+            indices=self.chain_index_patterns(),
+            include_global_state=False,
+            wait_for_completion=True,
+            metadata=metadata
+        )
+        snapshot = result['snapshot']
+        self.check_restorable(snapshot)
+
+        logging.info(f'created snapshot {name} at block {doc.block_num}')
+        return snapshot
+
+    def check_restorable(self, snapshot: dict):
+        '''Raise unless `snapshot` completed without shard failures, holds
+        delta & action indices of this chain and has the block metadata
+        needed to trim them.
+        '''
+        name = snapshot['snapshot']
+        if snapshot.get('state') != 'SUCCESS':
+            raise ElasticDataIntegrityError(
+                f'snapshot {name} is in state {snapshot.get("state")}, not restorable')
+
+        failed = snapshot.get('shards', {}).get('failed', 0)
+        if failed > 0:
+            raise ElasticDataIntegrityError(
+                f'snapshot {name} has {failed} failed shards, not restorable')
+
+        indices = snapshot.get('indices', [])
+        for kind in ['delta', 'action']:
+            if not any(index.startswith(f'{self.chain_name}-{kind}-') for index in indices):
+                raise ElasticDataIntegrityError(
+                    f'snapshot {name} has no {kind} indices for {self.chain_name}')
+
+        metadata = snapshot.get('metadata') or {}
+        if 'block_num' not in metadata or 'evm_block_num' not in metadata:
+            raise ElasticDataIntegrityError(
+                f'snapshot {name} has no block metadata')
+
+    def restore_snapshot(self, name: Optional[str] = None) -> dict:
+        '''Replace the chain indices with the ones in snapshot `name` (the
+        latest one by default) and trim them to the recorded block, returns
+        the snapshot metadata.
+        '''
+        snapshots = self.list_snapshots()
+        if name:
+            snapshots = [snap for snap in snapshots if snap['snapshot'] == name]
+
+        if len(snapshots) == 0:
+            raise ValueError(f'no snapshot found for {self.chain_name}')
+
+        snapshot = snapshots[-1]
+        metadata = snapshot['metadata']
+
+        # never drop the live indices for a snapshot that can't restore them
+        self.check_restorable(snapshot)
+
+        self.elastic.options(ignore_status=404).indices.delete(
+            index=self.chain_index_patterns())
+
+        self.elastic.options(
+            request_timeout=self.snapshot_timeout).snapshot.restore(
+            repository=SNAPSHOT_REPOSITORY,
+            snapshot=snapshot['snapshot'],
+            indices=self.chain_index_patterns(),
+            include_global_state=False,
+            wait_for_completion=True
+        )
+        self.catalog.invalidate()
+        self.purge_newer_than(
+            metadata['block_num'] + 1, metadata['evm_block_num'] + 1)
+
+        logging.info(
+            f'restored snapshot {snapshot["snapshot"]} '
+            f'at block {metadata["block_num"]}')
+        return metadata
+
+    # digests
+
+    def compute_index_digest(
+        self,
+        index: str,
+        kind: str,
+        page_size: Optional[int] = None,
+        keep_alive: str = '2m'
+    ) -> IndexDigest:
+        '''Stream (block, hash) pairs of `index` from doc values over a point
+        in time and fold them into a sha256.
+
+        Pairs are sorted by hash inside each block before hashing so the
+        digest doesn't depend on shard layout or indexing order.
+        '''
+        page_size = page_size or self.scan_page_size
+        block_field, hash_field = DIGEST_FIELDS[kind]
+
+        digest = hashlib.sha256()
+        docs = 0
+        min_block, max_block = None, None
+
+        pending_block = None
+        pending = []
+
+        def flush():
+            for value in sorted(pending):
+                digest.update(f'{pending_block}:{value}\n'.encode())
+
+            pending.clear()
+
+        pit = self.elastic.open_point_in_time(index=index, keep_alive=keep_alive)
+        pit_id = pit['id']
+        search_after = None
+        try:
+            while True:
+                kwargs = {}
+                if search_after is not None:
+                    kwargs['search_after'] = search_after
+
+                results = self.elastic.search(
+                    pit={'id': pit_id, 'keep_alive': keep_alive},
+                    size=page_size,
+                    source=False,
+                    track_total_hits=False,
+                    docvalue_fields=[hash_field],
+                    sort=[
+                        {block_field: {'order': 'asc'}},
+                        {'_shard_doc': {'order': 'asc'}}
+                    ],
+                    filter_path=['pit_id', 'hits.hits.sort', 'hits.hits.fields'],
+                    **kwargs
+                )
+                pit_id = results.get('pit_id', pit_id)
+
+                hits = results.get('hits', {}).get('hits', [])
+                for hit in hits:
+                    block = int(hit['sort'][0])
+                    if block != pending_block:
+                        flush()
+                        pending_block = block
+
+                    pending.append(
+                        hit.get('fields', {}).get(hash_field, [''])[0])
+
+                    docs += 1
+                    if min_block is None:
+                        min_block = block
+
+                    max_block = block
+
+                if len(hits) < page_size:
+                    break
+
+                search_after = hits[-1]['sort']
+
+        finally:
+            self.elastic.close_point_in_time(id=pit_id)
+
+        flush()
+
+        return IndexDigest(index, docs, min_block, max_block, digest.hexdigest())
+
+    def compute_digests(
+        self,
+        previous: Optional[IndexDigests] = None,
+        max_workers: Optional[int] = None
+    ) -> IndexDigests:
+        '''Digest every delta & action index, write blocked indices whose doc
+        count matches their `previous` digest are reused as is.
+        '''
+        self.catalog.expire()
+        targets = [
+            (info, kind)
+            for kind in ['delta', 'action']
+            for info in self.catalog.get(kind, ranges=False)
+        ]
+
+        frozen = set(self.get_write_blocked_indices(
+            [info.name for info, _ in targets]))
+
+        digests = IndexDigests(self.chain_name)
+        pending = []
+        for info, kind in targets:
+            prev = previous.indices.get(info.name) if previous else None
+            if prev and info.name in frozen and prev.docs == info.docs:
+                digests.indices[info.name] = prev
+
+            else:
+                pending.append((info.name, kind))
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers or self.integrity_workers
+        ) as pool:
+            for digest in pool.map(
+                lambda target: self.compute_index_digest(*target), pending
+            ):
+                digests.indices[digest.name] = digest
+
+        logging.info(
+            f'digested {len(pending)} indices, '
+            f'reused {len(targets) - len(pending)}')
+
+        return digests
+
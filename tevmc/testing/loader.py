@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import logging
+
+from typing import Callable, Iterable, Iterator, Optional
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import parallel_bulk
+
+from tevmc.testing.database import get_suffix
+
+
+ACTION_MAPPINGS = {
+    'properties': {
+        '@raw.hash': {
+            'type': 'keyword'
+        }
+    }
+}
+
+
+def generate_delta_docs(
+    index_prefix: str,
+    start_time: datetime,
+    ranges: Iterable[tuple[int, int]],
+    docs_per_index: int = 10_000_000
+) -> Iterator[dict]:
+    '''Lazily yield bulk index actions for a synthetic delta doc per block
+    on each inclusive range.
+    '''
+    for rstart, rend in ranges:
+        for i in range(rstart, rend + 1, 1):
+            yield {
+                '_index': f'{index_prefix}-{get_suffix(i, docs_per_index)}',
+                '_source': {
+                    '@timestamp': start_time + (i * timedelta(seconds=0.5)),
+                    '@global': {
+                        'block_num': i
+                    },
+                    'block_num': i - 10
+                }
+            }
+
+
+def generate_action_docs(
+    index_prefix: str,
+    txs: Iterable[dict],
+    docs_per_index: int = 10_000_000,
+    on_index: Optional[Callable[[str], None]] = None
+) -> Iterator[dict]:
+    '''Lazily yield bulk index actions for `txs`, `on_index` is called with
+    each doc's index right before it is yielded.
+    '''
+    for tx in txs:
+        index = f'{index_prefix}-{get_suffix(tx["@raw.block"], docs_per_index)}'
+        if on_index:
+            on_index(index)
+
+        yield {
+            '_index': index,
+            '_source': tx
+        }
+
+
+def delta_indices_for(
+    index_prefix: str,
+    ranges: Iterable[tuple[int, int]],
+    docs_per_index: int = 10_000_000
+) -> list[str]:
+    suffixes = set()
+    for rstart, rend in ranges:
+        for suffix in range(rstart // docs_per_index, (rend // docs_per_index) + 1):
+            suffixes.add(get_suffix(suffix * docs_per_index, docs_per_index))
+
+    return [f'{index_prefix}-{suffix}' for suffix in sorted(suffixes)]
+
+
+@contextmanager
+def refresh_disabled(
+    es: Elasticsearch,
+    indices: Iterable[str] = (),
+    mappings: Optional[dict] = None
+):
+    '''Create `indices` (if missing) with refresh turned off, on exit
+    restore the refresh interval each one had before and refresh them once.
+
+    Yields a callable that does the same for one more index, so indices
+    only known while streaming docs can be added before their first doc.
+    '''
+    previous = {}
+
+    def disable(index: str):
+        if index in previous:
+            return
+
+        settings = es.options(ignore_status=404).indices.get_settings(
+            index=index, name='index.refresh_interval', flat_settings=True)
+        previous[index] = settings.get(index, {}).get(
+            'settings', {}).get('index.refresh_interval')
+
+        es.options(ignore_status=400).indices.create(
+            index=index,
+            mappings=mappings,
+            settings={'refresh_interval': '-1'}
+        )
+        es.indices.put_settings(
+            index=index, settings={'refresh_interval': '-1'})
+
+    for index in indices:
+        disable(index)
+
+    try:
+        yield disable
+
+    finally:
+        # None puts back the cluster default on indices that had no value
+        for value in set(previous.values()):
+            es.indices.put_settings(
+                index=[index for index, prev in previous.items() if prev == value],
+                settings={'refresh_interval': value})
+
+        if len(previous) > 0:
+            es.indices.refresh(index=list(previous))
+
+
+def bulk_load(
+    es: Elasticsearch,
+    actions: Iterable[dict],
+    chunk_size: int = 5_000,
+    thread_count: int = 4,
+    queue_size: int = 4
+) -> int:
+    '''Push `actions` with `parallel_bulk`, only `thread_count * queue_size`
+    chunks are ever in flight, returns number of indexed docs.
+    '''
+    indexed = 0
+    for ok, info in parallel_bulk(
+        es, actions,
+        chunk_size=chunk_size,
+        thread_count=thread_count,
+        queue_size=queue_size,
+        raise_on_error=False
+    ):
+        if not ok:
+            raise ValueError(f'bulk load failed: {info}')
+
+        indexed += 1
+
+    logging.info(f'bulk loaded {indexed} docs')
+    return indexed
+
+
+def load_test_range(
+    es: Elasticsearch,
+    chain_name: str,
+    start_time: datetime,
+    ranges: Iterable[tuple[int, int]],
+    txs: Iterable[dict] = [],
+    action_index_spec: str = 'action-v1.5',
+    delta_index_spec: str = 'delta-v1.5',
+    docs_per_index: int = 10_000_000,
+    chunk_size: int = 5_000,
+    thread_count: int = 4
+) -> int:
+    '''Load synthetic delta docs for `ranges` and action docs for `txs`
+    with refresh disabled during the load.
+
+    `txs` is streamed, action indices are created as their first doc shows
+    up.
+    '''
+    ranges = list(ranges)
+    delta_prefix = f'{chain_name}-{delta_index_spec}'
+    action_prefix = f'{chain_name}-{action_index_spec}'
+
+    delta_indices = delta_indices_for(delta_prefix, ranges, docs_per_index)
+
+    indexed = 0
+    with (
+        refresh_disabled(es, delta_indices),
+        refresh_disabled(es, mappings=ACTION_MAPPINGS) as add_action_index
+    ):
+        indexed += bulk_load(
+            es,
+            generate_delta_docs(delta_prefix, start_time, ranges, docs_per_index),
+            chunk_size=chunk_size, thread_count=thread_count)
+
+        indexed += bulk_load(
+            es,
+            generate_action_docs(
+                action_prefix, txs, docs_per_index,
+                on_index=add_action_index),
+            chunk_size=chunk_size, thread_count=thread_count)
+
+    return indexed
@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 
-import re
 import os
 import sys
 import time
 import signal
 import logging
-import subprocess
+import threading
 
 from copy import deepcopy
 from hashlib import sha1
@@ -27,7 +26,22 @@ from leap.cleos import CLEOS
 from leap.sugar import download_latest_snapshot
 from tevmc.cmdline.build import build_service, perform_config_build, service_alias_to_fullname
 
+from tevmc.logs import LogFollower, LogHub
 from tevmc.routes import add_routes
+from tevmc.scheduler import StartupScheduler
+from tevmc.probes import (
+    ProbeResult,
+    ReadinessProbe,
+    elastic_health,
+    evm_block_number,
+    nodeos_get_info,
+    nodeos_head_advancing,
+    redis_ping,
+    run_probes,
+    websocket_accepts
+)
+from tevmc.monitor import ElasticTelemetry, IndexLagMonitor, IndexOptimizer
+from tevmc.testing.database import SNAPSHOT_REPO_PATH, ElasticDriver
 
 from .config import *
 from .utils import *
@@ -38,8 +52,17 @@ class TEVMCException(BaseException):
     ...
 
 
+# services that log into the main logs dir instead of docker logs
+MAIN_DIR_LOG_SERVICES = ['nodeos', 'telosevm-translator', 'telos-evm-rpc']
+
+
 class TEVMController:
 
+    # services `readiness_probe` knows how to check
+    READINESS_PROBES = [
+        'redis', 'elasticsearch', 'nodeos', 'telosevm-translator', 'telos-evm-rpc'
+    ]
+
     def __init__(
         self,
         config: dict[str, dict],
@@ -117,6 +140,9 @@ class TEVMController:
             self.chain_type = 'mainnet'
 
         self.cleos: CLEOSEVM = None
+        self.lag_monitor: IndexLagMonitor | None = None
+        self.es_telemetry: ElasticTelemetry | None = None
+        self.index_optimizer: IndexOptimizer | None = None
 
         if self.is_local:
             self.producer_key = config['nodeos']['ini']['sig_provider'].split(':')[-1]
@@ -179,6 +205,12 @@ class TEVMController:
         self.containers = {}
         self.mounts = {}
 
+        self.readiness: dict[str, ProbeResult] = {}
+        self.startup_timings: dict[str, dict] = {}
+
+        self.log_hubs: dict[str, LogHub] = {}
+        self._log_hubs_lock = threading.Lock()
+
         self.api = Flask(f'tevmc-{os.getpid()}')
 
     def _dump_config(self):
@@ -290,24 +322,136 @@ class TEVMController:
             # self.logger.info('removed.')
 
 
+    def _open_log_source(self, service: str):
+        '''Returns the `open_source` callable for the service log hub, main
+        dir services are followed from their log file, the rest from the
+        docker log stream of their current container.
+        '''
+        if service in MAIN_DIR_LOG_SERVICES:
+            log_path = (self.main_logs_dir / f'{service}.log').resolve()
+
+            def open_source(first: bool):
+                # a file that reappears is a new one, read it whole
+                return LogFollower(log_path, lines=100 if first else None)
+
+            return open_source
+
+        last_container_id = None
+
+        def open_source(first: bool):
+            nonlocal last_container_id
+            container = self.containers[service]
+            same_container = container.id == last_container_id
+            last_container_id = container.id
+            return (
+                payload
+                for _, payload in docker_stream_log_frames(
+                    container, timeout=None, lines=0,
+                    from_latest=same_container)
+            )
+
+        return open_source
+
+    def log_hub(self, service: str) -> LogHub:
+        with self._log_hubs_lock:
+            hub = self.log_hubs.get(service)
+            if not hub:
+                hub = LogHub(
+                    service,
+                    self._open_log_source(service),
+                    size=self.config.get('daemon', {}).get('log_buffer_lines', 10_000),
+                    logger=self.logger
+                )
+                hub.start()
+                self.log_hubs[service] = hub
+
+            return hub
+
+    def stop_log_hubs(self):
+        with self._log_hubs_lock:
+            for hub in self.log_hubs.values():
+                hub.stop()
+
+            self.log_hubs = {}
+
     def stream_logs(self, container, timeout=30.0, num=100, from_latest=False):
         if container is None:
             self.logger.critical("container is None")
             raise StopIteration
 
-        elif container in ['nodeos', 'telosevm-translator', 'telos-evm-rpc']:
-            for line in self._stream_logs_from_main_dir(
-                container, num, timeout=int(timeout)):
-                yield line
+        main_dir = container in MAIN_DIR_LOG_SERVICES
+
+        # file logs used to be `tail -n num` for timeout seconds, docker
+        # logs the whole container log with timeout between messages
+        subscription = self.log_hub(container).subscribe(
+            backlog=num if main_dir or from_latest else None,
+            timeout=timeout if main_dir else None,
+            idle_timeout=None if main_dir else timeout
+        )
+        for line in subscription:
+            msg = line.decode('utf-8', errors='replace')
+            if main_dir:
+                self.logger.info(msg.rstrip())
+
+            yield msg
+
+        if subscription.timed_out:
+            raise TimeoutError(
+                f'no matching {container} log line after {timeout}s')
+
+    def readiness_probe(self, service: str, once: bool = False) -> ReadinessProbe:
+        '''Probe for `service`, with `once` set checks must be able to pass
+        on a single call.
+        '''
+        timeout = self.config.get('daemon', {}).get('readiness_timeout', 600.0)
+
+        if service == 'redis':
+            port = int(self.config['redis']['port'])
+            check = lambda: redis_ping('127.0.0.1', port)
+
+        elif service == 'elasticsearch':
+            config = self.config['elasticsearch']
+            check = lambda: elastic_health(
+                f'{config["protocol"]}://{config["host"]}',
+                (config['user'], config['pass']))
+
+        elif service == 'nodeos':
+            port = int(self.config['nodeos']['ini']['http_addr'].split(':')[1])
+            url = f'http://127.0.0.1:{port}'
+            if once:
+                check = lambda: nodeos_get_info(url)
+
+            else:
+                check = nodeos_head_advancing(url)
+
+        elif service == 'telosevm-translator':
+            uri = self.config['telos-evm-rpc']['indexer_websocket_uri']
+            check = lambda: websocket_accepts(uri)
+
+        elif service == 'telos-evm-rpc':
+            port = self.config['telos-evm-rpc']['api_port']
+            check = lambda: evm_block_number(f'http://127.0.0.1:{port}/evm')
 
         else:
-            for chunk in docker_stream_logs(
-                self.containers[container],
-                lines=num,
-                timeout=timeout,
-                from_latest=from_latest
-            ):
-                yield chunk
+            raise ValueError(f'no readiness probe for {service}')
+
+        return ReadinessProbe(service, check, timeout=timeout)
+
+    def await_ready(self, *services: str) -> dict[str, ProbeResult]:
+        '''Wait concurrently until every service in `services` passes its
+        readiness probe, records time to ready in `self.readiness`.
+        '''
+        results = run_probes(
+            [self.readiness_probe(service) for service in services],
+            logger=self.logger)
+        self.readiness.update(results)
+
+        for result in results.values():
+            if not result.ready:
+                raise TEVMCException(
+                    f'{result.name} not ready after {result.elapsed:.2f}s: {result.error}')
+
+        return results
 
     @contextmanager
     def must_keep_running(self, container: str):
@@ -362,10 +506,7 @@ class TEVMController:
                     ipv4_address=config['virtual_ip']
                 )
 
-            for msg in self.stream_logs('redis'):
-                self.logger.info(msg.rstrip())
-                if 'Ready to accept connections' in msg:
-                    break
+            self.await_ready('redis')
 
     def start_elasticsearch(self):
         with self.must_keep_running('elasticsearch'):
@@ -375,8 +516,12 @@ class TEVMController:
             data_dir = docker_dir / config['data_dir']
             data_dir.mkdir(parents=True, exist_ok=True)
 
+            snapshots_dir = docker_dir / config.get('snapshots_dir', 'snapshots')
+            snapshots_dir.mkdir(parents=True, exist_ok=True)
+
             self.mounts['elasticsearch'] = [
-                Mount('/home/elasticsearch/data', str(data_dir.resolve()), 'bind')
+                Mount('/home/elasticsearch/data', str(data_dir.resolve()), 'bind'),
+                Mount(SNAPSHOT_REPO_PATH, str(snapshots_dir.resolve()), 'bind')
             ]
 
             es_port = int(config['host'].split(':')[-1])
@@ -410,10 +555,7 @@ class TEVMController:
                     ipv4_address=config['virtual_ip']
                 )
 
-            for msg in self.stream_logs('elasticsearch'):
-                self.logger.info(msg.rstrip())
-                if ' indices into cluster_state' in msg:
-                    break
+            self.await_ready('elasticsearch')
 
     def stop_elasticsearch(self):
         self.containers['elasticsearch'].kill(signal.SIGTERM)
@@ -642,11 +784,15 @@ class TEVMController:
                 if self.skip_init:
                     return
 
-                output = ''
-                for msg in self.stream_logs('nodeos', timeout=60*10, from_latest=True):
-                    output += msg
-                    if 'Produced' in msg:
-                        break
+                # start reading nodeos logs before waiting so the whole
+                # boot output is on the hub for the fresh state check
+                boot_logs = self.log_hub('nodeos').subscribe(backlog=100)
+
+                self.await_ready('nodeos')
+
+                boot_logs.idle_timeout = 0
+                output = ''.join(
+                    line.decode('utf-8', errors='replace') for line in boot_logs)
 
                 # await for nodeos to produce a block
                 self.cleos.wait_blocks(4)
@@ -673,9 +819,7 @@ class TEVMController:
             else:
                 if ('--replay-blockchain' not in self.additional_nodeos_params and
                     len(config['ini']['peers']) > 0):
-                    for msg in self.stream_logs('nodeos', timeout=60*10, from_latest=True):
-                        if 'Received' in msg:
-                            break
+                    self.await_ready('nodeos')
 
             if not self.skip_init:
                 # wait until nodeos apis are up
@@ -724,37 +868,7 @@ class TEVMController:
         lines: int = 100,
         timeout: int = 60
     ):
-        log_path = self.main_logs_dir
-        log_path /= f'{service}.log'
-        log_path = log_path.resolve()
-
-        for _ in range(3):
-            if not log_path.is_file():
-                time.sleep(1)
-
-            else:
-                break
-
-        process = subprocess.Popen(
-            ['bash', '-c',
-                f'timeout {timeout}s tail -n {lines} -f {log_path}'],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-
-        for line in iter(process.stdout.readline, b''):
-            msg = line.decode('utf-8')
-            if 'clear_expired_input_' in msg:
-                continue
-            yield msg
-            self.logger.info(msg.rstrip())
-
-        process.stdout.close()
-        process.wait()
-
-        if process.returncode != 0:
-            raise ValueError(
-                f'tail returned {process.returncode}\n'
-                f'{process.stderr.read().decode("utf-8")}')
+        yield from self.stream_logs(service, timeout=timeout, num=lines)
 
     def _get_head_block(self):
         if 'testnet' in self.chain_name:
@@ -765,29 +879,69 @@ class TEVMController:
         resp = requests.get(f'{endpoint}/v1/chain/get_info').json()
         return resp['head_block_num']
 
-    def await_full_index(self):
-        last_indexed_block = 0
-        remote_head_block = self._get_head_block()
-        last_update_time = time.time()
-        delta = remote_head_block - self.cleos.get_info()['head_block_num']
+    def _get_chain_head(self):
+        if self.is_local:
+            return self.cleos.get_info()['head_block_num']
+
+        return self._get_head_block()
 
-        for line in self.stream_logs('telosevm-translator'):
-            if '] pushed, at ' in line:
-                m = re.findall(r'(?<=: \[)(.*?)(?=\|)', line)
-                if len(m) == 1 and m[0] != 'NaN':
-                    last_indexed_block = int(m[0].replace(',', ''))
+    def start_lag_monitor(self):
+        if self.lag_monitor:
+            return
 
-                    delta = remote_head_block - last_indexed_block
+        daemon_config = self.config.get('daemon', {})
+        self.lag_monitor = IndexLagMonitor(
+            ElasticDriver(self.config),
+            self._get_chain_head,
+            interval=daemon_config.get('lag_monitor_interval', 5.0),
+            head_interval=daemon_config.get('lag_monitor_head_interval', 60.0),
+            logger=self.logger
+        )
+        self.lag_monitor.start()
 
-            self.logger.info(f'waiting on indexer... delta: {delta}')
+    def stop_lag_monitor(self):
+        if self.lag_monitor:
+            self.lag_monitor.stop()
+            self.lag_monitor = None
 
-            if delta < 100:
-                break
+    def start_es_telemetry(self):
+        if self.es_telemetry:
+            return
+
+        daemon_config = self.config.get('daemon', {})
+        self.es_telemetry = ElasticTelemetry(
+            ElasticDriver(self.config),
+            interval=daemon_config.get('telemetry_interval', 10.0),
+            size=daemon_config.get('telemetry_size', 360),
+            logger=self.logger
+        )
+        self.es_telemetry.start()
 
-            now = time.time()
-            if now - last_update_time > 3600:
-                remote_head_block = self._get_head_block()
-                last_update_time = now
+    def stop_es_telemetry(self):
+        if self.es_telemetry:
+            self.es_telemetry.stop()
+            self.es_telemetry = None
+
+    def start_index_optimizer(self):
+        daemon_config = self.config.get('daemon', {})
+        if self.index_optimizer or not daemon_config.get('optimize_indices', False):
+            return
+
+        self.index_optimizer = IndexOptimizer(
+            ElasticDriver(self.config),
+            interval=daemon_config.get('optimize_interval', 3600.0),
+            logger=self.logger
+        )
+        self.index_optimizer.start()
+
+    def stop_index_optimizer(self):
+        if self.index_optimizer:
+            self.index_optimizer.stop()
+            self.index_optimizer = None
+
+    def await_full_index(self, threshold: int = 100):
+        self.start_lag_monitor()
+        self.lag_monitor.wait_synced(threshold=threshold)
 
     def setup_index_patterns(self, patterns: list[str]):
         kibana_port = self.config['kibana']['port']
@@ -932,9 +1086,7 @@ class TEVMController:
                     ipv4_address=config['virtual_ip']
                 )
 
-            for msg in self.stream_logs('telosevm-translator', timeout=60*10):
-                if 'drained' in msg:
-                    break
+            self.await_ready('telosevm-translator')
 
     def restart_translator(self):
         if 'telosevm-translator' in self.containers:
@@ -987,10 +1139,7 @@ class TEVMController:
                     ipv4_address=config['virtual_ip']
                 )
 
-            for msg in self.stream_logs('telos-evm-rpc'):
-                self.logger.info(msg.rstrip())
-                if 'Telos EVM RPC started!!!' in msg:
-                    break
+            self.await_ready('telos-evm-rpc')
 
     def restart_rpc(self):
         if 'telos-evm-rpc' in self.containers:
@@ -1092,62 +1241,82 @@ class TEVMController:
                     self.config, self.logger,
                     nocache=not use_cache)
 
-    def start(self):
+    def _start_elastic(self):
+        self.start_elasticsearch()
+        self.start_es_telemetry()
+        self.start_index_optimizer()
 
-        self.build()
-
-        if sys.platform == 'darwin':
-            self.darwin_network_setup()
-
-        if 'redis' in self.services:
-            self.start_redis()
+    def _start_indexer(self):
+        self.start_telosevm_translator()
 
         if 'elastic' in self.services:
-            self.start_elasticsearch()
+            self.start_lag_monitor()
 
-        if 'kibana' in self.services:
-            self.start_kibana()
+        if not self.is_local and self.wait:
+            self.await_full_index()
 
-        if 'nodeos' in self.services:
-            self.start_nodeos()
+    def _setup_kibana_index_patterns(self):
+        idx_version = self.config['telos-evm-rpc']['elasitc_index_version']
+        self.setup_index_patterns([
+            f'{self.chain_name}-action-{idx_version}-*',
+            f'{self.chain_name}-delta-{idx_version}-*',
+            'filebeat-*'
+        ])
 
-        if 'indexer' in self.services:
-            self.start_telosevm_translator()
+    def _create_test_account(self):
+        if (self.is_local and
+            self.is_fresh and
+            not self.skip_init):
+            self.cleos.create_test_evm_account()
 
-            if not self.is_local and self.wait:
-                self.await_full_index()
+    def start(self):
 
+        self.build()
 
-        if 'kibana' in self.services:
-            idx_version = self.config['telos-evm-rpc']['elasitc_index_version']
-            self.setup_index_patterns([
-                f'{self.chain_name}-action-{idx_version}-*',
-                f'{self.chain_name}-delta-{idx_version}-*',
-                'filebeat-*'
-            ])
+        if sys.platform == 'darwin':
+            self.darwin_network_setup()
 
+        # (service, task name, fn, deps), deps on services not launched
+        # are dropped by the scheduler
+        tasks = [
+            ('redis', 'redis', self.start_redis, []),
+            ('elastic', 'elastic', self._start_elastic, []),
+            ('kibana', 'kibana', self.start_kibana, []),
+            ('nodeos', 'nodeos', self.start_nodeos, []),
+            ('indexer', 'indexer', self._start_indexer, ['nodeos', 'elastic']),
+            ('kibana', 'index-patterns', self._setup_kibana_index_patterns, ['kibana', 'elastic']),
+            ('rpc', 'rpc', self.start_evm_rpc, ['indexer', 'redis']),
+            ('beats', 'beats', self.start_beats, ['elastic']),
+            ('nodeos', 'test-account', self._create_test_account, ['nodeos', 'rpc'])
+        ]
 
-        if 'rpc' in self.services:
-            self.start_evm_rpc()
+        scheduler = StartupScheduler(
+            max_workers=self.config.get('daemon', {}).get('startup_workers', None),
+            logger=self.logger
+        )
+        for service, name, fn, deps in tasks:
+            if service in self.services:
+                scheduler.add(name, fn, deps=deps)
 
-        else:
-            if self.wait:
-                self.logger.warning('--wait passed but no indexer launched, ignoring...')
+        if self.wait and 'indexer' not in self.services:
+            self.logger.warning('--wait passed but no indexer launched, ignoring...')
 
-        if 'beats' in self.services:
-            self.start_beats()
+        try:
+            scheduler.run()
 
-        if (self.is_local and
-            self.is_fresh and
-            not self.skip_init and
-            'nodeos' in self.services):
-            self.cleos.create_test_evm_account()
+        finally:
+            self.startup_timings = scheduler.timings()
 
     def serve_api(self):
         add_routes(self)
         self.api.run(port=self.config['daemon']['port'])
 
     def stop(self):
+        self.stop_lag_monitor()
+        self.stop_es_telemetry()
+        self.stop_index_optimizer()
+        self.stop_log_hubs()
+
         if 'nodeos' in self.services:
             self._stop_nodeos()
             self.is_nodeos_relaunch = True
@@ -299,35 +299,62 @@ from requests.exceptions import Timeout
 from docker.models.containers import Container
 
 
-def _parse_docker_log(data):
-    '''Parses Docker logs by handling Docker's log protocol.
+DOCKER_STREAM_STDIN = 0
+DOCKER_STREAM_STDOUT = 1
+DOCKER_STREAM_STDERR = 2
+
+
+class DockerLogDecoder:
+    '''Incremental decoder for Docker's multiplexed log protocol.
 
     Docker prefixes each log entry with an 8-byte header:
     - 1 byte: Stream type (STDIN, STDOUT, STDERR)
-    - 7 bytes: Size of the message that follows
+    - 3 bytes: Padding
+    - 4 bytes: Big endian size of the message that follows
+
+    Chunks are appended to a single buffer, complete frames are sliced out
+    of it through a memoryview and the consumed prefix is dropped once per
+    `feed`, so a partial frame is kept until the rest of it arrives and
+    every byte is copied a constant number of times. The view never
+    outlives a `feed` call, so the buffer can always grow.
+    '''
 
-    Args:
-        data (bytes): The raw logs data with Docker's headers.
+    HEADER = struct.Struct('>BxxxL')
 
-    Yields:
-        str: The parsed log messages.
-    '''
-    while data:
-        # Extract header from data
-        header = data[:8]
-        _, length = struct.unpack('>BxxxL', header)
+    def __init__(self):
+        self._buffer = bytearray()
 
-        # Extract the actual log message based on the length from the header
-        message = data[8:8+length].decode('utf-8', errors='replace')
+    @property
+    def pending(self) -> int:
+        '''Bytes of an incomplete frame waiting for more data.
+        '''
+        return len(self._buffer)
 
-        # Advance the buffer to next log entry
-        data = data[8+length:]
+    def feed(self, chunk: bytes) -> List[Tuple[int, bytes]]:
+        '''Append `chunk` and return every complete (stream, payload) frame.
+        '''
+        self._buffer += chunk
 
-        yield message
+        header_size = self.HEADER.size
+        size = len(self._buffer)
+        pos = 0
+        frames = []
+        with memoryview(self._buffer) as view:
+            while size - pos >= header_size:
+                stream, length = self.HEADER.unpack_from(view, pos)
+                end = pos + header_size + length
+                if end > size:
+                    break
 
+                frames.append((stream, bytes(view[pos + header_size:end])))
+                pos = end
+
+        del self._buffer[:pos]
+        return frames
 
-def docker_stream_logs(container, timeout=30.0, lines=0, from_latest=False):
-    '''Streams logs from a running Docker container.
+
+def docker_stream_log_frames(container, timeout=30.0, lines=0, from_latest=False):
+    '''Streams raw log frames from a running Docker container.
 
     Args:
         container (container): Docker container object.
@@ -335,7 +362,7 @@ def docker_stream_logs(container, timeout=30.0, lines=0, from_latest=False):
         from_latest (bool, optional): Only fetch logs since the last log. Default to False.
 
     Yields:
-        str: The log messages.
+        tuple[int, bytes]: Stream type and undecoded payload of each frame.
 
     Raises:
         DockerException: If the container is not running.
@@ -366,19 +393,32 @@ def docker_stream_logs(container, timeout=30.0, lines=0, from_latest=False):
     response = session.get(
         url, params=params, stream=True, timeout=timeout)
 
+    decoder = DockerLogDecoder()
     try:
-        data_buffer = b''
-        for chunk in response.iter_content(chunk_size=1024):
+        for chunk in response.iter_content(chunk_size=64 * 1024):
             if chunk:
-                data_buffer += chunk
-                for message in _parse_docker_log(data_buffer):
-                    yield message
-                    # Adjust the buffer after reading the message
-                    data_buffer = data_buffer[len(message)+8:]
+                yield from decoder.feed(chunk)
 
     except Timeout:
         raise StopIteration(f'No logs received for {timeout} seconds.')
 
+    finally:
+        response.close()
+
+
+def docker_stream_logs(container, timeout=30.0, lines=0, from_latest=False):
+    '''Streams logs from a running Docker container.
+
+    Same as `docker_stream_log_frames` but decodes each payload.
+
+    Yields:
+        str: The log messages.
+    '''
+    for _, payload in docker_stream_log_frames(
+        container, timeout=timeout, lines=lines, from_latest=from_latest
+    ):
+        yield payload.decode('utf-8', errors='replace')
+
 
 def docker_open_process(
     client,